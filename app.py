@@ -3,6 +3,7 @@
 Unified entry point for the Knowledge Management System.
 Starts both the FastAPI backend and Next.js frontend.
 """
+import os
 import sys
 import subprocess
 import time
@@ -10,13 +11,15 @@ from pathlib import Path
 
 # Configuration
 BASE_DIR = Path(__file__).parent.resolve()
+# API_WORKERS > 1 serves with several worker processes sharing one memory-mapped
+# index (no auto-reload); the default single worker keeps --reload for development.
+API_WORKERS = max(1, int(os.getenv("API_WORKERS", "1")))
 BACKEND_CMD = [
     "uvicorn", 
     "backend.app:app", 
     "--host", "0.0.0.0", 
     "--port", "8000",
-    "--reload"
-]
+] + (["--workers", str(API_WORKERS)] if API_WORKERS > 1 else ["--reload"])
 FRONTEND_CMD = ["npm", "run", "dev"]
 FRONTEND_DIR = BASE_DIR / "frontend"
 
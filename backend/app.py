@@ -1,17 +1,38 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse, JSONResponse
 from pydantic import BaseModel
 import os
-import glob
+import hmac
+import json
+import time
 import atexit
+import weakref
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 from datetime import datetime
-import shutil
 
-# Import existing functionality
-from backend.assistant.langgraph_flow import run_assistant
+from dotenv import load_dotenv
+
+# Import existing functionality. The assistant flow (LangChain, FAISS, OpenAI) and
+# the ingestion pipeline are imported lazily so the server binds in well under a
+# second; the start-up warm-up task imports them in the background.
 from backend.utils.file_monitor import DocumentMonitor
-from backend.embeddings.vector_store import create_and_save_vector_store
+from backend.utils.token_logger import token_logger
+from backend.utils.metrics import metrics, HTTP_SECONDS
+from backend.utils.profiler import request_profiler, should_profile
+from backend.utils.readiness import Readiness
+from backend.utils.coordination import LeaderElection, ReindexCoordinator, CommittedPaths, configured_workers
+from backend.utils.admission import admission, QueueFull
+from backend.utils.uploads import (MAX_UPLOAD_BYTES, MAX_BATCH_FILES, UploadTooLarge, safe_filename,
+                                   stage_upload, commit_upload, discard_upload)
+from backend.embeddings.collection_manager import (DEFAULT_COLLECTION, CollectionError, validate_collection,
+                                                   collection_exists, list_collections, documents_dir,
+                                                   snapshots_dir)
+
+load_dotenv()
 
 # --- CONFIGURATION & INITIALIZATION ---
 DOCUMENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared', 'documents')
@@ -19,8 +40,22 @@ DOCUMENTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__f
 os.makedirs(DOCUMENTS_DIR, exist_ok=True)
 # os.makedirs(LOGS_DIR, exist_ok=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Joins the leader election (the leader rebuilds the index and runs the document
+    monitor) and warms up in the background so the server accepts traffic immediately.
+    """
+    global coordinated
+    coordinated = True
+    election.start(_on_elected)
+    readiness.start(warm_up)
+    yield
+    reindexer.stop()
+    election.release()
+
 # Initialize FastAPI app
-app = FastAPI(title="Knowledge Assistant API", version="1.0.0")
+app = FastAPI(title="Knowledge Assistant API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -29,18 +64,182 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "Retry-After"],
 )
 
-# Initialize the document monitor
-monitor = DocumentMonitor(path=DOCUMENTS_DIR, callback=create_and_save_vector_store)
+# Multipart framing around an uploaded file
+_UPLOAD_OVERHEAD_BYTES = 64 * 1024
+_UPLOAD_PATHS = ("/api/upload", "/api/upload/batch")
+
+class UploadBodyLimit:
+    """
+    Caps upload request bodies before the multipart parser spools them to disk.
+    A declared Content-Length over the limit is answered with 413 right away;
+    otherwise (including chunked bodies) bytes are counted as they arrive and the
+    request is cut off with 413 at the first chunk that crosses the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in _UPLOAD_PATHS:
+            return await self.app(scope, receive, send)
+        files = MAX_BATCH_FILES if scope["path"].endswith("/batch") else 1
+        limit = files * (MAX_UPLOAD_BYTES + _UPLOAD_OVERHEAD_BYTES)
+        too_large = JSONResponse(status_code=413, content={"detail": "Upload exceeds the size limit"})
+        try:
+            length = int(dict(scope["headers"]).get(b"content-length", b"0"))
+        except ValueError:
+            length = 0
+        if length > limit:
+            return await too_large(scope, receive, send)
+
+        received = 0
+        exceeded = False
+
+        async def counting_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLarge("Upload exceeds the size limit")
+            return message
+
+        async def guarded_send(message):
+            # Once cut off, whatever the app makes of the aborted body is replaced by the 413
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded:
+            await too_large(scope, receive, send)
+
+app.add_middleware(UploadBodyLimit)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Records per-route latency into kms_http_request_duration_seconds."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        )
+
+def _assistant():
+    """The assistant flow module, imported on first use."""
+    from backend.assistant import langgraph_flow
+    return langgraph_flow
+
+_document_catalog = None
+_collection_catalogs = {}
+
+def _catalog(collection: str = DEFAULT_COLLECTION):
+    """In-memory view of a collection's published document catalog, created on first use."""
+    global _document_catalog
+    from backend.embeddings.catalog import DocumentCatalog
+    if collection != DEFAULT_COLLECTION:
+        if collection not in _collection_catalogs:
+            _collection_catalogs[collection] = DocumentCatalog(snapshots_dir(collection), documents_dir(collection))
+        return _collection_catalogs[collection]
+    if _document_catalog is None:
+        _document_catalog = DocumentCatalog(documents_dir=DOCUMENTS_DIR)
+    return _document_catalog
+
+def _documents_dir(collection: str) -> str:
+    return DOCUMENTS_DIR if collection == DEFAULT_COLLECTION else documents_dir(collection)
+
+def _collection(name: Optional[str], must_exist: bool = True) -> str:
+    """The validated collection name (400 if invalid, 404 if it must exist and does not)."""
+    try:
+        collection = validate_collection(name)
+    except CollectionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if must_exist and not collection_exists(collection):
+        raise HTTPException(status_code=404, detail=f"Collection '{collection}' not found")
+    return collection
 
-# Register a cleanup function to stop the monitor on exit
-atexit.register(monitor.stop)
+def create_and_save_vector_store(*args, **kwargs):
+    """Rebuilds the vector store (the ingestion pipeline is imported on first use)."""
+    from backend.embeddings.vector_store import create_and_save_vector_store as rebuild
+    return rebuild(*args, **kwargs)
+
+def _index_build_error():
+    """The ingestion pipeline's IndexBuildError (imported on first use, like the pipeline)."""
+    from backend.embeddings.vector_store import IndexBuildError
+    return IndexBuildError
+
+def _rebuild_collection(collection: str = DEFAULT_COLLECTION):
+    create_and_save_vector_store(collection=collection)
+
+# Retrieval is warm once the index, its metadata and the assistant flow are loaded
+readiness = Readiness(required=("index", "metadata", "assistant"))
+
+# Single-writer reindexing: every worker may request a rebuild, only the elected
+# leader runs it. Without the lifespan (e.g. an ASGI app driven directly in tests)
+# there is no leader and rebuilds run inline.
+election = LeaderElection()
+reindexer = ReindexCoordinator(_rebuild_collection)
+coordinated = False
+# Default-collection documents the API wrote (and re-indexed) itself
+committed = CommittedPaths()
+
+def _on_documents_changed(changes):
+    """
+    Monitor callback: one rebuild per settled change set, however many files it
+    holds, leaving out the uploads and deletes the API has already re-indexed.
+    """
+    changes = committed.claim(changes)
+    if not changes:
+        return
+    print(f"📂 {len(changes)} document(s) changed on disk; requesting re-indexing")
+    reindexer.request(wait=False)
+
+# Initialize the document monitor (started by the leader only)
+monitor = DocumentMonitor(path=DOCUMENTS_DIR, callback=_on_documents_changed)
+
+def _on_elected():
+    reindexer.serve()
+    if not _vector_store_exists():
+        reindexer.request(wait=False)
+    monitor.start()
+    # Register a cleanup function to stop the monitor on exit
+    atexit.register(monitor.stop)
+
+def _reindex(collection: str = DEFAULT_COLLECTION):
+    """
+    Rebuilds a collection's vector store (through the leader when coordinated) and
+    waits for it. Raises IndexBuildError when the rebuild failed.
+    """
+    if not coordinated:
+        _rebuild_collection(collection)
+        return
+    generation = reindexer.request(wait=True, key=None if collection == DEFAULT_COLLECTION else collection)
+    if generation is None:
+        raise RuntimeError("Timed out waiting for the index to be rebuilt")
+    if generation.get("error"):
+        raise _index_build_error()(generation["error"])
 
 # --- PYDANTIC MODELS ---
 class ChatMessage(BaseModel):
     content: str
     conversation_history: Optional[List[Dict]] = []
+    collection: Optional[str] = None
 
 class DocumentInfo(BaseModel):
     id: str
@@ -48,12 +247,41 @@ class DocumentInfo(BaseModel):
     size: int
     modified: str
     type: str
+    status: str = "pending"
+    content_hash: Optional[str] = None
+    pages: int = 0
+    chunks: int = 0
+    tokens: int = 0
+    embedding_cost: float = 0.0
+    generation: Optional[int] = None
+    error: Optional[str] = None
 
 class ChatResponse(BaseModel):
     content: str
     source: Optional[str] = None
     timestamp: datetime
 
+# --- PROFILING HELPERS ---
+
+def _is_admin(request: Request) -> bool:
+    """Admin features need ADMIN_TOKEN set and a matching X-Admin-Token header; unset means closed."""
+    token = os.getenv("ADMIN_TOKEN")
+    return bool(token) and hmac.compare_digest(request.headers.get("X-Admin-Token", "").encode(),
+                                               token.encode())
+
+async def _run_maybe_profiled(request: Request, profile: Optional[str], label: str, fn, *args):
+    """
+    Runs fn(*args) in the threadpool, under the request profiler when asked for via
+    the X-Profile header or ?profile=1 (admins only) or picked by PROFILE_SAMPLE_RATE.
+    Returns (result, profile_id or None).
+    """
+    flag = profile or request.headers.get("X-Profile")
+    if flag and not _is_admin(request):
+        flag = None
+    if should_profile(flag):
+        return await run_in_threadpool(request_profiler.profile_call, label, fn, *args)
+    return await run_in_threadpool(fn, *args), None
+
 # --- API ENDPOINTS ---
 
 @app.get("/")
@@ -61,149 +289,460 @@ async def root():
     return {"message": "Knowledge Assistant API is running"}
 
 @app.get("/api/documents", response_model=List[DocumentInfo])
-async def get_documents():
-    """Get list of documents with metadata"""
-    documents = []
-    for ext in ['*.pdf', '*.txt', '*.docx']:
-        files = glob.glob(os.path.join(DOCUMENTS_DIR, ext))
-        for file_path in files:
-            stat = os.stat(file_path)
-            documents.append(DocumentInfo(
-                id=os.path.basename(file_path),
-                name=os.path.basename(file_path),
-                size=stat.st_size,
-                modified=datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M'),
-                type=os.path.splitext(file_path)[1][1:]  # Remove the dot
-            ))
-    return sorted(documents, key=lambda x: x.modified, reverse=True)
+async def get_documents(response: Response, offset: int = 0, limit: Optional[int] = None,
+                        sort: str = "modified", order: str = "desc", collection: Optional[str] = None):
+    """
+    Documents from the in-memory catalog of a collection (default: the default
+    one) with their indexing status and stats. Paginated with offset/limit and
+    sorted by modified, name, size, pages, chunks, tokens, cost or status
+    (order=asc|desc); the total count is in X-Total-Count.
+    """
+    collection = _collection(collection)
+    if offset < 0 or (limit is not None and limit < 0) or order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="offset and limit must be >= 0 and order 'asc' or 'desc'")
+    try:
+        total, entries = _catalog(collection).page(offset, limit, sort, descending=order == "desc")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Total-Count"] = str(total)
+    return [
+        DocumentInfo(
+            id=entry["name"],
+            name=entry["name"],
+            size=entry["size"],
+            modified=datetime.fromtimestamp(entry["mtime"]).strftime('%Y-%m-%d %H:%M'),
+            type=entry["type"],
+            status=entry["status"],
+            content_hash=entry.get("content_hash"),
+            pages=entry.get("pages", 0),
+            chunks=entry.get("chunks", 0),
+            tokens=entry.get("tokens", 0),
+            embedding_cost=entry.get("embedding_cost", 0.0),
+            generation=entry.get("generation"),
+            error=entry.get("error"),
+        )
+        for entry in entries
+    ]
 
-@app.post("/api/upload")
-async def upload_document(file: UploadFile = File(...)):
-    """Upload a new document"""
+ALLOWED_EXTENSIONS = ('.pdf', '.txt', '.docx')
+
+def _check_upload_name(file: UploadFile) -> str:
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
-    
-    # Check file type
-    allowed_extensions = {'.pdf', '.txt', '.docx'}
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    if file_ext not in allowed_extensions:
+    try:
+        filename = safe_filename(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    file_ext = os.path.splitext(filename)[1].lower()
+    if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
-            status_code=400, 
-            detail=f"File type {file_ext} not allowed. Allowed types: {', '.join(allowed_extensions)}"
+            status_code=400,
+            detail=f"File type {file_ext} not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
-    
-    # Save file
-    file_path = os.path.join(DOCUMENTS_DIR, file.filename)
+    return filename
+
+def _indexed_copy(filename: str, content_hash: str, collection: str, directory: str) -> Optional[Dict]:
+    """
+    The catalog entry already holding this content in the collection (preferring the
+    same name), if any. The published catalog can outlive a deleted document (a failed
+    build publishes nothing), so an entry only counts while its file is still in the
+    collection's documents folder.
+    """
+    catalog = _catalog(collection)
+    same_name = catalog.get(filename)
+    if not (same_name and same_name.get("content_hash") == content_hash and same_name["status"] != "failed"):
+        same_name = catalog.find_hash(content_hash)
+    if same_name and os.path.isfile(os.path.join(directory, same_name["name"])):
+        return same_name
+    return None
+
+async def _ingest_uploads(request: Request, response: Response, files: List[UploadFile],
+                          profile: Optional[str], collection: str) -> List[Dict]:
+    """
+    Copies every parsed upload to a temporary file while hashing it, then renames the new
+    ones into the collection's documents folder (creating the collection) and
+    re-indexes it once for the whole set. Content that is already indexed in the
+    collection (or repeated within the set) is dropped without being extracted or
+    embedded again.
+    """
+    filenames = [_check_upload_name(file) for file in files]
+    target_dir = _documents_dir(collection)
+    os.makedirs(target_dir, exist_ok=True)
+    staged, results, seen = [], [], {}
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Trigger reindexing
-        create_and_save_vector_store()
-        
-        return {"message": f"File {file.filename} uploaded successfully", "filename": file.filename}
+        for file, filename in zip(files, filenames):
+            try:
+                upload = await run_in_threadpool(stage_upload, file.file, filename, target_dir)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            existing = seen.get(upload.content_hash) or _indexed_copy(filename, upload.content_hash, collection, target_dir)
+            result = {"filename": filename, "size": upload.size, "content_hash": upload.content_hash,
+                      "duplicate_of": existing["name"] if existing else None}
+            results.append(result)
+            if existing:
+                discard_upload(upload.path)
+                continue
+            seen[upload.content_hash] = {"name": filename}
+            staged.append(upload)
+        for upload in staged:
+            path = commit_upload(upload, target_dir)
+            if collection == DEFAULT_COLLECTION:
+                committed.mark(path)
+    except BaseException:
+        for upload in staged:
+            discard_upload(upload.path)
+        raise
+
+    index_error = None
+    if staged:
+        # Listed as pending while the collection is re-indexed
+        await run_in_threadpool(_catalog(collection).refresh, True)
+        profile_id = None
+        try:
+            _, profile_id = await _run_maybe_profiled(request, profile, "ingestion", _reindex, collection)
+        except _index_build_error() as e:
+            # The files are stored; the previous index keeps serving until a rebuild succeeds
+            index_error = str(e)
+        await run_in_threadpool(_catalog(collection).refresh, True)
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+    for result in results:
+        result["indexed"] = result["duplicate_of"] is None and index_error is None
+        if result["duplicate_of"] is None and index_error:
+            result["error"] = index_error
+    return results
+
+@app.post("/api/upload")
+async def upload_document(request: Request, response: Response, file: UploadFile = File(...),
+                          profile: Optional[str] = None, collection: Optional[str] = None):
+    """
+    Upload a new document to a collection (default: the default one; a new name
+    creates it); content that is already indexed is recognized by its hash and not re-indexed.
+    """
+    collection = _collection(collection, must_exist=False)
+    try:
+        result, = await _ingest_uploads(request, response, [file], profile, collection)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
+    if result["duplicate_of"]:
+        message = f"File {result['filename']} is already indexed as {result['duplicate_of']}"
+    elif not result["indexed"]:
+        message = f"File {result['filename']} uploaded but not indexed: {result['error']}"
+    else:
+        message = f"File {result['filename']} uploaded successfully"
+    return dict(result, message=message)
+
+@app.post("/api/upload/batch")
+async def upload_documents(request: Request, response: Response, files: List[UploadFile] = File(...),
+                           profile: Optional[str] = None, collection: Optional[str] = None):
+    """Upload several documents to a collection with a single re-indexing pass."""
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} files per batch")
+    collection = _collection(collection, must_exist=False)
+    try:
+        results = await _ingest_uploads(request, response, files, profile, collection)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error uploading files: {str(e)}")
+    indexed = sum(result["indexed"] for result in results)
+    present = sum(result["duplicate_of"] is not None for result in results)
+    message = f"{indexed} of {len(results)} file(s) indexed, {present} already present"
+    errors = [result["error"] for result in results if result.get("error")]
+    if errors:
+        message += f"; indexing failed: {errors[0]}"
+    return {"message": message, "files": results}
+
+def _to_assistant_history(msgs: List[Dict]) -> List[tuple]:
+    """Robustly convert conversation history from frontend format to assistant format"""
+    history = []
+    # Skip initial assistant-only message (welcome)
+    if msgs and msgs[0].get("type") == "assistant" and len(msgs) > 1:
+        msgs = msgs[1:]
+    # Only include up to the last complete user-assistant pair (exclude current user question if unpaired)
+    last_index = len(msgs)
+    if last_index > 0 and msgs[-1].get("type") == "user":
+        last_index -= 1
+    i = 0
+    while i < last_index:
+        if msgs[i].get("type") == "user":
+            user_msg = msgs[i]["content"]
+            assistant_msg = ""
+            if i + 1 < last_index and msgs[i + 1].get("type") == "assistant":
+                assistant_msg = msgs[i + 1]["content"]
+                i += 1
+            history.append((user_msg, assistant_msg))
+        i += 1
+    return history
+
+def _format_sources(sources: List[Dict]) -> Optional[str]:
+    """Format sources for frontend"""
+    if not sources:
+        return None
+    source_list = []
+    for src in sources:
+        if src.get('document'):
+            page_info = f" (Page {src['page']})" if src.get('page') else ""
+            source_list.append(f"{src['document']}{page_info}")
+    return "; ".join(source_list)
+
+def _client_key(request: Request) -> str:
+    """Fairness key for admission: the X-User-Id header, else the client address."""
+    return request.headers.get("X-User-Id") or (request.client.host if request.client else "anonymous")
+
+def _busy(e: QueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(message: ChatMessage):
-    """Process chat message and return assistant response"""
+async def chat(message: ChatMessage, request: Request, http_response: Response, profile: Optional[str] = None):
+    """
+    Process chat message against its collection (default: the default one) and return
+    the assistant response (429 with Retry-After when the server is saturated)
+    """
+    collection = _collection(message.collection)
     try:
-        # Robustly convert conversation history from frontend format to assistant format
-        history = []
-        msgs = message.conversation_history or []
-        # Skip initial assistant-only message (welcome)
-        if msgs and msgs[0].get("type") == "assistant" and len(msgs) > 1:
-            msgs = msgs[1:]
-        # Only include up to the last complete user-assistant pair (exclude current user question if unpaired)
-        last_index = len(msgs)
-        if last_index > 0 and msgs[-1].get("type") == "user":
-            last_index -= 1
-        i = 0
-        while i < last_index:
-            if msgs[i].get("type") == "user":
-                user_msg = msgs[i]["content"]
-                assistant_msg = ""
-                if i + 1 < last_index and msgs[i + 1].get("type") == "assistant":
-                    assistant_msg = msgs[i + 1]["content"]
-                    i += 1
-                history.append((user_msg, assistant_msg))
-            i += 1
-        # Run the assistant with the user's message and conversation history
-        response = run_assistant(message.content, history)
+        async with admission.slot(_client_key(request)):
+            history = _to_assistant_history(message.conversation_history or [])
+            # Run the assistant off the event loop so concurrent (and coalesced) requests can proceed
+            response, profile_id = await _run_maybe_profiled(request, profile, "chat", _assistant().run_assistant,
+                                                             message.content, history, collection)
+        if profile_id:
+            http_response.headers["X-Profile-Id"] = profile_id
         
         # Extract content and source from response
         content = response.get('content', 'Sorry, I encountered an error processing your request.')
         sources = response.get('sources', [])
         
-        # Format sources for frontend
-        source_text = None
-        if sources:
-            source_list = []
-            for src in sources:
-                if src.get('document'):
-                    page_info = f" (Page {src['page']})" if src.get('page') else ""
-                    source_list.append(f"{src['document']}{page_info}")
-            source_text = "; ".join(source_list)
-        
         return ChatResponse(
             content=content,
-            source=source_text,
+            source=_format_sources(sources),
             timestamp=datetime.now()
         )
+    except QueueFull as e:
+        raise _busy(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+@app.post("/api/chat/stream")
+async def chat_stream(message: ChatMessage, request: Request):
+    """
+    Process chat message and stream the response as newline-delimited JSON:
+    {"event": "delta", "content": ...} lines followed by one
+    {"event": "done", "source": ..., "timestamp": ...} line.
+    The admission slot is held until the stream ends.
+    """
+    collection = _collection(message.collection)
+    try:
+        await admission.acquire(_client_key(request))
+    except QueueFull as e:
+        raise _busy(e)
+    release = admission.releaser()
+    try:
+        history = _to_assistant_history(message.conversation_history or [])
+        events = await run_in_threadpool(_assistant().stream_assistant, message.content, history, collection)
+    except BaseException:
+        release()
+        raise
+
+    def ndjson():
+        try:
+            for event in events:
+                if event["event"] == "done":
+                    event = {
+                        "event": "done",
+                        "type": event.get("type"),
+                        "source": _format_sources(event.get("sources", [])),
+                        "timestamp": datetime.now().isoformat(),
+                    }
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": f"Error processing chat: {str(e)}"}) + "\n"
+        finally:
+            release()
+
+    # A sync generator is iterated in the threadpool by Starlette, so waiting on
+    # a shared (coalesced) stream never blocks the event loop.
+    body = ndjson()
+    # A client that disconnects before the body is read never runs the generator's finally
+    weakref.finalize(body, release)
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
 @app.delete("/api/documents/{document_id}")
-async def delete_document(document_id: str):
-    """Delete a document"""
-    file_path = os.path.join(DOCUMENTS_DIR, document_id)
+async def delete_document(document_id: str, collection: Optional[str] = None):
+    """Delete a document (from the default collection unless one is given)"""
+    collection = _collection(collection)
+    file_path = os.path.join(_documents_dir(collection), document_id)
     
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Document not found")
     
     try:
         os.remove(file_path)
+        if collection == DEFAULT_COLLECTION:
+            committed.mark(file_path)
+        await run_in_threadpool(_catalog(collection).refresh, True)
         # Trigger reindexing after deletion
-        create_and_save_vector_store()
+        try:
+            await run_in_threadpool(_reindex, collection)
+        except _index_build_error() as e:
+            return {"message": f"Document {document_id} deleted, but the index was not rebuilt: {e}"}
+        finally:
+            await run_in_threadpool(_catalog(collection).refresh, True)
         return {"message": f"Document {document_id} deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
 
+@app.get("/api/collections")
+async def get_collections():
+    """Known collections, with the ones currently loaded in this worker (least recently used first)"""
+    from backend.qa.retriever import collection_stores
+    return {"collections": list_collections(), "loaded": collection_stores.resident(),
+            "memory_budget_bytes": collection_stores.budget_bytes}
+
+@app.get("/api/usage")
+async def get_usage(start_date: Optional[str] = None, end_date: Optional[str] = None, group_by: Optional[str] = "activity"):
+    """
+    Token usage and estimated cost between two inclusive dates ('YYYY-MM-DD' or
+    ISO datetimes), grouped by activity, model, document, day or hour.
+    """
+    try:
+        groups = token_logger.usage_store.query(start_date, end_date, group_by=group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "group_by": group_by,
+        "total_tokens": sum(g["total_tokens"] for g in groups),
+        "total_cost": round(sum(g["cost"] for g in groups), 8),
+        "groups": groups
+    }
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Per-stage latency histograms, counters and gauges in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request):
+    """List stored request profiles, newest first"""
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return request_profiler.list_profiles()
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request, kind: str = "speedscope"):
+    """Download a stored profile: kind=speedscope (CPU flame graph) or kind=memory (allocations)"""
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    path = request_profiler.profile_path(profile_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=os.path.basename(path))
+
+@app.get("/api/admin/snapshots")
+async def list_snapshots(request: Request):
+    """List vector store snapshot generations, newest first"""
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    from backend.embeddings.snapshots import describe
+    return describe()
+
+@app.post("/api/admin/snapshots/rollback")
+async def rollback_snapshot(request: Request, generation: Optional[int] = None):
+    """Re-publish an older snapshot (default: the one before the current); every worker serves it on its next request"""
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    from backend.embeddings.snapshots import rollback, SnapshotError
+    try:
+        current = await run_in_threadpool(rollback, generation)
+    except SnapshotError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"current": current}
+
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness: answers as soon as the server is up, warm or not (see /api/ready)"""
+    catalog = _catalog()
     return {
         "status": "healthy",
-        "documents_count": len(glob.glob(os.path.join(DOCUMENTS_DIR, "*"))),
+        "documents_count": catalog.count(),
+        "indexed_documents": catalog.count("indexed"),
+        "index_generation": catalog.generation,
         "timestamp": datetime.now()
     }
 
-# --- REINDEXING CHECK ---
+@app.get("/api/ready")
+async def ready_check():
+    """Readiness: 200 once the index, metadata and assistant flow are loaded, 503 until then"""
+    status = readiness.snapshot()
+    status["worker"] = {"pid": os.getpid(), "leader": election.is_leader}
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+# --- STARTUP: INDEXING CHECK & WARM-UP ---
+def _vector_store_exists() -> bool:
+    from backend.qa.retriever import store_paths
+    return store_paths() is not None
+
 def check_and_reindex():
-    """Check if reindexing is needed and perform it if necessary"""
-    try:
-        # Check if vector store exists
-        vectorstore_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vectorstore')
-        if not os.path.exists(vectorstore_dir) or not os.listdir(vectorstore_dir):
-            print("🔄 Vector store not found. Creating initial index...")
-            create_and_save_vector_store()
-            print("✅ Initial indexing completed!")
-        else:
-            print("✅ Vector store found. Ready to serve!")
-    except Exception as e:
-        print(f"❌ Error during reindexing check: {e}")
+    """Wait until the vector store exists; the leader builds it if it is missing"""
+    if _vector_store_exists():
+        print("✅ Vector store found. Ready to serve!")
+        return
+    print("🔄 Vector store not found. Waiting for the initial index...")
+    # The leader builds it; without documents it publishes an empty store, so a
+    # fresh install is ready (and answers from no sources) until the first upload
+    while not _vector_store_exists():
+        time.sleep(1)
+    print("✅ Initial indexing completed!")
+
+def _warm_tokenizers():
+    from backend.utils.token_logger import _encoding_for
+    for model in ("gpt-4.1-nano", "text-embedding-3-large"):
+        _encoding_for(model)
+
+def _load_index():
+    from backend.qa.retriever import load_index
+    load_index()
+
+def _load_metadata():
+    from backend.qa.retriever import load_metadata
+    load_metadata()
 
-# Check if reindexing is needed and perform it if necessary
-check_and_reindex()
+def warm_up():
+    """Tokenizers and the assistant flow load while the index is checked (and built if
+    missing); the index and its metadata then load in parallel."""
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="warmup") as pool:
+        pool.submit(readiness.run_task, "tokenizer", _warm_tokenizers)
+        pool.submit(readiness.run_task, "assistant", _assistant)
+        pool.submit(_catalog().refresh)
+        from backend.qa.reranker import reranker
+        if reranker.enabled:
+            # Tracked by /api/ready but not required: retrieval falls back to FAISS order
+            pool.submit(readiness.run_task, "reranker", reranker.warm)
+        if readiness.run_task("indexing", check_and_reindex):
+            readiness.run_parallel({"index": _load_index, "metadata": _load_metadata})
 
 # --- MAIN EXECUTION ---
 if __name__ == "__main__":
+    # Run from the repository root: python -m backend.app [--workers N | --reload]
+    import argparse
     import uvicorn
+    parser = argparse.ArgumentParser(description="Run the Knowledge Assistant API.")
+    parser.add_argument("--workers", type=int, default=configured_workers(),
+                        help="Worker processes sharing the memory-mapped index (default: API_WORKERS or 1)")
+    parser.add_argument("--reload", action="store_true", help="Auto-reload on code changes (single worker only)")
+    args = parser.parse_args()
+    if args.workers > 1 and args.reload:
+        parser.error("--reload cannot be combined with multiple workers")
+    os.environ["API_WORKERS"] = str(args.workers)
     print("🚀 Starting Knowledge Assistant API...")
     print(f"📁 Documents directory: {DOCUMENTS_DIR}")
+    print(f"👷 Workers: {args.workers}")
     # print(f"📝 Logs directory: {LOGS_DIR}") # This line is removed as per the edit hint
     print("🌐 API will be available at: http://localhost:8000")
     print("📚 API docs will be available at: http://localhost:8000/docs")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("backend.app:app", host="0.0.0.0", port=8000, workers=args.workers, reload=args.reload)
@@ -0,0 +1,227 @@
+"""
+Embedding-based intent routing.
+
+Every message is classified as `qa`, `summarize`, `chit_chat` or `out_of_scope`
+by cosine similarity to per-intent centroids of labeled example utterances
+(English and Indonesian). The message is embedded in the same request as its
+retrieval query, so routing adds no round trip. Chit-chat and out-of-scope
+messages take the fast path: a canned reply, with no retrieval and no
+generation call. Bare greetings and thanks ("hi", "terima kasih") are matched as
+whole messages before anything is embedded.
+
+The examples are embedded once and stored under `shared/intents/`, keyed by the
+embedding model and the example set, so other workers and restarts reuse them.
+A fast-path intent must beat both retrieval intents by ROUTER_MARGIN and reach
+ROUTER_MIN_SIMILARITY; anything less certain goes through retrieval, as does
+every message when embeddings are unavailable (keyword classification then
+picks between qa and summarize).
+"""
+import os
+import re
+import hashlib
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from backend.assistant.query_classifier import classify_intent
+from backend.utils.metrics import metrics
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INTENT_CACHE_DIR = os.path.join(project_root, 'shared', 'intents')
+EMBEDDING_MODEL = "text-embedding-3-large"
+MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.35"))
+MARGIN = float(os.getenv("ROUTER_MARGIN", "0.05"))
+
+QA, SUMMARIZE, CHIT_CHAT, OUT_OF_SCOPE = "qa", "summarize", "chit_chat", "out_of_scope"
+INTENTS = (QA, SUMMARIZE, CHIT_CHAT, OUT_OF_SCOPE)
+FAST_PATH = (CHIT_CHAT, OUT_OF_SCOPE)
+
+INTENT_ROUTES = metrics.counter(
+    "kms_intent_routes_total", "Assistant messages by routed intent and method (lexical/embedding/keyword).",
+    ("intent", "method"))
+
+# (utterance, canned reply key); retrieval intents have no reply
+EXAMPLES: Dict[str, List[Tuple[str, Optional[str]]]] = {
+    QA: [
+        ("What are the capital requirements for commercial banks?", None),
+        ("When must a bank report a cyber incident to OJK?", None),
+        ("Which article regulates customer data protection?", None),
+        ("How long must transaction records be retained?", None),
+        ("Is an IT steering committee mandatory?", None),
+        ("Resume the loan restructuring process after the grace period", None),
+        ("Apa kewajiban bank terkait manajemen risiko teknologi informasi?", None),
+        ("Berapa lama data nasabah wajib disimpan?", None),
+        ("Pasal berapa yang mengatur pusat data?", None),
+        ("Siapa yang bertanggung jawab atas audit intern?", None),
+        ("Apakah bank boleh menempatkan sistem elektronik di luar negeri?", None),
+        ("Bagaimana prosedur pelaporan insiden siber?", None),
+    ],
+    SUMMARIZE: [
+        ("Summarize this regulation", None),
+        ("Give me a summary of the document", None),
+        ("Can you summarize chapter three?", None),
+        ("What is the summary of the IT risk management rules?", None),
+        ("Give me the key points of the regulation in short", None),
+        ("Ringkas peraturan ini", None),
+        ("Buatkan ringkasan dokumen POJK tersebut", None),
+        ("Tolong berikan intisari bab tentang manajemen risiko", None),
+        ("Mohon resume isi peraturan ini", None),
+        ("Apa ikhtisar dari surat edaran ini?", None),
+    ],
+    CHIT_CHAT: [
+        ("Hi there!", "greeting.en"),
+        ("Hello, how are you?", "greeting.en"),
+        ("Good morning", "greeting.en"),
+        ("Thanks, that helps a lot", "thanks.en"),
+        ("Thank you very much", "thanks.en"),
+        ("Goodbye, see you later", "farewell.en"),
+        ("Who are you?", "about.en"),
+        ("What can you do?", "about.en"),
+        ("Halo, apa kabar?", "greeting.id"),
+        ("Selamat pagi", "greeting.id"),
+        ("Terima kasih banyak", "thanks.id"),
+        ("Makasih ya, sangat membantu", "thanks.id"),
+        ("Sampai jumpa lagi", "farewell.id"),
+        ("Kamu siapa?", "about.id"),
+        ("Apa yang bisa kamu bantu?", "about.id"),
+    ],
+    OUT_OF_SCOPE: [
+        ("What's the weather like tomorrow?", "out_of_scope.en"),
+        ("Write me a poem about the sea", "out_of_scope.en"),
+        ("Who won the football match last night?", "out_of_scope.en"),
+        ("Recommend a good restaurant nearby", "out_of_scope.en"),
+        ("What is the stock price of Apple today?", "out_of_scope.en"),
+        ("Tell me a joke", "out_of_scope.en"),
+        ("Bagaimana cuaca di Jakarta hari ini?", "out_of_scope.id"),
+        ("Buatkan puisi tentang cinta", "out_of_scope.id"),
+        ("Siapa juara liga inggris tahun ini?", "out_of_scope.id"),
+        ("Rekomendasi resep masakan untuk makan malam", "out_of_scope.id"),
+        ("Ceritakan lelucon lucu", "out_of_scope.id"),
+    ],
+}
+
+REPLIES = {
+    "greeting.en": "Hello! I can answer questions about the regulations in the knowledge base or summarize them. What would you like to know?",
+    "greeting.id": "Halo! Saya dapat menjawab pertanyaan atau membuat ringkasan tentang peraturan di basis pengetahuan. Apa yang ingin Anda ketahui?",
+    "thanks.en": "You're welcome! Let me know if you have another question.",
+    "thanks.id": "Sama-sama! Silakan bertanya lagi jika ada yang ingin diketahui.",
+    "farewell.en": "Goodbye! Come back any time you have a question about the documents.",
+    "farewell.id": "Sampai jumpa! Silakan kembali kapan saja jika ada pertanyaan tentang dokumen.",
+    "about.en": "I'm the knowledge assistant: I answer questions about the uploaded regulations and documents, with sources, and can summarize them.",
+    "about.id": "Saya asisten pengetahuan: saya menjawab pertanyaan tentang peraturan dan dokumen yang diunggah, lengkap dengan sumbernya, dan dapat merangkumnya.",
+    "out_of_scope.en": "Sorry, I can only help with questions about the documents in the knowledge base.",
+    "out_of_scope.id": "Maaf, saya hanya dapat membantu pertanyaan seputar dokumen di basis pengetahuan.",
+}
+
+# Whole messages answered without embedding anything
+SMALL_TALK = {
+    "hi": "greeting.en", "hello": "greeting.en", "hey": "greeting.en", "good morning": "greeting.en",
+    "halo": "greeting.id", "hai": "greeting.id", "selamat pagi": "greeting.id", "selamat siang": "greeting.id",
+    "selamat sore": "greeting.id", "selamat malam": "greeting.id", "pagi": "greeting.id",
+    "thanks": "thanks.en", "thank you": "thanks.en", "thx": "thanks.en",
+    "terima kasih": "thanks.id", "makasih": "thanks.id", "trims": "thanks.id", "thanks ya": "thanks.id",
+    "bye": "farewell.en", "goodbye": "farewell.en", "sampai jumpa": "farewell.id", "dadah": "farewell.id",
+}
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+class Route(NamedTuple):
+    intent: str
+    score: float
+    reply: Optional[str] = None  # canned reply for fast-path intents
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", (text or "").lower()).split())
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+class IntentRouter:
+    """Routes messages by nearest intent centroid; see the module docstring."""
+
+    def __init__(self, cache_dir: str = INTENT_CACHE_DIR, model: str = EMBEDDING_MODEL,
+                 min_similarity: float = MIN_SIMILARITY, margin: float = MARGIN):
+        self.cache_dir = cache_dir
+        self.model = model
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._examples = [(intent, text, reply) for intent in INTENTS for text, reply in EXAMPLES[intent]]
+        self._vectors: Optional[np.ndarray] = None  # unit example embeddings
+        self._centroids: Optional[np.ndarray] = None  # unit centroid per intent, in INTENTS order
+
+    def fingerprint(self) -> str:
+        digest = hashlib.sha256(self.model.encode('utf-8'))
+        for intent, text, _ in self._examples:
+            digest.update(b"\x00" + intent.encode('utf-8') + b"\x01" + text.encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def _load_examples(self, embed: Callable[[List[str]], Optional[np.ndarray]]) -> bool:
+        """Loads (or embeds and stores) the example vectors; False if embedding failed."""
+        if self._centroids is not None:
+            return True
+        with self._lock:
+            if self._centroids is not None:
+                return True
+            path = os.path.join(self.cache_dir, f"examples-{self.fingerprint()}.npy")
+            try:
+                vectors = np.load(path)
+            except (OSError, ValueError):
+                vectors = embed([text for _, text, _ in self._examples])
+                if vectors is None:
+                    return False
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, np.asarray(vectors, dtype=np.float32))
+                os.replace(tmp_path, path)
+            vectors = _unit(vectors)
+            labels = np.array([INTENTS.index(intent) for intent, _, _ in self._examples])
+            self._vectors = vectors
+            self._centroids = _unit(np.stack([vectors[labels == i].mean(axis=0) for i in range(len(INTENTS))]))
+            return True
+
+    def route_text(self, query: str) -> Optional[Route]:
+        """Whole-message greetings, thanks and farewells; None for anything else."""
+        reply_key = SMALL_TALK.get(_normalize(query))
+        if reply_key is None:
+            return None
+        INTENT_ROUTES.inc(intent=CHIT_CHAT, method="lexical")
+        return Route(CHIT_CHAT, 1.0, REPLIES[reply_key])
+
+    def route(self, query: str, embedding: Optional[np.ndarray],
+              embed: Callable[[List[str]], Optional[np.ndarray]]) -> Route:
+        """
+        Classifies `query` from its embedding; `embed` embeds the examples the first
+        time. Without a usable embedding, falls back to keyword classification.
+        """
+        if embedding is None or not self._load_examples(embed) or \
+                np.asarray(embedding).size != self._centroids.shape[1]:
+            intent = classify_intent(query)
+            INTENT_ROUTES.inc(intent=intent, method="keyword")
+            return Route(intent, 0.0)
+        query_vector = _unit(np.asarray(embedding).reshape(-1))
+        scores = self._centroids @ query_vector
+        best = int(np.argmax(scores))
+        intent, score = INTENTS[best], float(scores[best])
+        retrieval_best = max(float(scores[INTENTS.index(QA)]), float(scores[INTENTS.index(SUMMARIZE)]))
+        if intent in FAST_PATH and (score < self.min_similarity or score - retrieval_best < self.margin):
+            # Not certain enough to skip retrieval
+            intent = QA if scores[INTENTS.index(QA)] >= scores[INTENTS.index(SUMMARIZE)] else SUMMARIZE
+            score = retrieval_best
+        INTENT_ROUTES.inc(intent=intent, method="embedding")
+        if intent not in FAST_PATH:
+            return Route(intent, score)
+        # Reply of the closest example of the intent (its topic and language)
+        members = [i for i, (label, _, _) in enumerate(self._examples) if label == intent]
+        nearest = members[int(np.argmax(self._vectors[members] @ query_vector))]
+        return Route(intent, score, REPLIES[self._examples[nearest][2]])
+
+
+intent_router = IntentRouter()
@@ -1,13 +1,21 @@
-from backend.assistant.query_classifier import classify_intent
+from backend.assistant.intent_router import intent_router, SUMMARIZE, FAST_PATH
+from backend.assistant.request_coalescer import request_coalescer, coalesce_key
 from backend.qa.answer_generator import AnswerGenerator
 from backend.qa.retriever import Retriever
+from backend.embeddings.collection_manager import DEFAULT_COLLECTION
 from backend.chains.summarization_refine_chain import summarize_documents
+from backend.chains.summary_cache import summary_cache
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import Document
 from backend.utils.token_logger import token_logger
+from backend.utils.metrics import span
+from backend.utils.language_detect import detect_query_language
+from backend.utils.admission import outbound
 import os
+from typing import Any, NamedTuple
 
-MAX_HISTORY_PAIRS = 5
+MAX_HISTORY_PAIRS = int(os.getenv("MAX_HISTORY_PAIRS", "5"))
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))
 
 # Helper to truncate history and summarize if needed
 def _prepare_context(history):
@@ -31,22 +39,31 @@ def _prepare_context(history):
         try:
             llm = ChatOpenAI(model_name="gpt-4.1-nano", temperature=0, openai_api_key=os.getenv("OPENAI_API_KEY"))
             prompt = f"Summarize the following conversation between a user and an assistant. Focus on the key topics, questions, and answers discussed so far.\n\n{chat_text}\n\nSummary:"
-            response = llm.invoke(prompt)
+            with span("history_summarization"), outbound.slot("completion"):
+                response = llm.invoke(prompt)
             summary = response.content.strip() if hasattr(response, 'content') else str(response)
             # Log chat summarization token usage
-            token_logger.log_chat_summarization(chat_text, summary, "gpt-4.1-nano")
+            token_logger.log_chat_summarization(chat_text, summary, "gpt-4.1-nano",
+                                                usage=getattr(response, 'response_metadata', {}).get('token_usage'))
         except Exception:
             summary = "[Summary unavailable due to error]"
     return recent, summary
 
 def _extract_sources_from_chunks(chunks):
     sources = []
+    seen = set()
     for chunk in chunks:
         meta = chunk.get('metadata', {})
-        sources.append({
-            'document': meta.get('file_name'),
-            'page': meta.get('page_number')
-        })
+        # Deduplicated chunks list every place their text occurs
+        for location in meta.get('sources') or [meta]:
+            key = (location.get('file_name'), location.get('page_number'))
+            if key in seen:
+                continue
+            seen.add(key)
+            sources.append({
+                'document': key[0],
+                'page': key[1]
+            })
     return sources
 
 def _build_context_string(history, summary=None):
@@ -57,34 +74,124 @@ def _build_context_string(history, summary=None):
         context += f"User: {user}\nAssistant: {assistant}\n"
     return context
 
-def run_assistant(user_query, history=None):
+def _previous_qa(history):
+    """The last MAX_HISTORY_PAIRS turns as a User/Assistant transcript."""
+    prev_qa_pairs = history[-MAX_HISTORY_PAIRS:] if len(history) >= MAX_HISTORY_PAIRS else history
+    return "\n".join([f"User: {u}\nAssistant: {a}" for u, a in prev_qa_pairs])
+
+def _conversation_inputs(history):
+    """Returns (previous Q&A string, summarized older history) for the prompt."""
+    context_history, summary = _prepare_context(history)
+    return _previous_qa(history), summary or ""
+
+class _Plan(NamedTuple):
+    """A routed message: its route and, unless it was routed lexically, the retriever and query embedding."""
+    route: Any
+    retriever: Any = None
+    query_embedding: Any = None
+    language: str = 'unknown'
+
+    @property
+    def intent(self):
+        return self.route.intent
+
+def _retrieval_query(user_query, history):
+    return f"{_previous_qa(history)}\nCurrent user question: {user_query}"
+
+def _plan(user_query, history, collection=DEFAULT_COLLECTION):
+    """
+    Routes the message. The bare message (for routing) and the retrieval query
+    (with recent history) are embedded in a single request, and the retrieval
+    embedding is reused for the search of the collection's index.
+    """
+    with span("classify_intent"):
+        route = intent_router.route_text(user_query)
+    if route is not None:
+        return _Plan(route)
+    with span("retriever_init"):
+        retriever = Retriever(collection)
+    embeddings = retriever.embed_queries([user_query, _retrieval_query(user_query, history)])
+    with span("classify_intent"):
+        route = intent_router.route(user_query, None if embeddings is None else embeddings[0],
+                                    retriever.embed_queries)
+    return _Plan(route, retriever, None if embeddings is None else embeddings[1], detect_query_language(user_query))
+
+def _retrieve(plan, user_query, history, k=RETRIEVAL_K):
+    """Top-k chunks for the message: its language partition first, re-ranked against the bare question."""
+    return plan.retriever.retrieve_chunks(_retrieval_query(user_query, history), k=k, query_embedding=plan.query_embedding,
+                                          language=plan.language, rerank_query=user_query)
+
+def _reply(plan):
+    return {"type": "reply", "content": plan.route.reply, "sources": []}
+
+def run_assistant(user_query, history=None, collection=DEFAULT_COLLECTION):
     """
     Main entry point for the LangGraph assistant flow.
+    Identical concurrent requests (same normalized query and history) are
+    coalesced: only one runs and the others share its result. Chit-chat and
+    out-of-scope messages get a canned reply without retrieval or generation.
     Args:
         user_query (str): The user's query.
         history (list): List of (user, assistant) tuples.
+        collection (str): The knowledge base to answer from.
     Returns:
         dict: Structured response with type, content, and sources.
     """
     history = history or []
-    context_history, summary = _prepare_context(history)
-    # Always use the last 5 Q&A as previous Q&A
-    prev_qa_pairs = history[-MAX_HISTORY_PAIRS:] if len(history) >= MAX_HISTORY_PAIRS else history
-    prev_qa_str = "\n".join([f"User: {u}\nAssistant: {a}" for u, a in prev_qa_pairs])
-    summarized_str = summary or ""
-    intent = classify_intent(user_query)
-    if intent == 'summarize':
-        retriever = Retriever()
+    key = coalesce_key(user_query, history=history, collection=collection)
+    return request_coalescer.do(key, lambda: _run_assistant(user_query, history,
+                                                            _plan(user_query, history, collection)))
+
+def stream_assistant(user_query, history=None, collection=DEFAULT_COLLECTION):
+    """
+    Streaming variant of run_assistant, coalesced the same way.
+    Returns:
+        iterator of dict events: {"event": "delta", "content": str} for each piece
+        of the answer, then {"event": "done", "type": str, "sources": list}.
+    """
+    history = history or []
+    key = coalesce_key(user_query, history=history, collection=collection)
+    return request_coalescer.do_stream(key, lambda: _stream_assistant(user_query, history,
+                                                                      _plan(user_query, history, collection)))
+
+def _stream_assistant(user_query, history, plan):
+    if plan.intent in FAST_PATH or plan.intent == SUMMARIZE:
+        # Canned replies are complete at once; the refine chain has no useful
+        # partial output, so the final summary is streamed in one piece
+        result = _run_assistant(user_query, history, plan)
+        yield {"event": "delta", "content": result["content"]}
+        yield {"event": "done", "type": result["type"], "sources": result["sources"]}
+        return
+    prev_qa_str, summarized_str = _conversation_inputs(history)
+    chunks = _retrieve(plan, user_query, history)
+    if not chunks:
+        yield {"event": "delta", "content": "I could not find relevant information to answer your question."}
+        yield {"event": "done", "type": "answer", "sources": []}
+        return
+    answer_generator = AnswerGenerator()
+    for delta in answer_generator.stream_answer(user_query, chunks, previous_questions=prev_qa_str, summarized_history=summarized_str):
+        yield {"event": "delta", "content": delta}
+    yield {"event": "done", "type": "answer", "sources": _extract_sources_from_chunks(chunks)}
+
+def _run_assistant(user_query, history, plan):
+    if plan.intent in FAST_PATH:
+        return _reply(plan)
+    prev_qa_str, summarized_str = _conversation_inputs(history)
+    if plan.intent == SUMMARIZE:
         if ChatOpenAI is not None and summarize_documents is not None:
             llm = ChatOpenAI(model_name="gpt-4.1-nano", temperature=0, openai_api_key=os.getenv("OPENAI_API_KEY"))
-            retrieval_query = f"{prev_qa_str}\nCurrent user request: {user_query}"
-            chunks = retriever.retrieve_chunks(retrieval_query, k=5)
+            chunks = _retrieve(plan, user_query, history)
             if chunks:
-                docs = [Document(page_content=chunk['text'], metadata=chunk['metadata']) for chunk in chunks]
+                # Precomputed summaries stand in for the chunks of cached documents, so the
+                # refine chain only reads raw text for cache misses; it still runs once
+                # over everything so the result follows the request and the conversation.
+                cached_text, missed_chunks = summary_cache.assemble(chunks)
+                docs = [Document(page_content=cached_text, metadata={})] if cached_text else []
+                docs += [Document(page_content=chunk['text'], metadata=chunk['metadata']) for chunk in missed_chunks]
                 summary_prompt = f"{prev_qa_str}\nSummarized Conversation:\n{summarized_str}\nSummarize the following content based on the conversation above and the user request: {user_query}"
-                if docs:
-                    docs[0].page_content = summary_prompt + "\n" + docs[0].page_content
-                summary_text = summarize_documents(llm, docs)
+                docs[0].page_content = summary_prompt + "\n" + docs[0].page_content
+                with span("summarize"):
+                    summary_text = summarize_documents(llm, docs)
                 sources = _extract_sources_from_chunks(chunks)
             else:
                 summary_text = "I could not find relevant content to summarize."
@@ -98,10 +205,8 @@ def run_assistant(user_query, history=None):
             "sources": sources
         }
     else:
-        retriever = Retriever()
         answer_generator = AnswerGenerator()
-        retrieval_query = f"{prev_qa_str}\nCurrent user question: {user_query}"
-        chunks = retriever.retrieve_chunks(retrieval_query, k=5)
+        chunks = _retrieve(plan, user_query, history)
         if chunks:
             answer = answer_generator.generate_answer(user_query, chunks, previous_questions=prev_qa_str, summarized_history=summarized_str)
             sources = _extract_sources_from_chunks(chunks)
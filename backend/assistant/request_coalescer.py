@@ -0,0 +1,160 @@
+"""
+Single-flight coalescing of identical in-flight assistant requests.
+
+When many users ask the same question at the same moment, only the first
+request (the leader) runs retrieval and generation; concurrent identical
+requests wait for it and share its result. Streams are shared too: the
+leader's stream is pumped by a background thread into a replay buffer that
+every waiting request reads from.
+"""
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.utils.metrics import metrics, CACHE_REQUESTS
+
+
+def normalize_query(query: str) -> str:
+    """Lower-cases and collapses whitespace so trivially different queries coalesce."""
+    return " ".join((query or "").lower().split())
+
+
+def coalesce_key(query: str, intent: str = "", history: Optional[List[Tuple[str, str]]] = None,
+                 collection: str = "") -> str:
+    """Builds the coalescing key from the normalized query, intent (if known), collection and a history fingerprint."""
+    digest = hashlib.sha256()
+    digest.update(normalize_query(query).encode("utf-8"))
+    digest.update(b"\x00" + intent.encode("utf-8"))
+    digest.update(b"\x03" + collection.encode("utf-8"))
+    for user, assistant in history or []:
+        digest.update(b"\x01" + (user or "").encode("utf-8"))
+        digest.update(b"\x02" + (assistant or "").encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _Call:
+    """A single in-flight computation shared by the leader and its followers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _StreamCall:
+    """A shared stream: items are appended by a pump thread and replayed to every reader."""
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+    def pump(self, fn: Callable[[], Iterable[Any]]):
+        try:
+            for item in fn():
+                with self.cond:
+                    self.items.append(item)
+                    self.cond.notify_all()
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self.cond:
+                self.finished = True
+                self.cond.notify_all()
+
+    def read(self) -> Iterator[Any]:
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.items) and not self.finished:
+                    self.cond.wait()
+                if i < len(self.items):
+                    item = self.items[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield item
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time and shares its outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _StreamCall] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Runs `fn` unless an identical call is already in flight, in which case
+        waits for that call and returns (or raises) its outcome.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+        CACHE_REQUESTS.inc(cache="coalescer", result="miss" if leader else "hit")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def do_stream(self, key: str, fn: Callable[[], Iterable[Any]]) -> Iterator[Any]:
+        """
+        Returns an iterator over the items of `fn()`, shared with any identical
+        stream already in flight. Late joiners replay the items produced so far.
+        The source is consumed by a background thread, so a slow or disconnected
+        reader never stalls the others.
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = _StreamCall()
+                self._streams[key] = stream
+
+                def run():
+                    try:
+                        stream.pump(fn)
+                    finally:
+                        with self._lock:
+                            if self._streams.get(key) is stream:
+                                del self._streams[key]
+
+                threading.Thread(target=run, name="single-flight-stream", daemon=True).start()
+                CACHE_REQUESTS.inc(cache="coalescer", result="miss")
+            else:
+                self.coalesced += 1
+                CACHE_REQUESTS.inc(cache="coalescer", result="hit")
+        return stream.read()
+
+    def in_flight(self) -> int:
+        """Number of distinct computations currently running."""
+        with self._lock:
+            return len(self._calls) + len(self._streams)
+
+
+# Global instance for easy access
+request_coalescer = SingleFlight()
+metrics.gauge("kms_requests_in_flight", "Distinct assistant computations currently running.",
+              callback=request_coalescer.in_flight)
@@ -3,20 +3,21 @@ from langchain.schema import Document
 from langchain.chains.summarize import load_summarize_chain
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
-import sys
 import os
 
-# Add project root to the Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.utils.admission import outbound
 
 # Try to import token_logger, but don't fail if it's not available
 try:
-    from utils.token_logger import token_logger
+    from backend.utils.token_logger import token_logger, document_names
     TOKEN_LOGGING_AVAILABLE = True
 except ImportError:
     TOKEN_LOGGING_AVAILABLE = False
     print("[WARNING] Token logging not available")
 
+# Documents refined per batch; each batch is one refine chain run
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "5"))
+
 def summarize_documents(llm: ChatOpenAI, documents: List[Document]) -> str:
     """
     Generate a structured summary of legal/regulatory documents using a refine chain.
@@ -74,7 +75,7 @@ def summarize_documents(llm: ChatOpenAI, documents: List[Document]) -> str:
     )
     
     # Process in smaller batches if there are many documents
-    batch_size = 5
+    batch_size = SUMMARY_BATCH_SIZE
     total_batches = (len(documents) + batch_size - 1) // batch_size
     
     print(f"Processing in {total_batches} batches...")
@@ -84,8 +85,9 @@ def summarize_documents(llm: ChatOpenAI, documents: List[Document]) -> str:
         batch = documents[i:i + batch_size]
         print(f"\nProcessing batch {i//batch_size + 1}/{total_batches}...")
         
-        # Run the chain on this batch
-        result = chain({"input_documents": batch}, return_only_outputs=True)
+        # Run the chain on this batch (one refine step at a time, so one outbound slot)
+        with outbound.slot("summary"):
+            result = chain({"input_documents": batch}, return_only_outputs=True)
         batch_summary = result["output_text"]
         all_summaries.append(batch_summary)
         
@@ -94,7 +96,8 @@ def summarize_documents(llm: ChatOpenAI, documents: List[Document]) -> str:
             try:
                 batch_text = "\n".join([doc.page_content for doc in batch])
                 model_name = getattr(llm, 'model_name', 'gpt-4.1-nano') or 'gpt-4.1-nano'
-                token_logger.log_summarization(batch_text, batch_summary, model_name, "document_batch")
+                token_logger.log_summarization(batch_text, batch_summary, model_name, "document_batch",
+                                               document=document_names(doc.metadata for doc in batch))
             except Exception as e:
                 print(f"[TOKEN LOGGING ERROR] Could not log summarization: {e}")
         
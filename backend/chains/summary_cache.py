@@ -0,0 +1,196 @@
+"""
+Precomputed hierarchical summaries (per page-range section, then per document).
+
+Summaries are generated in the background after ingestion and stored on disk
+keyed by the SHA-256 of the source file, so the summarize intent refines them
+with the user's request instead of running the refine chain over every
+freshly retrieved chunk.
+"""
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from langchain.schema import Document
+
+from backend.chains.summarization_refine_chain import summarize_documents
+from backend.utils.metrics import metrics, CACHE_REQUESTS
+
+# --- Configuration ---
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SUMMARY_CACHE_DIR = os.path.join(project_root, 'shared', 'summaries')
+SUMMARY_MODEL = "gpt-4.1-nano"
+PAGES_PER_SECTION = 5
+
+
+def _section_bounds(page_number: int, pages_per_section: int = PAGES_PER_SECTION) -> Tuple[int, int]:
+    """Returns the (start_page, end_page) of the section containing a page."""
+    start = ((page_number - 1) // pages_per_section) * pages_per_section + 1
+    return start, start + pages_per_section - 1
+
+
+class SummaryCache:
+    """Disk-backed store of hierarchical document summaries keyed by content hash."""
+
+    def __init__(self, cache_dir: str = SUMMARY_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.cache_dir, f"{content_hash}.json")
+
+    def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored summary record for a content hash, or None."""
+        if not content_hash:
+            return None
+        record = self._records.get(content_hash)
+        if record is not None:
+            return record
+        # Another process (or the ingestion side of this one) may have written it
+        try:
+            with open(self._path(content_hash), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._records[content_hash] = record
+        return record
+
+    def put(self, content_hash: str, record: Dict[str, Any]):
+        """Stores a summary record, writing it atomically to disk."""
+        tmp_path = self._path(content_hash) + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._path(content_hash))
+        self._records[content_hash] = record
+
+    def build(self, llm, file_name: str, content_hash: str, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Summarizes one document hierarchically and stores the result.
+
+        Chunks are grouped into sections of PAGES_PER_SECTION pages, each section is
+        summarized with the refine chain, and the section summaries are summarized
+        again into a single document summary.
+        """
+        sections: Dict[Tuple[int, int], List[Document]] = {}
+        for chunk in chunks:
+            page = chunk['metadata'].get('page_number') or 1
+            bounds = _section_bounds(page)
+            sections.setdefault(bounds, []).append(
+                Document(page_content=chunk['text'], metadata=chunk['metadata'])
+            )
+
+        section_records = []
+        for (start, end) in sorted(sections):
+            section_summary = summarize_documents(llm, sections[(start, end)])
+            section_records.append({"start_page": start, "end_page": end, "summary": section_summary})
+
+        if len(section_records) > 1:
+            section_docs = [
+                Document(page_content=s["summary"], metadata={"file_name": file_name})
+                for s in section_records
+            ]
+            document_summary = summarize_documents(llm, section_docs)
+        else:
+            document_summary = section_records[0]["summary"] if section_records else ""
+
+        record = {
+            "content_hash": content_hash,
+            "file_name": file_name,
+            "model": getattr(llm, 'model_name', SUMMARY_MODEL),
+            "pages_per_section": PAGES_PER_SECTION,
+            "sections": section_records,
+            "document_summary": document_summary,
+            "created": datetime.now().isoformat(timespec='seconds'),
+        }
+        self.put(content_hash, record)
+        return record
+
+    def schedule(self, chunks: List[Dict[str, Any]], llm=None):
+        """
+        Queues background summarization for every document in `chunks` whose
+        content hash is not cached yet. Returns immediately.
+        """
+        by_hash: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk in chunks:
+            content_hash = chunk['metadata'].get('content_hash')
+            if content_hash:
+                by_hash.setdefault(content_hash, []).append(chunk)
+
+        with self._lock:
+            if self._executor is None:
+                # One worker: summaries are a background nicety, not worth competing
+                # with interactive requests for provider rate limits.
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-cache")
+            for content_hash, doc_chunks in by_hash.items():
+                if content_hash in self._pending or self.get(content_hash) is not None:
+                    continue
+                self._pending.add(content_hash)
+                file_name = doc_chunks[0]['metadata'].get('file_name')
+                self._executor.submit(self._run_job, llm, file_name, content_hash, doc_chunks)
+
+    def _run_job(self, llm, file_name: str, content_hash: str, chunks: List[Dict[str, Any]]):
+        try:
+            if llm is None:
+                from langchain.chat_models import ChatOpenAI
+                llm = ChatOpenAI(model_name=SUMMARY_MODEL, temperature=0, openai_api_key=os.getenv("OPENAI_API_KEY"))
+            print(f"Precomputing summaries for {file_name} ({len(chunks)} chunks)...")
+            self.build(llm, file_name, content_hash, chunks)
+            print(f"Stored summaries for {file_name}")
+        except Exception as e:
+            print(f"[SUMMARY CACHE ERROR] Could not summarize {file_name}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(content_hash)
+
+    def assemble(self, chunks: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Builds a summary for retrieved chunks from stored summaries.
+
+        Returns:
+            A tuple of (assembled summary text, chunks that had no stored summary).
+            When a document's retrieved pages touch more than half of its sections,
+            the document-level summary is used instead of the individual sections.
+        """
+        parts = []
+        misses = []
+        hits: Dict[str, Dict[str, Any]] = {}
+        order = []
+        for chunk in chunks:
+            meta = chunk.get('metadata', {})
+            record = self.get(meta.get('content_hash'))
+            if record is None:
+                CACHE_REQUESTS.inc(cache="summary", result="miss")
+                misses.append(chunk)
+                continue
+            CACHE_REQUESTS.inc(cache="summary", result="hit")
+            pages_per_section = record.get("pages_per_section", PAGES_PER_SECTION)
+            start, _ = _section_bounds(meta.get('page_number') or 1, pages_per_section)
+            if record["content_hash"] not in hits:
+                hits[record["content_hash"]] = {"record": record, "starts": set()}
+                order.append(record["content_hash"])
+            hits[record["content_hash"]]["starts"].add(start)
+
+        for content_hash in order:
+            record = hits[content_hash]["record"]
+            starts = hits[content_hash]["starts"]
+            sections = [s for s in record["sections"] if s["start_page"] in starts]
+            if len(record["sections"]) > 1 and len(sections) * 2 > len(record["sections"]):
+                parts.append(f"**{record['file_name']}**\n{record['document_summary']}")
+                continue
+            for s in sections:
+                parts.append(
+                    f"**{record['file_name']}** (hal. {s['start_page']}-{s['end_page']})\n{s['summary']}"
+                )
+        return "\n\n".join(parts), misses
+
+
+# Global instance for easy access
+summary_cache = SummaryCache()
+metrics.gauge("kms_summary_jobs_pending", "Documents queued for background summarization.",
+              callback=lambda: len(summary_cache._pending))
@@ -0,0 +1,226 @@
+"""
+Portable vector store bundles.
+
+A bundle is one Parquet file holding every chunk of a snapshot with its vector:
+
+    id        int64     FAISS id (position in chunks.jsonl)
+    text      string
+    metadata  string    the chunk metadata as JSON
+    vector    fixed_size_list<float32 | float16>[dimension], uncompressed
+
+written in row groups of ROW_GROUP_SIZE chunks, so neither export nor import
+holds more than one group of chunks in memory. The schema metadata carries the
+embedding model, dimension and document catalog. Exporting float16 halves the
+file; vectors are widened back to float32 on import.
+
+Importing rebuilds the FAISS index, language partitions and catalog from the
+bundle and publishes them as a new snapshot generation, so a new node or
+environment gets a working store at disk speed without any embedding calls.
+The bundle does not carry the source documents: copy them into the documents
+folder too, or a later rebuild (upload, delete, document monitor) would replace
+the imported store with whatever that folder holds. Until they are there,
+rebuilds of an imported store refuse to run (see vector_store.py --force).
+
+    python embeddings/bundle.py export store.parquet [--dtype float16] [--generation N] [--collection NAME]
+    python embeddings/bundle.py import store.parquet [--collection NAME]
+
+Requires pyarrow.
+"""
+import os
+import sys
+import json
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+# Run as a script: put the repository root on the path for backend.* imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.embeddings.snapshots import (SNAPSHOTS_DIR, INDEX_FILE, CATALOG_FILE, ChunkStore, SnapshotError,
+                                          current_snapshot, read_manifest, write_snapshot, _generation_name)
+from backend.embeddings.collection_manager import DEFAULT_COLLECTION, documents_dir, snapshots_dir, validate_collection
+
+ROW_GROUP_SIZE = 8192
+FORMAT_VERSION = "1"
+VECTOR_TYPES = ("float32", "float16")
+
+
+class BundleError(Exception):
+    """A bundle cannot be written or does not match what the importer expects."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise BundleError("Bundles require pyarrow (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _flat_vectors(index):
+    """The index storing the vectors, and the FAISS id of each stored row."""
+    import faiss
+
+    if hasattr(index, 'id_map'):
+        return faiss.downcast_index(index.index), faiss.vector_to_array(index.id_map)
+    return index, np.arange(index.ntotal, dtype=np.int64)
+
+
+def export_bundle(path: str, snapshot_dir: Optional[str] = None, dtype: str = "float32",
+                  row_group_size: int = ROW_GROUP_SIZE) -> Dict[str, Any]:
+    """
+    Writes the chunks and vectors of `snapshot_dir` (default: the published
+    snapshot) to a Parquet bundle at `path`. Returns the bundle's schema metadata.
+    """
+    import faiss
+    pa, pq = _pyarrow()
+
+    if dtype not in VECTOR_TYPES:
+        raise BundleError(f"dtype must be one of {VECTOR_TYPES}, not {dtype!r}")
+    snapshot_dir = snapshot_dir or current_snapshot()
+    if snapshot_dir is None:
+        raise SnapshotError("No snapshot published yet.")
+    manifest = read_manifest(snapshot_dir)
+    index = faiss.read_index(os.path.join(snapshot_dir, INDEX_FILE))
+    flat, ids = _flat_vectors(index)
+    store = ChunkStore(snapshot_dir)
+    if len(store) != index.ntotal:
+        raise SnapshotError(f"{snapshot_dir} has {index.ntotal} vectors but {len(store)} chunks")
+
+    catalog_path = os.path.join(snapshot_dir, CATALOG_FILE)
+    catalog = None
+    if os.path.exists(catalog_path):
+        with open(catalog_path, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    info = {"format": FORMAT_VERSION, "embedding_model": manifest.get("embedding_model"),
+            "dimension": int(index.d), "vectors": int(index.ntotal), "dtype": dtype,
+            "generation": manifest.get("generation"), "catalog": catalog}
+    schema = pa.schema([("id", pa.int64()), ("text", pa.string()), ("metadata", pa.string()),
+                        ("vector", pa.list_(pa.from_numpy_dtype(np.dtype(dtype)), int(index.d)))],
+                       metadata={"kms_bundle": json.dumps(info, ensure_ascii=False)})
+
+    tmp_path = f"{path}.part"
+    try:
+        # Vectors do not compress; only the text columns are worth the CPU
+        with pq.ParquetWriter(tmp_path, schema, use_dictionary=False,
+                              compression={"id": "zstd", "text": "zstd", "metadata": "zstd",
+                                           "vector": "none"}) as writer:
+            for start in range(0, index.ntotal, row_group_size):
+                count = min(row_group_size, index.ntotal - start)
+                batch_ids = ids[start:start + count]
+                chunks = [store.get(int(i)) for i in batch_ids]
+                vectors = flat.reconstruct_n(start, count).astype(dtype, copy=False)
+                table = pa.Table.from_arrays([
+                    pa.array(batch_ids, type=pa.int64()),
+                    pa.array([chunk['text'] for chunk in chunks], type=pa.string()),
+                    pa.array([json.dumps(chunk.get('metadata', {}), ensure_ascii=False) for chunk in chunks],
+                             type=pa.string()),
+                    pa.FixedSizeListArray.from_arrays(pa.array(vectors.reshape(-1)), int(index.d)),
+                ], schema=schema)
+                writer.write_table(table, row_group_size=row_group_size)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return info
+
+
+def read_bundle_info(path: str) -> Dict[str, Any]:
+    """The schema metadata of a bundle (model, dimension, vector count, catalog)."""
+    _, pq = _pyarrow()
+    metadata = pq.read_schema(path).metadata or {}
+    if b"kms_bundle" not in metadata:
+        raise BundleError(f"{path} is not a vector store bundle")
+    return json.loads(metadata[b"kms_bundle"])
+
+
+def _batches(path: str, columns, batch_size: int = ROW_GROUP_SIZE):
+    _, pq = _pyarrow()
+    bundle = pq.ParquetFile(path, memory_map=True)
+    return bundle.iter_batches(batch_size=batch_size, columns=columns)
+
+
+def _bundle_chunks(path: str) -> Iterator[Dict[str, Any]]:
+    """The bundle's chunks in FAISS id order (checked by `import_bundle`)."""
+    for batch in _batches(path, ["text", "metadata"]):
+        for text, metadata in zip(batch.column("text").to_pylist(), batch.column("metadata").to_pylist()):
+            yield {"text": text, "metadata": json.loads(metadata)}
+
+
+def import_bundle(path: str, root: str = SNAPSHOTS_DIR,
+                  expected_model: Optional[str] = None) -> str:
+    """
+    Builds the FAISS index and language partitions from the bundle at `path` and
+    publishes them with its chunks and catalog as a new snapshot under `root`.
+    Raises BundleError if the bundle was embedded with a model other than
+    `expected_model`. Returns the snapshot directory.
+    """
+    import faiss
+    from backend.embeddings.vector_store import build_language_partitions
+
+    info = read_bundle_info(path)
+    if expected_model and info.get("embedding_model") not in (None, expected_model):
+        raise BundleError(f"{path} was embedded with {info['embedding_model']}, not {expected_model}")
+    dimension, total = int(info["dimension"]), int(info["vectors"])
+
+    # One float32 matrix for the whole store (the flat index needs it anyway); the
+    # bundle itself is memory-mapped and read one row group at a time.
+    vectors = np.empty((total, dimension), dtype=np.float32)
+    languages = []
+    filled = 0
+    for batch in _batches(path, ["id", "metadata", "vector"]):
+        ids = batch.column("id").to_numpy()
+        if not np.array_equal(ids, np.arange(filled, filled + len(ids))) or filled + len(ids) > total:
+            raise BundleError(f"{path}: chunk ids are not consecutive from {filled}")
+        flat = batch.column("vector").flatten().to_numpy(zero_copy_only=False)
+        vectors[filled:filled + len(ids)] = flat.reshape(len(ids), dimension)
+        languages.extend(json.loads(metadata).get('language', 'unknown')
+                         for metadata in batch.column("metadata").to_pylist())
+        filled += len(ids)
+    if filled != total:
+        raise BundleError(f"{path} declares {total} vectors but holds {filled}")
+
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(dimension))
+    index.add_with_ids(vectors, np.arange(total, dtype=np.int64)) # type: ignore
+    partitions = build_language_partitions(vectors, [{"metadata": {"language": lang}} for lang in languages])
+    return write_snapshot(index, _bundle_chunks(path), root=root,
+                          info={"embedding_model": info.get("embedding_model"),
+                                "imported_from": os.path.basename(path)},
+                          catalog=info.get("catalog"), partitions=partitions)
+
+
+if __name__ == '__main__':
+    import time
+    import argparse
+    parser = argparse.ArgumentParser(description="Export or import the vector store as a Parquet bundle.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="Bundle file")
+    parser.add_argument("--dtype", choices=VECTOR_TYPES, default="float32", help="Vector type (export)")
+    parser.add_argument("--generation", type=int, help="Snapshot generation to export (default: current)")
+    parser.add_argument("--collection", type=validate_collection, default=DEFAULT_COLLECTION,
+                        help="Collection to export or import into (default: %(default)s)")
+    args = parser.parse_args()
+    root = snapshots_dir(args.collection)
+    start = time.perf_counter()
+    try:
+        if args.command == "export":
+            snapshot_dir = (os.path.join(root, _generation_name(args.generation))
+                            if args.generation is not None else current_snapshot(root))
+            if snapshot_dir is None:
+                # export_bundle() would fall back to the default collection's snapshot
+                raise SnapshotError(f"Collection '{args.collection}' has no published snapshot.")
+            info = export_bundle(args.path, snapshot_dir, dtype=args.dtype)
+            print(f"Exported {info['vectors']} chunks ({info['dtype']}) to {args.path} "
+                  f"in {time.perf_counter() - start:.1f}s")
+        else:
+            from backend.embeddings.vector_store import EMBEDDING_MODEL
+            snapshot_dir = import_bundle(args.path, root=root, expected_model=EMBEDDING_MODEL)
+            # A collection exists once its documents folder does (see collection_manager.py)
+            os.makedirs(documents_dir(args.collection), exist_ok=True)
+            manifest = read_manifest(snapshot_dir)
+            print(f"Imported {manifest['vectors']} chunks as generation {manifest['generation']} "
+                  f"in {time.perf_counter() - start:.1f}s")
+    except (BundleError, SnapshotError) as e:
+        raise SystemExit(str(e))
@@ -0,0 +1,202 @@
+"""
+Document catalog.
+
+Ingestion records one entry per document in the snapshot it publishes
+(`catalog.json`): content hash, size, pages, chunk and token counts, embedding
+cost and status. `indexed` means searchable; `no_text` means nothing could be
+extracted (e.g. a scanned PDF); `failed` means extraction raised an error. The API
+serves `/api/documents` and `/api/health` from `DocumentCatalog`, an in-memory
+copy of the published catalog merged with the documents folder, with precomputed
+sort orders: files not ingested yet are listed as `pending`, and entries whose
+file is gone are dropped. A request costs no directory scan; the published
+generation and the folder's mtime are re-checked at most once per
+`refresh_interval` seconds, and the folder is listed again only when one changed.
+"""
+import os
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.embeddings.snapshots import SNAPSHOTS_DIR, CATALOG_FILE, current_generation, current_snapshot
+
+INDEXED, NO_TEXT, FAILED, PENDING = "indexed", "no_text", "failed", "pending"
+
+SORT_KEYS = {
+    "modified": lambda d: d["mtime"],
+    "name": lambda d: d["name"].lower(),
+    "size": lambda d: d["size"],
+    "pages": lambda d: d["pages"],
+    "chunks": lambda d: d["chunks"],
+    "tokens": lambda d: d["tokens"],
+    "cost": lambda d: d["embedding_cost"],
+    "status": lambda d: d["status"],
+}
+
+
+def catalog_entries(file_stats: Dict[str, Dict[str, Any]], all_chunks: List[Dict[str, Any]],
+                    indexed_chunks: List[Dict[str, Any]], embedding_cost: Callable[[int], float]) -> List[Dict[str, Any]]:
+    """
+    Builds catalog entries from the loader's per-file stats and the chunks before
+    (`all_chunks`) and after deduplication (`indexed_chunks`). Tokens and cost count
+    only the chunks actually embedded for the document.
+    """
+    chunks, tokens, embedded = defaultdict(int), defaultdict(int), defaultdict(int)
+    for chunk in all_chunks:
+        meta = chunk['metadata']
+        chunks[meta['file_name']] += 1
+        tokens[meta['file_name']] += meta.get('token_count') or 0
+    for chunk in indexed_chunks:
+        meta = chunk['metadata']
+        embedded[meta['file_name']] += meta.get('token_count') or 0
+    entries = []
+    for name, stats in file_stats.items():
+        status = FAILED if stats.get("error") else INDEXED if chunks[name] else NO_TEXT
+        entries.append({
+            "name": name,
+            "type": os.path.splitext(name)[1][1:].lower(),
+            "size": stats["size"],
+            "mtime": stats["mtime"],
+            "content_hash": stats.get("content_hash"),
+            "pages": stats.get("pages", 0),
+            "chunks": chunks[name],
+            "tokens": tokens[name],
+            "embedded_tokens": embedded[name],
+            "embedding_cost": round(embedding_cost(embedded[name]), 8),
+            "status": status,
+            "error": stats.get("error"),
+        })
+    return entries
+
+
+def _pending_entry(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    name = os.path.basename(path)
+    return {"name": name, "type": os.path.splitext(name)[1][1:].lower(), "size": stat.st_size,
+            "mtime": stat.st_mtime, "content_hash": None, "pages": 0, "chunks": 0, "tokens": 0,
+            "embedded_tokens": 0, "embedding_cost": 0.0, "status": PENDING, "error": None}
+
+
+class DocumentCatalog:
+    """
+    In-memory view of the published catalog merged with `documents_dir` (if given),
+    rebuilt when a new generation is published or the folder's listing changes.
+    """
+
+    def __init__(self, root: str = SNAPSHOTS_DIR, documents_dir: Optional[str] = None,
+                 extensions: Tuple[str, ...] = ('.pdf', '.txt', '.docx'), refresh_interval: float = 1.0):
+        self.root = root
+        self.documents_dir = documents_dir
+        self.extensions = extensions
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._key = object()  # (generation, folder mtime) the view was built from
+        self._generation: Optional[int] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._by_hash: Dict[str, Dict[str, Any]] = {}
+        self._status_counts: Counter = Counter()
+        self._orders: Dict[str, List[Dict[str, Any]]] = {}
+        self._published: Tuple[Optional[str], Optional[int], Dict[str, Dict[str, Any]]] = (None, None, {})
+
+    def _version(self) -> Tuple[Optional[int], Optional[int]]:
+        try:
+            listed = os.stat(self.documents_dir).st_mtime_ns if self.documents_dir else None
+        except OSError:
+            listed = None
+        return current_generation(self.root), listed
+
+    def _load_published(self) -> Tuple[Optional[int], Dict[str, Dict[str, Any]]]:
+        """(generation, entries by name) of the published catalog; read once per generation."""
+        snapshot = current_snapshot(self.root)
+        if snapshot != self._published[0]:
+            generation, entries = None, []
+            if snapshot is not None:
+                try:
+                    with open(os.path.join(snapshot, CATALOG_FILE), 'r', encoding='utf-8') as f:
+                        generation, entries = current_generation(self.root), json.load(f)
+                except FileNotFoundError:
+                    pass  # published before the catalog existed
+            self._published = (snapshot, generation, {entry["name"]: entry for entry in entries})
+        return self._published[1], self._published[2]
+
+    def _load(self) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        generation, by_name = self._load_published()
+        if not self.documents_dir:
+            return generation, list(by_name.values())
+        if not os.path.isdir(self.documents_dir):
+            return generation, []
+        entries = []
+        for name in os.listdir(self.documents_dir):
+            if not name.lower().endswith(self.extensions):
+                continue
+            entry = by_name.get(name)
+            if entry is None:
+                try:
+                    entry = _pending_entry(os.path.join(self.documents_dir, name))
+                except OSError:
+                    continue  # deleted since the listing
+            entries.append(entry)
+        return generation, entries
+
+    def refresh(self, force: bool = False):
+        """Rebuilds the view if it is out of date; `force` skips the interval and rebuilds it regardless."""
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked < self.refresh_interval:
+                return
+            self._checked = now
+            key = self._version()
+            if not force and key == self._key:
+                return
+            generation, entries = self._load()
+            for entry in entries:
+                entry["generation"] = None if entry["status"] == PENDING else generation
+            self._orders = {sort: sorted(entries, key=SORT_KEYS[sort]) for sort in SORT_KEYS}
+            self._by_name = {entry["name"]: entry for entry in entries}
+            # First document per content hash whose ingestion finished (failed ones are retried)
+            self._by_hash = {}
+            for entry in self._orders["name"]:
+                if entry.get("content_hash") and entry["status"] in (INDEXED, NO_TEXT):
+                    self._by_hash.setdefault(entry["content_hash"], entry)
+            self._status_counts = Counter(entry["status"] for entry in entries)
+            self._entries = entries
+            self._generation = generation
+            self._key = key
+
+    @property
+    def generation(self) -> Optional[int]:
+        self.refresh()
+        return self._generation
+
+    def count(self, status: Optional[str] = None) -> int:
+        self.refresh()
+        return len(self._entries) if status is None else self._status_counts[status]
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        return self._by_name.get(name)
+
+    def find_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """The ingested document with this content hash, if any."""
+        self.refresh()
+        return self._by_hash.get(content_hash)
+
+    def page(self, offset: int = 0, limit: Optional[int] = None, sort: str = "modified",
+             descending: bool = True) -> Tuple[int, List[Dict[str, Any]]]:
+        """(total, entries[offset:offset + limit]) in the requested order."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key '{sort}'. Use one of: {', '.join(SORT_KEYS)}")
+        self.refresh()
+        ordered = self._orders.get(sort, [])
+        total = len(ordered)
+        if descending:
+            start = max(0, total - offset - (limit if limit is not None else total))
+            window = ordered[start:max(0, total - offset)][::-1]
+        else:
+            window = ordered[offset:offset + limit if limit is not None else None]
+        return total, window
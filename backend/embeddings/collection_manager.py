@@ -0,0 +1,165 @@
+"""
+Named collections (separate knowledge bases) and an LRU of loaded indexes.
+
+A collection has its own documents folder and snapshot root:
+
+    default   shared/documents/             embeddings/snapshots/
+    <name>    shared/collections/<name>/    embeddings/collections/<name>/
+
+so every collection is built, published and rolled back on its own (see
+snapshots.py). The `default` collection is the pre-existing single store.
+
+`CollectionManager` loads a collection's index, partitions and chunks on its
+first query and keeps loaded collections in LRU order under a memory budget
+(COLLECTION_MEMORY_MB, measured as the size of their index and chunk files).
+Loading one that does not fit evicts the least recently used ones; the
+most recently used collection is always kept, even if it alone exceeds the
+budget. A newly published generation of a loaded collection replaces it on the
+next query. Requests still using an evicted store keep it alive until they finish.
+"""
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from backend.embeddings.snapshots import SNAPSHOTS_DIR, MANIFEST_FILE
+from backend.utils.metrics import metrics
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_COLLECTION = "default"
+DEFAULT_DOCUMENTS_DIR = os.path.join(project_root, 'shared', 'documents')
+COLLECTION_DOCUMENTS_DIR = os.path.join(project_root, 'shared', 'collections')
+COLLECTION_SNAPSHOTS_DIR = os.path.join(project_root, 'backend', 'embeddings', 'collections')
+MEMORY_BUDGET_BYTES = int(float(os.getenv("COLLECTION_MEMORY_MB", "2048")) * 1024 * 1024)
+
+_NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+LOADS = metrics.counter(
+    "kms_collection_loads_total", "Collection indexes loaded (first use, new generation or after eviction).",
+    ("collection",))
+EVICTIONS = metrics.counter(
+    "kms_collection_evictions_total", "Loaded collections evicted to stay within COLLECTION_MEMORY_MB.",
+    ("collection",))
+LOAD_SECONDS = metrics.histogram(
+    "kms_collection_load_seconds", "Time to load a collection's index and chunks.", ("collection",))
+
+
+class CollectionError(ValueError):
+    """The collection name is invalid."""
+
+
+def validate_collection(name: Optional[str]) -> str:
+    """The collection name (default when empty); raises CollectionError if it is not a valid name."""
+    name = (name or DEFAULT_COLLECTION).strip().lower()
+    if not _NAME.match(name):
+        raise CollectionError(f"Invalid collection name {name!r}: use 1-64 letters, digits, '-' or '_'")
+    return name
+
+
+def documents_dir(name: str) -> str:
+    return DEFAULT_DOCUMENTS_DIR if name == DEFAULT_COLLECTION else os.path.join(COLLECTION_DOCUMENTS_DIR, name)
+
+
+def snapshots_dir(name: str) -> str:
+    return SNAPSHOTS_DIR if name == DEFAULT_COLLECTION else os.path.join(COLLECTION_SNAPSHOTS_DIR, name)
+
+
+def collection_exists(name: str) -> bool:
+    """The default collection always exists; another one once its documents folder does."""
+    return name == DEFAULT_COLLECTION or os.path.isdir(documents_dir(name))
+
+
+def list_collections() -> List[str]:
+    names = {DEFAULT_COLLECTION}
+    if os.path.isdir(COLLECTION_DOCUMENTS_DIR):
+        names.update(name for name in os.listdir(COLLECTION_DOCUMENTS_DIR)
+                     if _NAME.match(name) and os.path.isdir(os.path.join(COLLECTION_DOCUMENTS_DIR, name)))
+    return sorted(names)
+
+
+def file_signature(path: str) -> tuple:
+    """Changes when the file (or, for a snapshot directory, its manifest) is rewritten."""
+    stat = os.stat(os.path.join(path, MANIFEST_FILE) if os.path.isdir(path) else path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class _Entry(NamedTuple):
+    signature: Hashable
+    store: Any
+    nbytes: int
+
+
+class CollectionManager:
+    """
+    LRU of loaded collections under a byte budget. `locate(name)` returns the
+    paths of the collection's published store (None if it has none yet) and
+    `load(paths)` opens them, returning (store, resident bytes).
+    """
+
+    def __init__(self, locate: Callable[[str], Optional[Tuple[str, ...]]],
+                 load: Callable[[Tuple[str, ...]], Tuple[Any, int]],
+                 budget_bytes: int = MEMORY_BUDGET_BYTES):
+        self._locate = locate
+        self._load = load
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def _lookup(self, name: str, signature: Hashable) -> Optional[Any]:
+        entry = self._entries.get(name)
+        if entry is None or entry.signature != signature:
+            return None
+        self._entries.move_to_end(name)
+        return entry.store
+
+    def get(self, name: str) -> Any:
+        """The loaded store of collection `name`; raises FileNotFoundError if it has not been built."""
+        paths = self._locate(name)
+        if paths is None:
+            raise FileNotFoundError(f"No vector store has been built for collection '{name}' yet")
+        signature = (paths, tuple(file_signature(path) for path in paths))
+        with self._lock:
+            store = self._lookup(name, signature)
+            if store is not None:
+                return store
+            loading = self._loading.setdefault(name, threading.Lock())
+        # One load per collection at a time; other collections stay available meanwhile
+        with loading:
+            with self._lock:
+                store = self._lookup(name, signature)
+                if store is not None:
+                    return store
+            start = time.perf_counter()
+            store, nbytes = self._load(paths)
+            LOAD_SECONDS.observe(time.perf_counter() - start, collection=name)
+            LOADS.inc(collection=name)
+            with self._lock:
+                self._entries.pop(name, None)
+                self._entries[name] = _Entry(signature, store, nbytes)
+                self._evict_over_budget()
+        return store
+
+    def _evict_over_budget(self):
+        while len(self._entries) > 1 and sum(e.nbytes for e in self._entries.values()) > self.budget_bytes:
+            name, _ = self._entries.popitem(last=False)
+            EVICTIONS.inc(collection=name)
+            print(f"Evicted collection '{name}' to stay within {self.budget_bytes // (1024 * 1024)} MB")
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            return self._entries.pop(name, None) is not None
+
+    def resident(self) -> List[Dict[str, Any]]:
+        """Loaded collections, least recently used first."""
+        with self._lock:
+            return [{"collection": name, "bytes": entry.nbytes} for name, entry in self._entries.items()]
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def resident_count(self) -> int:
+        return len(self._entries)
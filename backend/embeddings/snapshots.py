@@ -0,0 +1,318 @@
+"""
+Versioned vector store snapshots.
+
+Every build is written to its own generation directory under
+`embeddings/snapshots/`:
+
+    gen-000007/
+        index.faiss     FAISS index (ids are positions in chunks.jsonl)
+        chunks.jsonl    one {"text", "metadata"} record per line
+        offsets.npy     int64 byte offsets of each line (n + 1 entries)
+        index-id.faiss  per-language partitions (optional, same ids as index.faiss)
+        catalog.json    per-document ingestion stats (see embeddings/catalog.py)
+        manifest.json   generation, counts and the sha256 of every file
+
+The directory is complete (fsynced, checksummed) before `CURRENT` is switched to
+it with an atomic rename, so readers always see a matching index/chunk pair and a
+failed build leaves the published one untouched. Older generations are kept for
+rollback, which is just another pointer switch.
+
+Both files load without parsing: the index is memory-mapped by the retriever and
+`ChunkStore` maps chunks.jsonl and offsets.npy, decoding a record only when a
+search returns it. Cold starts and rollbacks therefore cost milliseconds.
+
+    python embeddings/snapshots.py list
+    python embeddings/snapshots.py verify [GENERATION]
+    python embeddings/snapshots.py rollback [GENERATION]
+"""
+import os
+import re
+import json
+import mmap
+import time
+import shutil
+import hashlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOTS_DIR = os.path.join(project_root, 'embeddings', 'snapshots')
+# Generations kept besides the current one (rollback depth)
+KEEP_GENERATIONS = int(os.getenv("SNAPSHOT_KEEP", "3"))
+
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+INDEX_FILE = 'index.faiss'
+CHUNKS_FILE = 'chunks.jsonl'
+OFFSETS_FILE = 'offsets.npy'
+CATALOG_FILE = 'catalog.json'
+PARTITION_FILE = 'index-{}.faiss'
+DATA_FILES = (INDEX_FILE, CHUNKS_FILE, OFFSETS_FILE)
+
+_GENERATION_DIR = re.compile(r'^gen-(\d{6,})$')
+_STALE_TMP_SECONDS = 3600
+
+
+class SnapshotError(Exception):
+    """A snapshot is missing, incomplete or fails its checksums."""
+
+
+def _generation_name(generation: int) -> str:
+    return f"gen-{generation:06d}"
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fsync_path(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # directories cannot be fsynced on every platform
+    finally:
+        os.close(fd)
+
+
+def list_generations(root: str = SNAPSHOTS_DIR) -> List[int]:
+    """Complete generations on disk, oldest first."""
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(_GENERATION_DIR.match, names) if m)
+
+
+def current_generation(root: str = SNAPSHOTS_DIR) -> Optional[int]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            match = _GENERATION_DIR.match(f.read().strip())
+    except FileNotFoundError:
+        return None
+    return int(match.group(1)) if match else None
+
+
+def current_snapshot(root: str = SNAPSHOTS_DIR) -> Optional[str]:
+    """Directory of the published generation, or None if nothing was published."""
+    generation = current_generation(root)
+    if generation is None:
+        return None
+    path = os.path.join(root, _generation_name(generation))
+    return path if os.path.isdir(path) else None
+
+
+def read_manifest(snapshot_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"{snapshot_dir}: unreadable manifest ({e})")
+
+
+def verify_snapshot(snapshot_dir: str) -> Dict[str, Any]:
+    """Checks every file against the manifest; returns the manifest or raises SnapshotError."""
+    manifest = read_manifest(snapshot_dir)
+    for name, expected in manifest.get("files", {}).items():
+        path = os.path.join(snapshot_dir, name)
+        if not os.path.exists(path) or os.path.getsize(path) != expected["bytes"]:
+            raise SnapshotError(f"{snapshot_dir}: {name} is missing or has the wrong size")
+        if _sha256(path) != expected["sha256"]:
+            raise SnapshotError(f"{snapshot_dir}: {name} fails its checksum")
+    return manifest
+
+
+def _write_chunks(chunks: Iterable[Dict[str, Any]], directory: str) -> int:
+    offsets = [0]
+    with open(os.path.join(directory, CHUNKS_FILE), 'wb') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False).encode('utf-8') + b'\n')
+            offsets.append(f.tell())
+        f.flush()
+        os.fsync(f.fileno())
+    np.save(os.path.join(directory, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+    return len(offsets) - 1
+
+
+def publish(generation: int, root: str = SNAPSHOTS_DIR):
+    """Atomically points CURRENT at `generation`."""
+    tmp_path = os.path.join(root, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(_generation_name(generation))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+    _fsync_path(root)
+
+
+def write_snapshot(index, chunks: Iterable[Dict[str, Any]], root: str = SNAPSHOTS_DIR,
+                   info: Optional[Dict[str, Any]] = None, keep: int = KEEP_GENERATIONS,
+                   catalog: Optional[List[Dict[str, Any]]] = None,
+                   partitions: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Writes `index` and its chunks (chunk i has FAISS id i), plus the optional
+    document `catalog` and per-language partition indexes (language -> index
+    over a subset of the same ids), as a new generation, publishes it and prunes
+    old generations. Returns the snapshot directory.
+    """
+    import faiss
+
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = os.path.join(root, f".tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(tmp_dir)
+    try:
+        faiss.write_index(index, os.path.join(tmp_dir, INDEX_FILE))
+        count = _write_chunks(chunks, tmp_dir)
+        if count != index.ntotal:
+            raise SnapshotError(f"index has {index.ntotal} vectors but {count} chunks were written")
+        names = DATA_FILES
+        for language, partition in (partitions or {}).items():
+            faiss.write_index(partition, os.path.join(tmp_dir, PARTITION_FILE.format(language)))
+            names += (PARTITION_FILE.format(language),)
+        if catalog is not None:
+            with open(os.path.join(tmp_dir, CATALOG_FILE), 'w', encoding='utf-8') as f:
+                json.dump(catalog, f, ensure_ascii=False)
+            names += (CATALOG_FILE,)
+        files = {}
+        for name in names:
+            path = os.path.join(tmp_dir, name)
+            _fsync_path(path)
+            files[name] = {"sha256": _sha256(path), "bytes": os.path.getsize(path)}
+        manifest = dict(info or {}, vectors=int(index.ntotal), dimension=int(index.d), created=time.time(),
+                        partitions={language: int(p.ntotal) for language, p in (partitions or {}).items()},
+                        files=files)
+
+        # Claim the next generation number; a concurrent writer that got there
+        # first makes the rename fail, so move on to the following number.
+        while True:
+            generation = (list_generations(root) or [0])[-1] + 1
+            manifest["generation"] = generation
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            final_dir = os.path.join(root, _generation_name(generation))
+            try:
+                os.rename(tmp_dir, final_dir)
+                break
+            except OSError:
+                if not os.path.isdir(final_dir):
+                    raise
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    _fsync_path(root)
+    publish(generation, root)
+    prune(root, keep)
+    return final_dir
+
+
+def rollback(generation: Optional[int] = None, root: str = SNAPSHOTS_DIR) -> int:
+    """
+    Re-publishes `generation` (default: the newest one older than CURRENT) after
+    verifying its checksums. Returns the generation now current.
+    """
+    generations = list_generations(root)
+    current = current_generation(root)
+    if generation is None:
+        older = [g for g in generations if current is None or g < current]
+        if not older:
+            raise SnapshotError("no older generation to roll back to")
+        generation = older[-1]
+    if generation not in generations:
+        raise SnapshotError(f"generation {generation} does not exist")
+    verify_snapshot(os.path.join(root, _generation_name(generation)))
+    publish(generation, root)
+    return generation
+
+
+def prune(root: str = SNAPSHOTS_DIR, keep: int = KEEP_GENERATIONS):
+    """Deletes all but the newest `keep` generations besides the current one, and stale temp dirs."""
+    current = current_generation(root)
+    older = [g for g in list_generations(root) if current is None or g < current]
+    for generation in older[:max(0, len(older) - keep)]:
+        # Readers that still map these files keep them alive until they are done
+        shutil.rmtree(os.path.join(root, _generation_name(generation)), ignore_errors=True)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith('.tmp-') and time.time() - os.path.getmtime(path) > _STALE_TMP_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def describe(root: str = SNAPSHOTS_DIR) -> List[Dict[str, Any]]:
+    """Manifest summary of every generation, newest first."""
+    current = current_generation(root)
+    rows = []
+    for generation in reversed(list_generations(root)):
+        try:
+            manifest = read_manifest(os.path.join(root, _generation_name(generation)))
+        except SnapshotError:
+            manifest = {}
+        rows.append({"generation": generation, "current": generation == current,
+                     "vectors": manifest.get("vectors"), "created": manifest.get("created")})
+    return rows
+
+
+def partition_paths(snapshot_dir: str) -> Dict[str, str]:
+    """Language -> partition index path for a snapshot (empty for older snapshots)."""
+    try:
+        partitions = read_manifest(snapshot_dir).get("partitions") or {}
+    except SnapshotError:
+        return {}
+    return {language: os.path.join(snapshot_dir, PARTITION_FILE.format(language)) for language in partitions}
+
+
+class ChunkStore:
+    """
+    Read-only view of a snapshot's chunks. Both files are memory-mapped, so opening
+    is constant-time and worker processes share the pages; `get` decodes one record.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        self.path = snapshot_dir
+        self._offsets = np.load(os.path.join(snapshot_dir, OFFSETS_FILE), mmap_mode='r')
+        self._file = open(os.path.join(snapshot_dir, CHUNKS_FILE), 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def get(self, key, default=None) -> Optional[Dict[str, Any]]:
+        """The chunk with FAISS id `key` (int or str, like the old metadata.json keys)."""
+        try:
+            i = int(key)
+        except (TypeError, ValueError):
+            return default
+        if not 0 <= i < len(self):
+            return default
+        return json.loads(self._data[int(self._offsets[i]):int(self._offsets[i + 1])])
+
+    def chunks(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self.get(i)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect, verify and roll back vector store snapshots.")
+    parser.add_argument("command", choices=("list", "verify", "rollback"))
+    parser.add_argument("generation", nargs="?", type=int, help="Generation (default: current / previous)")
+    args = parser.parse_args()
+    if args.command == "list":
+        for row in describe():
+            created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row["created"])) if row["created"] else "?"
+            print(f"{'*' if row['current'] else ' '} {row['generation']:6d}  {row['vectors']} vectors  {created}")
+    elif args.command == "verify":
+        generation = args.generation if args.generation is not None else current_generation()
+        if generation is None:
+            raise SystemExit("No snapshot published yet.")
+        manifest = verify_snapshot(os.path.join(SNAPSHOTS_DIR, _generation_name(generation)))
+        print(f"Generation {generation} OK ({manifest['vectors']} vectors)")
+    else:
+        print(f"CURRENT -> generation {rollback(args.generation)}")
@@ -4,24 +4,39 @@ import numpy as np
 import faiss
 from openai import OpenAI
 import sys
+from typing import Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env
 load_dotenv()
 
 
-# Add project root to the Python path
+# Run as a script: put the repository root on the path for backend.* imports
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.append(project_root)
+sys.path.append(os.path.dirname(project_root))
 
-from ingest.pdf_loader import load_and_chunk_pdfs
-from utils.token_logger import token_logger
+from backend.ingest.pdf_loader import load_and_chunk_documents
+from backend.ingest.chunker import count_tokens
+from backend.ingest.dedup import deduplicate_chunks, DEFAULT_THRESHOLD
+from backend.embeddings.snapshots import (write_snapshot, SNAPSHOTS_DIR, CATALOG_FILE, SnapshotError,
+                                          current_snapshot, read_manifest)
+from backend.embeddings.catalog import catalog_entries
+from backend.embeddings.collection_manager import (DEFAULT_COLLECTION, documents_dir, snapshots_dir,
+                                                   validate_collection)
+from backend.utils.token_logger import token_logger
+from backend.utils.metrics import span
+from backend.utils.admission import outbound
 
 # --- Configuration ---
 EMBEDDING_MODEL = "text-embedding-3-large"
-FAISS_INDEX_PATH = os.path.join(project_root, 'embeddings', 'index.faiss')
-METADATA_PATH = os.path.join(project_root, 'embeddings', 'metadata.json')
-DOCUMENTS_DIR = os.path.join(project_root, 'documents')
+EMBEDDING_DIMENSIONS = 3072
+# Chunks at least this similar (estimated Jaccard over word 5-grams) are indexed once; 0 disables
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", str(DEFAULT_THRESHOLD)))
+# Uploads and the document monitor use the shared folder at the repository root
+DOCUMENTS_DIR = os.path.join(os.path.dirname(project_root), 'shared', 'documents')
+
+class IndexBuildError(Exception):
+    """The vector store could not be built; the published snapshot is left as it was."""
 
 def get_openai_client():
     """Initializes and returns the OpenAI client, checking for API key."""
@@ -30,56 +45,79 @@ def get_openai_client():
         raise ValueError("OPENAI_API_KEY environment variable not set.")
     return OpenAI(api_key=api_key)
 
+def _split_tokens(per_document, total=None):
+    """
+    Splits a batch's input tokens by source document. Without a provider `total` these
+    are the chunker's counts; with one, the total is shared out in the same proportions.
+    """
+    if total is None:
+        return per_document
+    counted = sum(per_document.values()) or 1
+    shares = {document: total * tokens // counted for document, tokens in per_document.items()}
+    # Rounding remainder goes to the largest share so the parts add up to the total
+    largest = max(shares, key=shares.get)
+    shares[largest] += total - sum(shares.values())
+    return shares
+
 def embed_chunks(chunks):
     """
-    Generates embeddings for a list of text chunks using OpenAI, batching requests to stay under the 300,000 token limit using tiktoken for accurate counting.
+    Generates embeddings for a list of text chunks using OpenAI, batching requests to stay under the 300,000 token limit.
+    Token counts come from each chunk's `token_count` metadata (set by the chunker); only chunks without one are
+    tokenized, in a single batched encode.
     """
-    import tiktoken
     client = get_openai_client()
     texts = [chunk['text'] for chunk in chunks]
     max_tokens_per_request = 300000
 
-    # Use tiktoken for the OpenAI embedding model
-    try:
-        encoding = tiktoken.encoding_for_model(EMBEDDING_MODEL)
-    except Exception:
-        encoding = tiktoken.get_encoding("cl100k_base")
+    token_counts = [chunk.get('metadata', {}).get('token_count') for chunk in chunks]
+    missing = [i for i, tokens in enumerate(token_counts) if tokens is None]
+    if missing:
+        for i, tokens in zip(missing, count_tokens([texts[i] for i in missing])):
+            token_counts[i] = tokens
 
-    def count_tokens(text):
-        return len(encoding.encode(text))
+    file_names = [chunk.get('metadata', {}).get('file_name') for chunk in chunks]
 
     batches = []
+    batch_tokens = []  # per batch: {file_name: tokens}
     current_batch = []
-    current_tokens = 0
-    for text in texts:
-        tokens = count_tokens(text)
+    current_tokens = {}
+    for text, tokens, file_name in zip(texts, token_counts, file_names):
         if tokens > max_tokens_per_request:
             print(f"Warning: A single chunk exceeds the max token limit and will be processed alone (length: {tokens} tokens).")
             if current_batch:
                 batches.append(current_batch)
+                batch_tokens.append(current_tokens)
                 current_batch = []
-                current_tokens = 0
+                current_tokens = {}
             batches.append([text])
+            batch_tokens.append({file_name: tokens})
             continue
-        if current_tokens + tokens > max_tokens_per_request:
+        if sum(current_tokens.values()) + tokens > max_tokens_per_request:
             if current_batch:
                 batches.append(current_batch)
+                batch_tokens.append(current_tokens)
             current_batch = [text]
-            current_tokens = tokens
+            current_tokens = {file_name: tokens}
         else:
             current_batch.append(text)
-            current_tokens += tokens
+            current_tokens[file_name] = current_tokens.get(file_name, 0) + tokens
     if current_batch:
         batches.append(current_batch)
+        batch_tokens.append(current_tokens)
 
     all_embeddings = []
     try:
         for i, batch in enumerate(batches):
             print(f"Requesting embeddings for batch {i+1}/{len(batches)} (batch size: {len(batch)})...")
-            # Log embedding token usage for this batch
-            batch_text = "\n".join(batch)
-            token_logger.log_embedding(batch_text, EMBEDDING_MODEL, f"batch_{i+1}")
-            response = client.embeddings.create(input=batch, model=EMBEDDING_MODEL)
+            with outbound.slot("embedding"):
+                response = client.embeddings.create(input=batch, model=EMBEDDING_MODEL)
+            # Log embedding token usage per source document in this batch: the provider-reported
+            # total shared out by the chunker's counts (or those counts alone, never re-encoding)
+            reported = getattr(response.usage, "prompt_tokens", None) if response.usage is not None else None
+            for document, tokens in _split_tokens(batch_tokens[i], reported).items():
+                token_logger.log_embedding(model=EMBEDDING_MODEL, file_name=f"batch_{i+1}", input_tokens=tokens,
+                                           document=document,
+                                           source="provider" if reported is not None else "estimated")
             all_embeddings.extend([item.embedding for item in response.data])
         return np.array(all_embeddings, dtype='float32')
     except Exception as e:
@@ -87,21 +125,95 @@ def embed_chunks(chunks):
         return None
 
 
-def create_and_save_vector_store():
+def build_language_partitions(embeddings: np.ndarray, chunks) -> dict:
     """
-    Loads PDF chunks, generates embeddings, and saves them to a FAISS index.
+    One FAISS index per detected chunk language, over the same ids as the full
+    index. Language-neutral ('unknown') chunks go into every partition. A corpus
+    in a single language gets no partitions: the full index is already that subset.
     """
-    print("Loading and chunking PDFs...")
-    chunks = load_and_chunk_pdfs(DOCUMENTS_DIR)
-    if not chunks:
-        print("No chunks were loaded. Aborting.")
-        return
-
-    print(f"Generating embeddings for {len(chunks)} chunks...")
-    embeddings = embed_chunks(chunks)
-    if embeddings is None:
-        print("Failed to generate embeddings. Aborting.")
-        return
+    languages = [chunk['metadata'].get('language', 'unknown') for chunk in chunks]
+    detected = sorted(set(languages) - {'unknown'})
+    if len(detected) < 2:
+        return {}
+    partitions = {}
+    for language in detected:
+        ids = np.array([i for i, lang in enumerate(languages) if lang in (language, 'unknown')], dtype=np.int64)
+        partition = faiss.IndexIDMap(faiss.IndexFlatL2(embeddings.shape[1]))
+        partition.add_with_ids(embeddings[ids], ids) # type: ignore
+        partitions[language] = partition
+    return partitions
+
+def missing_imported_documents(snapshot_root: str, source_dir: str) -> list:
+    """
+    Documents of the published snapshot that are not in `source_dir`, when that
+    snapshot was imported from a bundle (see embeddings/bundle.py). A rebuild
+    would drop them from the store. Empty for snapshots built here.
+    """
+    snapshot = current_snapshot(snapshot_root)
+    if snapshot is None:
+        return []
+    try:
+        if not read_manifest(snapshot).get("imported_from"):
+            return []
+        with open(os.path.join(snapshot, CATALOG_FILE), 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    except (SnapshotError, OSError, ValueError):
+        return []
+    return sorted(entry["name"] for entry in catalog
+                  if entry.get("name") and not os.path.isfile(os.path.join(source_dir, entry["name"])))
+
+def create_and_save_vector_store(precompute_summaries: Optional[bool] = None,
+                                 collection: str = DEFAULT_COLLECTION, force: bool = False):
+    """
+    Loads document chunks, generates embeddings, and publishes them as a new
+    vector store snapshot (see embeddings/snapshots.py); a folder without
+    documents publishes an empty one. Raises IndexBuildError when documents
+    yielded nothing to index or could not be embedded, or when the rebuild would
+    drop the documents of an imported store.
+
+    Args:
+        precompute_summaries: Queue background per-section and per-document summaries
+            for documents not yet in the summary cache. Defaults to the
+            PRECOMPUTE_SUMMARIES environment variable.
+        collection: The collection to build (see embeddings/collection_manager.py);
+            the default one is built from DOCUMENTS_DIR into SNAPSHOTS_DIR.
+        force: Rebuild even if that replaces a store imported from a bundle whose
+            source documents are not in the documents folder.
+    """
+    if collection == DEFAULT_COLLECTION:
+        source_dir, snapshot_root = DOCUMENTS_DIR, SNAPSHOTS_DIR
+    else:
+        source_dir, snapshot_root = documents_dir(collection), snapshots_dir(collection)
+    missing = [] if force else missing_imported_documents(snapshot_root, source_dir)
+    if missing:
+        raise IndexBuildError(f"The published store of collection '{collection}' was imported from a bundle and "
+                              f"{len(missing)} of its documents (e.g. {missing[0]}) are not in {source_dir}; "
+                              "rebuilding would drop them. Copy the source documents there, or rebuild with --force")
+    print(f"Loading and chunking documents of collection '{collection}'...")
+    file_stats = {}
+    with span("ingest_load_chunk"):
+        chunks = load_and_chunk_documents(source_dir, file_stats=file_stats)
+    if not chunks and file_stats:
+        raise IndexBuildError(f"No chunks were loaded from {source_dir}")
+
+    # Summaries need every chunk of a document; the index only needs each text once
+    all_chunks = chunks
+    if DEDUP_THRESHOLD > 0 and chunks:
+        with span("ingest_dedup"):
+            chunks, folded = deduplicate_chunks(chunks, threshold=DEDUP_THRESHOLD)
+        print(f"Folded {folded} near-duplicate chunks; {len(chunks)} unique chunks remain.")
+
+    if chunks:
+        print(f"Generating embeddings for {len(chunks)} chunks...")
+        with span("ingest_embed"):
+            embeddings = embed_chunks(chunks)
+        if embeddings is None:
+            raise IndexBuildError(f"Failed to generate embeddings for {len(chunks)} chunks")
+    else:
+        # No documents at all: publish an empty store, so a fresh install becomes
+        # ready and the chunks of deleted documents stop being served.
+        print(f"No documents in {source_dir}; publishing an empty store.")
+        embeddings = np.zeros((0, EMBEDDING_DIMENSIONS), dtype='float32')
 
     # Create a FAISS index
     dimension = embeddings.shape[1]
@@ -111,22 +223,43 @@ def create_and_save_vector_store():
     # Add vectors to the index with their original indices as IDs
     ids = np.arange(len(chunks))
     index.add_with_ids(embeddings, ids) # type: ignore
+    partitions = build_language_partitions(embeddings, chunks)
+    if partitions:
+        print("Language partitions: " + ", ".join(f"{lang}={p.ntotal}" for lang, p in partitions.items()))
 
-    print(f"Saving FAISS index to {FAISS_INDEX_PATH}")
-    faiss.write_index(index, FAISS_INDEX_PATH)
-
-    # Save metadata
-    # Save metadata, now including the text for context
-    metadata = {str(i): chunk for i, chunk in enumerate(chunks)}
-    print(f"Saving metadata to {METADATA_PATH}")
-    with open(METADATA_PATH, 'w') as f:
-        json.dump(metadata, f, indent=4)
+    # Each build is a new snapshot generation, published only once complete, so
+    # readers never see a half-written or mismatched index/chunk pair.
+    with span("ingest_index_write"):
+        print(f"Writing snapshot to {snapshot_root}")
+        catalog = catalog_entries(file_stats, all_chunks, chunks,
+                                  lambda tokens: token_logger.calculate_cost(tokens, 0, EMBEDDING_MODEL))
+        snapshot_dir = write_snapshot(index, chunks, root=snapshot_root, info={"embedding_model": EMBEDDING_MODEL},
+                                      catalog=catalog, partitions=partitions)
 
     print("\nVector store created successfully!")
-    print(f"- FAISS index saved at: {FAISS_INDEX_PATH}")
-    print(f"- Metadata saved at: {METADATA_PATH}")
+    print(f"- Snapshot published at: {snapshot_dir}")
+
+    if precompute_summaries is None:
+        precompute_summaries = os.getenv("PRECOMPUTE_SUMMARIES", "").lower() in ("1", "true", "yes")
+    if precompute_summaries:
+        from backend.chains.summary_cache import summary_cache
+        summary_cache.schedule(all_chunks)
 
 if __name__ == '__main__':
     # Make sure to set your OPENAI_API_KEY environment variable before running
     # Example: export OPENAI_API_KEY='your_key_here'
-    create_and_save_vector_store()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the FAISS vector store from the documents folder.")
+    parser.add_argument("--profile", action="store_true", help="Store a CPU/allocation profile of the run in shared/profiles/")
+    parser.add_argument("--collection", type=validate_collection, default=DEFAULT_COLLECTION, help="Collection to build (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Replace an imported store even if its source documents are missing")
+    args = parser.parse_args()
+    try:
+        if args.profile:
+            from backend.utils.profiler import request_profiler
+            request_profiler.profile_call("ingestion", create_and_save_vector_store, collection=args.collection,
+                                          force=args.force)
+        else:
+            create_and_save_vector_store(collection=args.collection, force=args.force)
+    except IndexBuildError as e:
+        sys.exit(f"{e}. Aborting.")
\ No newline at end of file
@@ -0,0 +1,103 @@
+"""
+Token-aware chunking.
+
+Sections from the extractors are tokenized in groups with tiktoken's batched,
+multi-threaded encoder (each page is encoded exactly once) and cut into windows
+of about `chunk_tokens` tokens that overlap by `overlap` tokens. Window edges are
+moved to the nearest word boundary so chunks never split a word. Every chunk
+carries its token count, which embedding batch packing and cost logging reuse
+instead of encoding the text again.
+
+Without tiktoken encoding files (e.g. offline), tokens are approximated as runs
+of up to four characters, which keeps chunk sizes in the same range.
+"""
+import os
+import re
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import tiktoken
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "64"))
+SECTIONS_PER_BATCH = 32
+ENCODE_THREADS = min(8, os.cpu_count() or 1)
+
+# Fallback "tokens": optional leading whitespace plus up to four characters, or a whitespace run
+_APPROX_TOKEN = re.compile(r'\s*\S{1,4}|\s+')
+
+
+@lru_cache(maxsize=None)
+def get_encoding():
+    """The embedding model's encoding (cl100k_base), or None if it cannot be loaded."""
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def token_offsets(texts: Sequence[str], encoding=None) -> List[List[int]]:
+    """Character offset of every token of every text, encoding the texts in one batch."""
+    encoding = encoding or get_encoding()
+    if encoding is None:
+        return [[m.start() for m in _APPROX_TOKEN.finditer(text)] for text in texts]
+    batch = encoding.encode_ordinary_batch(list(texts), num_threads=ENCODE_THREADS)
+    return [encoding.decode_with_offsets(tokens)[1] for tokens in batch]
+
+
+def count_tokens(texts: Sequence[str], encoding=None) -> List[int]:
+    """Token counts for `texts` from one batched encode."""
+    encoding = encoding or get_encoding()
+    if encoding is None:
+        return [sum(1 for _ in _APPROX_TOKEN.finditer(text)) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts), num_threads=ENCODE_THREADS)]
+
+
+def _is_boundary(text: str, offset: int) -> bool:
+    return offset <= 0 or offset >= len(text) or text[offset].isspace() or text[offset - 1].isspace()
+
+
+def split_tokens(text: str, offsets: List[int], chunk_tokens: int = CHUNK_TOKENS,
+                 overlap: int = CHUNK_OVERLAP) -> Iterator[Tuple[str, int]]:
+    """Yields (chunk_text, token_count) windows over one tokenized text."""
+    total = len(offsets)
+    # Word-boundary search is limited so a pathological "word" cannot shrink a chunk to nothing
+    slack = max(1, chunk_tokens // 4)
+    start = 0
+    while start < total:
+        end = min(start + chunk_tokens, total)
+        if end < total:
+            snapped = end
+            while snapped > start + chunk_tokens - slack and not _is_boundary(text, offsets[snapped]):
+                snapped -= 1
+            if _is_boundary(text, offsets[snapped]):
+                end = snapped
+        stop = offsets[end] if end < total else len(text)
+        chunk = text[offsets[start]:stop].strip()
+        if chunk:
+            yield chunk, end - start
+        if end >= total:
+            return
+        next_start = max(end - overlap, start + 1)
+        while next_start < end and not _is_boundary(text, offsets[next_start]):
+            next_start += 1
+        start = next_start
+
+
+def chunk_sections(sections: Iterable, chunk_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP,
+                   encoding=None) -> Iterator[Tuple[object, str, int]]:
+    """
+    Chunks extractor sections (anything with a `.text`), yielding
+    (section, chunk_text, token_count). Sections are encoded SECTIONS_PER_BATCH at a time.
+    """
+    if overlap >= chunk_tokens:
+        raise ValueError("overlap must be smaller than chunk_tokens")
+    sections = iter(sections)
+    while True:
+        batch = list(islice(sections, SECTIONS_PER_BATCH))
+        if not batch:
+            return
+        for section, offsets in zip(batch, token_offsets([s.text for s in batch], encoding)):
+            for text, tokens in split_tokens(section.text, offsets, chunk_tokens, overlap):
+                yield section, text, tokens
@@ -0,0 +1,96 @@
+"""
+Near-duplicate chunk detection for ingestion.
+
+Regulations repeat long boilerplate (preambles such as "Menimbang"/"Mengingat",
+signature blocks, articles carried over between amended versions). Each chunk
+gets a MinHash signature over its word 5-gram shingles; locality-sensitive
+hashing over bands of the signature finds candidate pairs, and a candidate whose
+estimated Jaccard similarity reaches the threshold is folded into the first
+(canonical) chunk seen with that content. The canonical chunk is embedded and
+indexed once and lists every location it occurs at in `metadata["sources"]`.
+"""
+import re
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 similarity almost always become candidates
+SHINGLE_WORDS = 5
+DEFAULT_THRESHOLD = 0.85
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+_WORD = re.compile(r'\w+')
+
+SOURCE_FIELDS = ("file_name", "page_number", "chunk_id", "content_hash")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """NUM_PERM min-hashes of the text's shingles, as uint64."""
+    hashes = _shingle_hashes(text) % _MERSENNE_PRIME
+    # (a * x + b) mod p stays below 2**62, so uint64 arithmetic cannot overflow
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME).min(axis=1)
+
+
+def estimated_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(a == b))
+
+
+def source_location(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    meta = chunk.get('metadata', {})
+    return {field: meta.get(field) for field in SOURCE_FIELDS}
+
+
+def deduplicate_chunks(chunks: List[Dict[str, Any]],
+                       threshold: float = DEFAULT_THRESHOLD) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Folds near-duplicate chunks into the first occurrence.
+
+    Returns the unique chunks (in their original order) and the number of chunks
+    folded. A canonical chunk with duplicates gets `metadata["sources"]`: its own
+    location followed by the location of each duplicate.
+    """
+    rows = NUM_PERM // BANDS
+    buckets: Dict[Tuple[int, bytes], List[int]] = {}
+    signatures: List[np.ndarray] = []
+    unique: List[Dict[str, Any]] = []
+    folded = 0
+    for chunk in chunks:
+        signature = minhash_signature(chunk['text'])
+        keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+        match = None
+        seen = set()
+        for key in keys:
+            for candidate in buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if estimated_similarity(signature, signatures[candidate]) >= threshold:
+                    match = candidate
+                    break
+            if match is not None:
+                break
+        if match is None:
+            for key in keys:
+                buckets.setdefault(key, []).append(len(unique))
+            signatures.append(signature)
+            unique.append(chunk)
+            continue
+        canonical = unique[match]['metadata']
+        canonical.setdefault('sources', [source_location(unique[match])]).append(source_location(chunk))
+        folded += 1
+    return unique, folded
@@ -0,0 +1,131 @@
+"""
+Text extractors for every accepted document format, keyed by file extension.
+
+Each extractor is a generator that yields one `Section` at a time (a PDF page,
+or a block of a text/DOCX file) with position metadata, so ingestion holds only
+the current section in memory whatever the document size. `page_number` is the
+PDF page, or the 1-based section number for formats without pages, which keeps
+citations and per-section summaries working the same way for all formats.
+"""
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+# Target size of a section from formats without pages (roughly one PDF page of text)
+SECTION_CHARS = 4000
+
+
+class Section(NamedTuple):
+    text: str
+    page_number: int
+    position: Dict[str, int]
+
+
+Extractor = Callable[[str], Iterator[Section]]
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(*extensions: str):
+    """Registers the decorated generator as the extractor for `extensions`."""
+    def decorator(fn: Extractor) -> Extractor:
+        for ext in extensions:
+            EXTRACTORS[ext.lower()] = fn
+        return fn
+    return decorator
+
+
+def supported_extensions() -> Tuple[str, ...]:
+    return tuple(sorted(EXTRACTORS))
+
+
+def extractor_for(file_path: str) -> Optional[Extractor]:
+    return EXTRACTORS.get(os.path.splitext(file_path)[1].lower())
+
+
+def iter_sections(file_path: str) -> Iterator[Section]:
+    """Yields the non-empty sections of a document; raises ValueError for unsupported formats."""
+    extractor = extractor_for(file_path)
+    if extractor is None:
+        raise ValueError(f"No extractor registered for {os.path.basename(file_path)}")
+    for section in extractor(file_path):
+        if section.text.strip():
+            yield section
+
+
+@register_extractor('.pdf')
+def extract_pdf(file_path: str) -> Iterator[Section]:
+    with fitz.open(file_path) as doc:
+        for page_index in range(doc.page_count):
+            # Load one page at a time; it is released before the next is parsed
+            text = doc.load_page(page_index).get_text().strip()
+            yield Section(text, page_index + 1, {"page": page_index + 1})
+
+
+@register_extractor('.txt')
+def extract_txt(file_path: str, section_chars: int = SECTION_CHARS) -> Iterator[Section]:
+    """Reads the file in blocks and cuts sections at the last line break of each block."""
+    section_number, offset, carry = 0, 0, ""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            block = f.read(section_chars)
+            buffer = carry + block
+            if len(block) < section_chars:  # end of file
+                if buffer.strip():
+                    section_number += 1
+                    yield Section(buffer.strip(), section_number, {"char_offset": offset})
+                return
+            # Prefer a line break, then a space; a single huge token is split as-is
+            cut = buffer.rfind('\n')
+            if cut <= 0:
+                cut = buffer.rfind(' ')
+            if cut <= 0:
+                cut = len(buffer)
+            text, carry = buffer[:cut], buffer[cut:]
+            if text.strip():
+                section_number += 1
+                yield Section(text.strip(), section_number, {"char_offset": offset})
+            offset += len(text)
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+@register_extractor('.docx')
+def extract_docx(file_path: str, section_chars: int = SECTION_CHARS) -> Iterator[Section]:
+    """Streams paragraphs from word/document.xml and groups them into sections."""
+    section_number, first_paragraph, paragraph_index = 0, 1, 0
+    paragraphs, size = [], 0
+    body = None
+    with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as xml:
+        for event, element in ET.iterparse(xml, events=('start', 'end')):
+            if event == 'start':
+                if element.tag == f'{_W}body':
+                    body = element
+                continue
+            if element.tag == f'{_W}tbl' and body is not None and element in body:
+                body.remove(element)
+            if element.tag != f'{_W}p':
+                continue
+            paragraph_index += 1
+            text = ''.join(node.text or '' for node in element.iter(f'{_W}t')).strip()
+            # Drop the parsed paragraph so memory stays flat for long documents
+            element.clear()
+            if body is not None and element in body:
+                body.remove(element)
+            if not text:
+                continue
+            if not paragraphs:
+                first_paragraph = paragraph_index
+            paragraphs.append(text)
+            size += len(text) + 1
+            if size >= section_chars:
+                section_number += 1
+                yield Section('\n'.join(paragraphs), section_number, {"paragraph": first_paragraph})
+                paragraphs, size = [], 0
+    if paragraphs:
+        section_number += 1
+        yield Section('\n'.join(paragraphs), section_number, {"paragraph": first_paragraph})
@@ -1,59 +1,83 @@
 import os
-import fitz  # PyMuPDF
 import uuid
-from typing import List, Dict, Any
+import hashlib
+from typing import Any, Dict, Iterator, List, Optional
 
-def load_and_chunk_pdfs(pdf_folder: str) -> List[Dict[str, Any]]:
+from backend.ingest.extractors import extractor_for, iter_sections
+from backend.ingest.chunker import chunk_sections
+from backend.utils.language_detect import detect_language
+
+def file_content_hash(file_path: str) -> str:
+    """Returns the SHA-256 hex digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def iter_document_chunks(documents_folder: str,
+                         file_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
     """
-    Loads PDFs from a folder, extracts text, and splits it into chunks.
+    Loads every supported document (PDF, TXT, DOCX) from a folder, extracts its text
+    section by section, and splits it into overlapping token-sized chunks
+    (see ingest/chunker.py); each chunk records its `token_count` and `language`
+    ('en', 'id' or 'unknown'). Chunks are yielded as they are cut, so a caller that
+    consumes them one at a time never holds the whole corpus in memory.
 
     Args:
-        pdf_folder: The path to the folder containing PDF files.
+        documents_folder: The path to the folder containing the documents.
+        file_stats: Optional dict filled with one entry per file (size, mtime,
+            content hash, last page/section with text, and the error if it failed),
+            including files that produced no chunks; complete once the generator
+            is exhausted.
 
-    Returns:
-        A list of dictionaries, where each dictionary represents a chunk.
+    Yields:
+        One dictionary per chunk.
     """
-    all_chunks = []
-    if not os.path.isdir(pdf_folder):
-        print(f"Error: Directory '{pdf_folder}' not found.")
-        return []
+    if not os.path.isdir(documents_folder):
+        print(f"Error: Directory '{documents_folder}' not found.")
+        return
 
-    for filename in os.listdir(pdf_folder):
-        if filename.lower().endswith(".pdf"):
-            file_path = os.path.join(pdf_folder, filename)
-            try:
-                doc = fitz.open(file_path)
-                for page_num, page in enumerate(doc, start=1):
-                    text = page.get_text().strip()
-                    if not text:
-                        continue  # Skip blank pages
+    for filename in sorted(os.listdir(documents_folder)):
+        file_path = os.path.join(documents_folder, filename)
+        if extractor_for(filename) is None or not os.path.isfile(file_path):
+            continue
+        stat = os.stat(file_path)
+        stats = {"size": stat.st_size, "mtime": stat.st_mtime, "content_hash": None, "pages": 0, "error": None}
+        if file_stats is not None:
+            file_stats[filename] = stats
+        try:
+            content_hash = stats["content_hash"] = file_content_hash(file_path)
+            for section, chunk_text, token_count in chunk_sections(iter_sections(file_path)):
+                stats["pages"] = max(stats["pages"], section.page_number)
+                yield {
+                    "text": chunk_text,
+                    "metadata": {
+                        "file_name": filename,
+                        "page_number": section.page_number,
+                        "chunk_id": str(uuid.uuid4()),
+                        "content_hash": content_hash,
+                        "token_count": token_count,
+                        "language": detect_language(chunk_text),
+                        **section.position,
+                    }
+                }
+        except Exception as e:
+            stats["error"] = f"{type(e).__name__}: {e}"
+            print(f"Error processing file {filename}: {e}")
 
-                    # Simple chunking by splitting text into words
-                    words = text.split()
-                    chunk_size = 400  # Approximate words per chunk
-                    for i in range(0, len(words), chunk_size):
-                        chunk_text = " ".join(words[i:i + chunk_size])
-                        chunk_id = str(uuid.uuid4())
-                        
-                        chunk_data = {
-                            "text": chunk_text,
-                            "metadata": {
-                                "file_name": filename,
-                                "page_number": page_num,
-                                "chunk_id": chunk_id
-                            }
-                        }
-                        all_chunks.append(chunk_data)
-                doc.close()
-            except Exception as e:
-                print(f"Error processing file {filename}: {e}")
+def load_and_chunk_documents(documents_folder: str,
+                             file_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """All chunks of `iter_document_chunks(documents_folder, file_stats)` as a list."""
+    return list(iter_document_chunks(documents_folder, file_stats))
 
-    return all_chunks
+# Former name (the loader handled PDFs only), kept for existing callers
+load_and_chunk_pdfs = load_and_chunk_documents
 
 if __name__ == '__main__':
     # Example usage:
     # 1. Make sure you have a 'documents' folder in your project root.
-    # 2. Place some PDF files inside the 'documents' folder.
+    # 2. Place some PDF, TXT or DOCX files inside the 'documents' folder.
     # 3. Run this script from the project root: python ingest/pdf_loader.py
     
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -62,9 +86,9 @@ if __name__ == '__main__':
     if not os.path.exists(documents_folder):
         os.makedirs(documents_folder)
         print(f"Created directory: {documents_folder}")
-        print("Please add PDF files to the 'documents' directory to test the script.")
+        print("Please add PDF, TXT or DOCX files to the 'documents' directory to test the script.")
     
-    pdf_chunks = load_and_chunk_pdfs(documents_folder)
+    pdf_chunks = load_and_chunk_documents(documents_folder)
 
     if pdf_chunks:
         print(f"Successfully extracted {len(pdf_chunks)} chunks.")
@@ -74,4 +98,4 @@ if __name__ == '__main__':
         print(f"Metadata: {pdf_chunks[0]['metadata']}")
         print("--------------------\n")
     else:
-        print("No chunks were extracted. Check if the 'documents' folder contains PDF files.")
\ No newline at end of file
+        print("No chunks were extracted. Check if the 'documents' folder contains supported documents.")
\ No newline at end of file
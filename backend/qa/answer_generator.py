@@ -1,42 +1,41 @@
 import os
-import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 
 from dotenv import load_dotenv
 from openai import OpenAI
 
-# Add the project root to the Python path to allow for package-like imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from utils.token_logger import token_logger
+from backend.utils.token_logger import token_logger, document_names
+from backend.utils.metrics import span
+from backend.utils.admission import outbound
 
 load_dotenv()
 
+ANSWER_MODEL = os.getenv("ANSWER_MODEL", "gpt-4.1-nano")
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant for a banking regulation knowledge management system." + "\n"
+    "Answer the user's question based *only* on the provided context below." + "\n"
+    "Answer the user's question based *only* on what applies in Indonesia." + "\n"
+    "If the context does not contain the answer, state that you cannot answer the question with the given information and ask for the user for clarification." + "\n"
+    "Provide the answer in the same language as the user's question, if not sure what language default back to English." + "\n"
+    "Format the answer for readability, e.g. use bullet points, numbered lists, etc." + "\n"
+)
+
+def _cited_documents(chunks: List[Dict[str, Any]]):
+    """Source documents of the context chunks, including every place a deduplicated chunk occurs."""
+    return document_names(location for chunk in chunks
+                          for location in chunk.get('metadata', {}).get('sources') or [chunk.get('metadata', {})])
+
 class AnswerGenerator:
     """Generates answers using an LLM based on a query and retrieved context."""
 
-    def __init__(self, model: str = "gpt-4.1-nano"):
+    def __init__(self, model: str = ANSWER_MODEL):
         """Initializes the AnswerGenerator with an OpenAI client."""
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.model = model
 
-    def generate_answer(self, query: str, chunks: List[Dict[str, Any]], previous_questions: str = "", summarized_history: str = "") -> str:
-        """
-        Generates an answer by synthesizing information from retrieved chunks.
-
-        Args:
-            query: The user's question.
-            chunks: A list of dictionaries, where each dictionary is a retrieved chunk
-                    containing text and metadata.
-            previous_questions: (Optional) String of previous Q&A pairs to include in the prompt.
-            summarized_history: (Optional) Summarized history string to include in the prompt.
-
-        Returns:
-            A string containing the generated answer.
-        """
-        if not chunks:
-            return "I could not find any relevant information in the documents to answer your question."
-
+    def _build_messages(self, query: str, chunks: List[Dict[str, Any]], previous_questions: str = "", summarized_history: str = "") -> List[Dict[str, str]]:
+        """Builds the chat messages (system instructions + structured prompt) and logs the prompt."""
         # Combine the text from all chunks to form the context
         context = "\n\n---\n\n".join([chunk['text'] for chunk in chunks])
 
@@ -63,29 +62,89 @@ class AnswerGenerator:
         except Exception as e:
             print(f"[LOGGING ERROR] Could not write prompt log: {e}")
 
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def generate_answer(self, query: str, chunks: List[Dict[str, Any]], previous_questions: str = "", summarized_history: str = "") -> str:
+        """
+        Generates an answer by synthesizing information from retrieved chunks.
+
+        Args:
+            query: The user's question.
+            chunks: A list of dictionaries, where each dictionary is a retrieved chunk
+                    containing text and metadata.
+            previous_questions: (Optional) String of previous Q&A pairs to include in the prompt.
+            summarized_history: (Optional) Summarized history string to include in the prompt.
+
+        Returns:
+            A string containing the generated answer.
+        """
+        if not chunks:
+            return "I could not find any relevant information in the documents to answer your question."
+
+        messages = self._build_messages(query, chunks, previous_questions, summarized_history)
+        prompt = messages[1]["content"]
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": 
-                        "You are a helpful assistant for a banking regulation knowledge management system." + "\n"
-                        "Answer the user's question based *only* on the provided context below." + "\n"
-                        "Answer the user's question based *only* on what applies in Indonesia." + "\n"
-                        "If the context does not contain the answer, state that you cannot answer the question with the given information and ask for the user for clarification." + "\n"
-                        "Provide the answer in the same language as the user's question, if not sure what language default back to English." + "\n"
-                        "Format the answer for readability, e.g. use bullet points, numbered lists, etc." + "\n"
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,  # Lower temperature for more factual answers
-            )
+            with span("generate_answer"), outbound.slot("completion"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.2,  # Lower temperature for more factual answers
+                )
             content = response.choices[0].message.content
             answer = content.strip() if content else "The model did not return a valid answer."
             
             # Log token usage using the comprehensive token logger
-            token_logger.log_answer_generation(prompt, answer, self.model, query)
+            token_logger.log_answer_generation(prompt, answer, self.model, query, usage=response.usage,
+                                               document=_cited_documents(chunks))
             
             return answer
         except Exception as e:
             print(f"An error occurred while generating the answer: {e}")
-            return "I encountered an error while trying to generate an answer. Please try again."
\ No newline at end of file
+            return "I encountered an error while trying to generate an answer. Please try again."
+
+    def stream_answer(self, query: str, chunks: List[Dict[str, Any]], previous_questions: str = "", summarized_history: str = "") -> Iterator[str]:
+        """
+        Same as generate_answer, but yields the answer incrementally as the model produces it.
+
+        Yields:
+            Text deltas of the answer.
+        """
+        if not chunks:
+            yield "I could not find any relevant information in the documents to answer your question."
+            return
+
+        messages = self._build_messages(query, chunks, previous_questions, summarized_history)
+        parts = []
+        try:
+            # The provider connection (and its outbound slot) is held until the stream ends
+            with outbound.slot("completion"):
+                # Time to first token; the rest of the stream is paced by the reader
+                with span("generate_answer_first_token"):
+                    stream = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.2,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+                usage = None
+                for event in stream:
+                    if getattr(event, "usage", None) is not None:
+                        usage = event.usage
+                    if not event.choices:
+                        continue
+                    delta = event.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except Exception as e:
+            print(f"An error occurred while streaming the answer: {e}")
+            yield "I encountered an error while trying to generate an answer. Please try again."
+            return
+
+        token_logger.log_answer_generation(messages[1]["content"], "".join(parts), self.model, query, usage=usage,
+                                           document=_cited_documents(chunks))
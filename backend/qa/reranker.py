@@ -0,0 +1,143 @@
+"""
+Optional cross-encoder re-ranking of retrieved chunks.
+
+With RERANK=1 the retriever over-fetches RERANK_CANDIDATES FAISS hits and this
+module scores every (question, chunk) pair with a local sentence-transformers
+cross-encoder in one batched forward pass, keeping only the best k for the
+prompt. A cross-encoder reads question and chunk together, so it ranks far more
+precisely than vector distance; k can then stay small (fewer prompt tokens,
+faster generation) without losing the chunk that answers the question.
+
+The model is loaded once per process (at warm-up) and inference runs on a small
+dedicated thread pool, so concurrent requests share it instead of oversubscribing
+the CPU. Requests never wait for the model: until it is loaded they keep FAISS
+order (and, without a warm-up, the first one starts loading it in the background). Scores are cached per (question, chunk), which makes repeated and
+coalesced questions free. Without sentence-transformers, or if the model fails
+to load, re-ranking is skipped and FAISS order is kept.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.utils.metrics import span, CACHE_REQUESTS
+
+RERANK_ENABLED = os.getenv("RERANK", "").lower() in ("1", "true", "yes")
+# Multilingual MS MARCO cross-encoder: the corpus and questions are Indonesian and English
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_THREADS = int(os.getenv("RERANK_THREADS", "2"))
+RERANK_BATCH_SIZE = 32
+SCORE_CACHE_SIZE = 50000
+
+
+def _chunk_key(chunk: Dict[str, Any]) -> str:
+    meta = chunk.get('metadata', {})
+    if meta.get('chunk_id'):
+        return meta['chunk_id']
+    return hashlib.sha1(chunk.get('text', '').encode('utf-8')).hexdigest()
+
+
+def _load_cross_encoder(model_name: str):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name)
+
+
+class CrossEncoderReranker:
+    """Batched cross-encoder scoring with a warm model and a (question, chunk) score cache."""
+
+    def __init__(self, model_name: str = RERANK_MODEL, enabled: bool = RERANK_ENABLED,
+                 threads: int = RERANK_THREADS, cache_size: int = SCORE_CACHE_SIZE,
+                 loader: Callable[[str], Any] = _load_cross_encoder):
+        self.model_name = model_name
+        self.enabled = enabled
+        self.cache_size = cache_size
+        self._loader = loader
+        self._model = None
+        self._failed = False
+        self._lock = threading.Lock()
+        self._background_load: Optional[threading.Thread] = None
+        self._background_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="rerank")
+
+    def warm(self):
+        """Loads the model now (at startup) rather than on the first request."""
+        if self.enabled and self._model_or_none() is None:
+            raise RuntimeError(f"Re-ranking model {self.model_name} is unavailable")
+
+    def _model_or_none(self):
+        if self._model is not None or self._failed:
+            return self._model
+        with self._lock:
+            if self._model is None and not self._failed:
+                try:
+                    self._model = self._loader(self.model_name)
+                except Exception as e:
+                    # Missing sentence-transformers or model files: keep FAISS order
+                    self._failed = True
+                    print(f"Re-ranking disabled: could not load {self.model_name} ({e})")
+        return self._model
+
+    def _load_in_background(self):
+        with self._background_lock:
+            if self._background_load is None:
+                self._background_load = threading.Thread(target=self._model_or_none, name="rerank-load", daemon=True)
+                self._background_load.start()
+
+    @property
+    def active(self) -> bool:
+        """Whether retrieval should over-fetch and re-rank: only once the model is warm."""
+        if not self.enabled or self._failed:
+            return False
+        if self._model is None:
+            self._load_in_background()
+            return False
+        return True
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, scores: Dict[Tuple[str, str], float]):
+        with self._cache_lock:
+            self._cache.update(scores)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def score(self, question: str, chunks: List[Dict[str, Any]]) -> List[float]:
+        """Cross-encoder relevance of each chunk to the question (higher is better)."""
+        question_key = hashlib.sha1(question.encode('utf-8')).hexdigest()
+        keys = [(question_key, _chunk_key(chunk)) for chunk in chunks]
+        scores = [self._cached(key) for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        CACHE_REQUESTS.inc(len(chunks) - len(missing), cache="rerank", result="hit")
+        if missing:
+            CACHE_REQUESTS.inc(len(missing), cache="rerank", result="miss")
+            pairs = [(question, chunks[i]['text']) for i in missing]
+            model = self._model_or_none()
+            with span("rerank"):
+                predicted = self._pool.submit(model.predict, pairs, batch_size=RERANK_BATCH_SIZE).result()
+            fresh = {keys[i]: float(value) for i, value in zip(missing, predicted)}
+            self._store(fresh)
+            for i in missing:
+                scores[i] = fresh[keys[i]]
+        return scores
+
+    def rerank(self, question: str, chunks: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """The `top_k` chunks by cross-encoder score, each with its `rerank_score`."""
+        if not chunks or not self.active:
+            return chunks[:top_k]
+        scores = self.score(question, chunks)
+        order = sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return [dict(chunks[i], rerank_score=scores[i]) for i in order]
+
+
+# Global instance for easy access
+reranker = CrossEncoderReranker()
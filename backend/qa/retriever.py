@@ -2,65 +2,222 @@ import os
 import json
 import numpy as np
 import faiss
+import threading
 from openai import OpenAI
-from typing import Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 from dotenv import load_dotenv
 
+from backend.utils.token_logger import token_logger
+from backend.utils.metrics import metrics, span, INDEX_VECTORS
+from backend.utils.admission import outbound
+from backend.qa.reranker import reranker, RERANK_CANDIDATES
+from backend.embeddings.snapshots import (ChunkStore, current_snapshot, partition_paths, SNAPSHOTS_DIR, INDEX_FILE,
+                                          CHUNKS_FILE, OFFSETS_FILE)
+from backend.embeddings.collection_manager import (CollectionManager, DEFAULT_COLLECTION, file_signature,
+                                                   snapshots_dir)
+
 # Load environment variables
 load_dotenv()
 
 # --- Configuration ---
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Pre-snapshot layout, still read when no snapshot has been published
 FAISS_INDEX_PATH = os.path.join(project_root, 'embeddings', 'index.faiss')
 METADATA_PATH = os.path.join(project_root, 'embeddings', 'metadata.json')
 EMBEDDING_MODEL = "text-embedding-3-large"
+# A language partition answers a query only if its best hit is at least this close
+# (squared L2 between unit vectors: 2 - 2 * cosine); otherwise the full index is searched
+LANGUAGE_FALLBACK_DISTANCE = float(os.getenv("LANGUAGE_FALLBACK_DISTANCE", "1.2"))
+
+# Indexes and chunks at an explicit path are loaded once per process. Snapshot
+# generations never change once published, and a legacy file is re-read only when
+# its mtime/size change. One entry is kept per kind, so switching to a new
+# generation releases the previous one. Collections go through `collection_stores`.
+_cache_lock = threading.Lock()
+_cache = {}
+
+def _cached_load(kind: str, path: str, loader):
+    signature = (path, file_signature(path))
+    entry = _cache.get(kind)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+    with _cache_lock:
+        entry = _cache.get(kind)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        value = loader(path)
+        _cache[kind] = (signature, value)
+        return value
+
+def _read_metadata(path: str):
+    if os.path.isdir(path):
+        return ChunkStore(path)
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _read_index_mmap(path: str):
+    """
+    Opens the index read-only and memory-mapped, so API workers on one host share
+    its pages through the OS page cache instead of each holding a private copy.
+    Falls back to a regular read for index types or FAISS builds without mmap support.
+    """
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+    if mmap_flag is not None:
+        try:
+            return faiss.read_index(path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+def store_paths(collection: str = DEFAULT_COLLECTION) -> Optional[Tuple[str, str]]:
+    """
+    (index path, chunk store path) of the collection's published snapshot. The
+    default collection falls back to the legacy index.faiss/metadata.json pair.
+    None if the collection has no vector store yet.
+    """
+    snapshot = current_snapshot(SNAPSHOTS_DIR if collection == DEFAULT_COLLECTION else snapshots_dir(collection))
+    if snapshot is not None:
+        return os.path.join(snapshot, INDEX_FILE), snapshot
+    if collection == DEFAULT_COLLECTION and os.path.exists(FAISS_INDEX_PATH) and os.path.exists(METADATA_PATH):
+        return FAISS_INDEX_PATH, METADATA_PATH
+    return None
+
+class CollectionStore(NamedTuple):
+    """A loaded collection: its index, chunks and language partitions."""
+    index_path: str
+    metadata_path: str
+    index: Any
+    metadata: Any
+    partitions: Dict[str, Any]
+
+def _load_store(paths: Tuple[str, str]) -> Tuple[CollectionStore, int]:
+    """Opens a collection's files; its memory cost is their size (each is mapped or read whole)."""
+    index_path, metadata_path = paths
+    if os.path.isdir(metadata_path):
+        partition_files = partition_paths(metadata_path)
+        files = [index_path, os.path.join(metadata_path, CHUNKS_FILE), os.path.join(metadata_path, OFFSETS_FILE)]
+        files += partition_files.values()
+    else:
+        partition_files = {}
+        files = [index_path, metadata_path]
+    store = CollectionStore(index_path, metadata_path, _read_index_mmap(index_path), _read_metadata(metadata_path),
+                            {language: _read_index_mmap(path) for language, path in partition_files.items()})
+    return store, sum(os.path.getsize(path) for path in files)
+
+# Collections are loaded on their first query and kept in LRU order within
+# COLLECTION_MEMORY_MB (see embeddings/collection_manager.py)
+collection_stores = CollectionManager(locate=lambda collection: store_paths(collection), load=_load_store)
+metrics.gauge("kms_collections_resident", "Collections currently loaded.", callback=collection_stores.resident_count)
+metrics.gauge("kms_collections_resident_bytes", "Index and chunk bytes of the loaded collections.",
+              callback=collection_stores.resident_bytes)
+
+def load_index(path: str = None):
+    """The FAISS index at `path` (default: the default collection's), loaded once per version."""
+    if path is None:
+        return collection_stores.get(DEFAULT_COLLECTION).index
+    return _cached_load('index', path, _read_index_mmap)
+
+def load_metadata(path: str = None):
+    """
+    The chunks for `path`: a snapshot directory gives a memory-mapped ChunkStore, a
+    legacy metadata.json a dict. Both map str(FAISS id) to a chunk via `.get()`.
+    Defaults to the default collection's; loaded once per version.
+    """
+    if path is None:
+        return collection_stores.get(DEFAULT_COLLECTION).metadata
+    return _cached_load('metadata', path, _read_metadata)
 
 class Retriever:
-    def __init__(self):
-        """Initializes the retriever, loading the FAISS index and metadata."""
+    def __init__(self, collection: str = DEFAULT_COLLECTION):
+        """Initializes the retriever over `collection`, loading its FAISS index and metadata."""
         print("Initializing retriever...")
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set.")
         self.client = OpenAI(api_key=self.api_key)
-        self.index_path = FAISS_INDEX_PATH
-        self.metadata_path = METADATA_PATH
-        
+
+        self.collection = collection
         try:
-            self.index = faiss.read_index(self.index_path)
-            with open(self.metadata_path, 'r') as f:
-                self.metadata = json.load(f)
+            # Resolved per Retriever, so a newly published (or rolled back) snapshot
+            # is picked up by the next request
+            with span("index_load"):
+                store = collection_stores.get(collection)
+            self.index_path, self.metadata_path = store.index_path, store.metadata_path
+            self.index, self.metadata, self.partitions = store.index, store.metadata, store.partitions
+            INDEX_VECTORS.set(self.index.ntotal)
             print("Retriever initialized successfully.")
         except Exception as e:
             print(f"Error initializing retriever: {e}")
-            print("Please ensure 'embeddings/index.faiss' and 'embeddings/metadata.json' exist.")
-            print("You can generate them by running 'embeddings/vector_store.py'.")
+            print(f"Please ensure a snapshot exists for the '{collection}' collection.")
+            print("You can generate one by running 'embeddings/vector_store.py'.")
             self.index = None
             self.metadata = None
+            self.partitions = {}
 
-    def embed_query(self, query: str) -> Optional[np.ndarray]:
-        """Generates an embedding for the user's query."""
+    def embed_queries(self, queries: List[str]) -> Optional[np.ndarray]:
+        """Embeds several texts in one request; returns an (n, d) array or None on error."""
         try:
-            response = self.client.embeddings.create(input=[query], model=EMBEDDING_MODEL)
-            return np.array(response.data[0].embedding, dtype='float32').reshape(1, -1)
+            with span("embed_query"), outbound.slot("embedding"):
+                response = self.client.embeddings.create(input=queries, model=EMBEDDING_MODEL)
+            token_logger.log_embedding(model=EMBEDDING_MODEL, file_name="query", usage=response.usage)
+            return np.array([item.embedding for item in response.data], dtype='float32')
         except Exception as e:
             print(f"An error occurred while embedding the query: {e}")
             return None
 
-    def retrieve_chunks(self, query: str, k: int = 5) -> list:
-        """Retrieves the top-k most relevant chunks for a given query."""
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Generates an embedding for the user's query."""
+        return self.embed_queries([query])
+
+    def retrieve_chunks(self, query: str, k: int = 5, query_embedding: Optional[np.ndarray] = None,
+                        language: Optional[str] = None, rerank_query: Optional[str] = None) -> list:
+        """
+        Retrieves the top-k most relevant chunks for a given query. An embedding of
+        the query that was already computed can be passed to skip embedding it again.
+        With a `language` that has a partition in the snapshot, only that partition
+        is searched, unless it yields too few hits or none within
+        LANGUAGE_FALLBACK_DISTANCE; then the whole index is searched.
+        With re-ranking enabled (see qa/reranker.py), RERANK_CANDIDATES hits are
+        fetched and the k best by cross-encoder score against `rerank_query`
+        (default: `query`) are returned.
+        """
         if not self.index or not self.metadata:
             print("Retriever is not initialized. Cannot retrieve chunks.")
             return []
 
-        query_embedding = self.embed_query(query)
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        else:
+            query_embedding = np.asarray(query_embedding, dtype='float32').reshape(1, -1)
         if query_embedding is None:
             return []
 
-        # Search the FAISS index
-        distances, indices = self.index.search(query_embedding, k)
+        rerank = reranker.active
+        fetch = max(k, RERANK_CANDIDATES) if rerank else k
+        distances, indices = self._search(query_embedding, fetch, language, k)
 
         # Collect the results
+        with span("metadata_lookup"):
+            results = self._collect_results(distances, indices)
+        if rerank:
+            results = reranker.rerank(rerank_query or query, results, k)
+        return results
+
+    def _search(self, query_embedding: np.ndarray, n: int, language: Optional[str], k: int):
+        """
+        Fetches n hits, from the query's language partition if it holds at least the
+        k the caller needs (n may over-fetch for re-ranking), else from the whole FAISS index.
+        """
+        partition = getattr(self, 'partitions', {}).get(language)
+        if partition is not None:
+            with span("index_search"):
+                distances, indices = partition.search(query_embedding, n)
+            if (indices[0] != -1).sum() >= k and distances[0][0] <= LANGUAGE_FALLBACK_DISTANCE:
+                return distances, indices
+        with span("index_search"):
+            return self.index.search(query_embedding, n)
+
+    def _collect_results(self, distances, indices) -> list:
         results = []
         for i, idx in enumerate(indices[0]):
             if idx != -1:  # FAISS returns -1 for no result
@@ -69,8 +226,7 @@ class Retriever:
                     # Assuming you might want the text later, for now just metadata
                     # You would typically load the text from a source or have it in metadata
                     # The entire chunk data (including text) is now in metadata
-                    chunk_data = self.metadata.get(str(idx))
-                    if chunk_data:
-                        chunk_data['retrieval_score'] = float(distances[0][i])
-                        results.append(chunk_data)
+                    # Copy: the metadata dict is shared by concurrent requests
+                    chunk_data = dict(chunk_metadata, retrieval_score=float(distances[0][i]))
+                    results.append(chunk_data)
         return results
\ No newline at end of file
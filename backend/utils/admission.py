@@ -0,0 +1,217 @@
+"""
+Admission control for chat requests and a cap on concurrent provider calls.
+
+`AdmissionController` lets at most `max_active` chat requests run at once per
+worker. Further requests wait in a bounded queue with one FIFO per user, and
+users are served round-robin, so a client sending a burst cannot delay everyone
+else's next request. A request that finds the queue (or its own share of it)
+full, or waits longer than `max_wait`, is rejected at once with a Retry-After
+estimate: the API answers 429 in milliseconds instead of timing out under load.
+
+`OutboundLimiter` caps concurrent OpenAI calls (embeddings, completions,
+summaries, ingestion batches), so a spike queues locally instead of tripping the
+provider's rate limits for every request. OPENAI_MAX_CONCURRENCY is the cap for
+the whole host: each of the API_WORKERS processes gets an equal share of it
+(rounded down, at least one), so N workers never hold more than the cap between
+them unless there are more workers than slots. A standalone ingestion run
+(`vector_store.py`) is one more process with the whole cap.
+
+State lives under a threading lock and waiters are woken on their own event
+loop, so slots can be released from the threadpool (streamed responses finish
+there).
+"""
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Deque, Optional
+
+from backend.utils.metrics import metrics
+from backend.utils.coordination import configured_workers
+
+MAX_ACTIVE = int(os.getenv("CHAT_MAX_ACTIVE", "16"))
+MAX_QUEUED = int(os.getenv("CHAT_MAX_QUEUED", "64"))
+MAX_QUEUED_PER_USER = int(os.getenv("CHAT_MAX_QUEUED_PER_USER", "4"))
+MAX_QUEUE_WAIT = float(os.getenv("CHAT_MAX_QUEUE_WAIT", "10"))
+MAX_OUTBOUND = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+
+QUEUE_SECONDS = metrics.histogram(
+    "kms_admission_queue_seconds", "Time admitted chat requests waited in the admission queue.")
+REJECTED = metrics.counter(
+    "kms_admission_rejected_total", "Chat requests rejected with 429 by reason.", ("reason",))
+OUTBOUND_WAIT_SECONDS = metrics.histogram(
+    "kms_outbound_wait_seconds", "Time provider calls waited for an outbound slot.", ("kind",))
+
+
+class QueueFull(Exception):
+    """The request was not admitted; retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server busy ({reason}); retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("loop", "future", "granted")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Bounded, per-user fair admission queue in front of the chat endpoints."""
+
+    def __init__(self, max_active: int = MAX_ACTIVE, max_queued: int = MAX_QUEUED,
+                 max_queued_per_user: int = MAX_QUEUED_PER_USER, max_wait: float = MAX_QUEUE_WAIT):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._waiting: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._service_seconds = 1.0  # moving average of admitted request durations
+
+    def active(self) -> int:
+        return self._active
+
+    def queued(self) -> int:
+        return self._queued
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: the queue ahead drained at the observed service rate."""
+        return max(1, math.ceil(self._service_seconds * (self._queued + 1) / self.max_active))
+
+    def _reject(self, reason: str):
+        REJECTED.inc(reason=reason)
+        raise QueueFull(reason, self.retry_after())
+
+    async def acquire(self, user: str) -> float:
+        """Waits for a slot; returns the seconds spent queued or raises QueueFull."""
+        with self._lock:
+            if self._active < self.max_active and not self._queued:
+                self._active += 1
+                QUEUE_SECONDS.observe(0.0)
+                return 0.0
+            if self._queued >= self.max_queued:
+                self._reject("queue_full")
+            queue = self._waiting.get(user)
+            if queue is not None and len(queue) >= self.max_queued_per_user:
+                self._reject("user_queue_full")
+            waiter = _Waiter(asyncio.get_running_loop())
+            self._waiting.setdefault(user, deque()).append(waiter)
+            self._queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except BaseException as e:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiting[user].remove(waiter)
+                    if not self._waiting[user]:
+                        del self._waiting[user]
+                    self._queued -= 1
+            if granted:
+                # The slot was handed over as we gave up; pass it on
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("queue_timeout")
+            raise
+        waited = time.perf_counter() - start
+        QUEUE_SECONDS.observe(waited)
+        return waited
+
+    def release(self, service_seconds: Optional[float] = None):
+        """Frees a slot (from any thread), handing it to the next user in turn."""
+        waiter = None
+        with self._lock:
+            if service_seconds is not None:
+                self._service_seconds = 0.8 * self._service_seconds + 0.2 * service_seconds
+            if self._waiting:
+                user, queue = next(iter(self._waiting.items()))
+                waiter = queue.popleft()
+                # The user goes to the back of the rotation
+                del self._waiting[user]
+                if queue:
+                    self._waiting[user] = queue
+                self._queued -= 1
+                waiter.granted = True
+            else:
+                self._active -= 1
+        if waiter is not None:
+            waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+    def releaser(self) -> Callable[[], None]:
+        """An idempotent release for a held slot, timing the request from now."""
+        start = time.perf_counter()
+        lock = threading.Lock()
+        held = [True]
+
+        def release():
+            with lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            self.release(time.perf_counter() - start)
+        return release
+
+    @asynccontextmanager
+    async def slot(self, user: str):
+        """`async with admission.slot(user):` runs the body holding an admission slot."""
+        await self.acquire(user)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+
+class OutboundLimiter:
+    """
+    Caps concurrent provider calls in this process at its share of `limit` among
+    `workers` processes; callers block (in their thread) for a slot.
+    """
+
+    def __init__(self, limit: int = MAX_OUTBOUND, workers: int = 1):
+        self.limit = max(1, limit // workers)
+        self._semaphore = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextmanager
+    def slot(self, kind: str):
+        start = time.perf_counter()
+        self._semaphore.acquire()
+        OUTBOUND_WAIT_SECONDS.observe(time.perf_counter() - start, kind=kind)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._semaphore.release()
+
+
+# Global instances for easy access
+admission = AdmissionController()
+outbound = OutboundLimiter(MAX_OUTBOUND, configured_workers())
+metrics.gauge("kms_admission_active", "Chat requests currently admitted.", callback=admission.active)
+metrics.gauge("kms_admission_queued", "Chat requests waiting for admission.", callback=admission.queued)
+metrics.gauge("kms_outbound_in_flight", "Provider calls currently in flight.", callback=outbound.in_flight)
@@ -0,0 +1,286 @@
+"""
+Coordination between API worker processes on one host.
+
+With several uvicorn workers, exactly one of them (the leader, elected through
+an exclusive file lock in ``shared/run/``) rebuilds the vector store and runs
+the document monitor. Any worker asks for a rebuild by touching a request file
+that the leader polls; finished rebuilds are published in a generation file so
+callers can wait for a build that includes their change. Readers pick up a new
+index on their own because the retriever follows the published snapshot.
+Documents the API writes are marked there too, so the monitor does not rebuild
+again for a change the API has already re-indexed.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so every process acts as the (only) leader
+    fcntl = None
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RUN_DIR = os.path.join(project_root, 'shared', 'run')
+
+
+def configured_workers() -> int:
+    """Number of API worker processes (API_WORKERS, default 1)."""
+    try:
+        return max(1, int(os.getenv("API_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+class LeaderElection:
+    """
+    Elects one leader among the processes sharing `run_dir`. The lock is held for
+    the life of the leader process; followers retry every `interval` seconds and
+    take over if the leader exits.
+    """
+
+    def __init__(self, run_dir: str = RUN_DIR, interval: float = 5.0):
+        self.lock_path = os.path.join(run_dir, 'leader.lock')
+        self.interval = interval
+        self._fd: Optional[int] = None
+        self._stop = threading.Event()
+        os.makedirs(run_dir, exist_ok=True)
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def start(self, on_elected: Callable[[], None]) -> threading.Thread:
+        """Campaigns in the background; calls `on_elected` once this process leads."""
+        def campaign():
+            while not self._stop.is_set():
+                if self.try_acquire():
+                    print(f"👑 Worker {os.getpid()} elected leader (reindexing and document monitor)")
+                    on_elected()
+                    return
+                self._stop.wait(self.interval)
+
+        thread = threading.Thread(target=campaign, name="leader-election", daemon=True)
+        thread.start()
+        return thread
+
+    def release(self):
+        self._stop.set()
+        if self._fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+class ReindexCoordinator:
+    """
+    Single-writer rebuilds. `request()` may be called from any worker; only the
+    leader's `serve()` loop runs `rebuild`, coalescing requests that arrive while
+    a build is in progress into one follow-up build.
+
+    Requests for a `key` (a collection) have their own request and generation
+    files and call `rebuild(key)`; keys need no registration, so a collection
+    created on any worker is rebuilt by the leader.
+    """
+
+    def __init__(self, rebuild: Callable[..., None], run_dir: str = RUN_DIR, poll_interval: float = 0.5):
+        self.rebuild = rebuild
+        self.run_dir = run_dir
+        self.request_path = os.path.join(run_dir, 'reindex.request')
+        self.generation_path = os.path.join(run_dir, 'generation.json')
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(run_dir, exist_ok=True)
+
+    def _request_path(self, key: Optional[str]) -> str:
+        return self.request_path if key is None else os.path.join(self.run_dir, f'reindex.{key}.request')
+
+    def _generation_path(self, key: Optional[str]) -> str:
+        return self.generation_path if key is None else os.path.join(self.run_dir, f'generation.{key}.json')
+
+    # --- Any worker ---
+
+    def request(self, wait: bool = True, timeout: float = 600.0, key: Optional[str] = None) -> Optional[Dict]:
+        """
+        Asks the leader for a rebuild (of `key`). With `wait`, blocks until a build that
+        started after this request has finished and returns its generation record (None on timeout).
+        """
+        requested_at = time.time()
+        request_path = self._request_path(key)
+        with open(request_path, 'a'):
+            pass
+        os.utime(request_path, (requested_at, requested_at))
+        self._wake.set()  # no-op unless this process is the leader
+        if not wait:
+            return None
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            generation = self.current_generation(key)
+            if generation and generation["started"] >= requested_at:
+                return generation
+            time.sleep(self.poll_interval)
+        return None
+
+    def current_generation(self, key: Optional[str] = None) -> Optional[Dict]:
+        try:
+            with open(self._generation_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    # --- Leader only ---
+
+    def serve(self):
+        """Starts the leader's rebuild loop (idempotent)."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="reindex", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _requested_since(self, handled: float, key: Optional[str] = None) -> Optional[float]:
+        try:
+            mtime = os.path.getmtime(self._request_path(key))
+        except OSError:
+            return None
+        return mtime if mtime > handled else None
+
+    def _keys(self) -> List[Optional[str]]:
+        """None (the unkeyed store) and every key that has been requested."""
+        keys: List[Optional[str]] = [None]
+        try:
+            names = sorted(os.listdir(self.run_dir))
+        except OSError:
+            return keys
+        for name in names:
+            if name.startswith('reindex.') and name.endswith('.request') and name != 'reindex.request':
+                keys.append(name[len('reindex.'):-len('.request')])
+        return keys
+
+    def _loop(self):
+        handled: Dict[Optional[str], float] = {}
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            for key in self._keys():
+                if key not in handled:
+                    generation = self.current_generation(key)
+                    handled[key] = generation["started"] if generation else 0.0
+                requested = self._requested_since(handled[key], key)
+                if requested is None:
+                    continue
+                started = time.time()
+                handled[key] = max(requested, started)
+                try:
+                    if key is None:
+                        self.rebuild()
+                    else:
+                        self.rebuild(key)
+                    error = None
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                    print(f"❌ Reindexing failed: {error}")
+                self._publish(started, error, key)
+
+    def _publish(self, started: float, error: Optional[str], key: Optional[str] = None):
+        previous = self.current_generation(key) or {}
+        record = {
+            "generation": previous.get("generation", 0) + 1,
+            "started": started,
+            "finished": time.time(),
+            "pid": os.getpid(),
+            "error": error,
+        }
+        generation_path = self._generation_path(key)
+        tmp_path = f"{generation_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, generation_path)
+
+
+class CommittedPaths:
+    """
+    Documents the API has written or deleted and re-indexes itself. Any worker
+    `mark()`s a path right after changing it, recording the file's resulting state;
+    the leader's document monitor passes each settled change set through `claim()`,
+    which drops the changes that are still exactly those writes. A mark no change
+    claims (e.g. a file created and removed within one monitor window) expires after
+    `ttl` seconds.
+    """
+
+    def __init__(self, run_dir: str = RUN_DIR, ttl: float = 600.0):
+        self.dir = os.path.join(run_dir, 'committed')
+        self.ttl = ttl
+        os.makedirs(self.dir, exist_ok=True)
+
+    @staticmethod
+    def _state(path: str) -> Optional[List[int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None  # deleted
+        return [st.st_size, st.st_mtime_ns]
+
+    def _mark_path(self, path: str) -> str:
+        return os.path.join(self.dir, hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest() + '.json')
+
+    def mark(self, path: str):
+        mark_path = self._mark_path(path)
+        tmp_path = f"{mark_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"path": os.path.abspath(path), "state": self._state(path), "marked": time.time()}, f)
+        os.replace(tmp_path, mark_path)
+
+    def claim(self, changes: Dict[str, str]) -> Dict[str, str]:
+        """The changes (path -> kind) the API did not make; consumes the marks of those it did."""
+        now = time.time()
+        remaining = {}
+        for path, kind in changes.items():
+            mark_path = self._mark_path(path)
+            try:
+                with open(mark_path, 'r', encoding='utf-8') as f:
+                    mark = json.load(f)
+                os.remove(mark_path)
+            except (OSError, ValueError):
+                remaining[path] = kind
+                continue
+            if now - mark["marked"] > self.ttl or mark["state"] != self._state(path):
+                remaining[path] = kind  # changed again since the API wrote it
+        self._prune(now)
+        return remaining
+
+    def _prune(self, now: float):
+        try:
+            names = os.listdir(self.dir)
+        except OSError:
+            return
+        for name in names:
+            mark_path = os.path.join(self.dir, name)
+            try:
+                if now - os.path.getmtime(mark_path) > self.ttl:
+                    os.remove(mark_path)
+            except OSError:
+                pass
@@ -1,5 +1,7 @@
 import time
 import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import logging
@@ -9,47 +11,162 @@ logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(message)s',
                     datefmt='%Y-%m-%d %H:%M:%S')
 
-class PDFChangeHandler(FileSystemEventHandler):
-    """Handles file system events for PDF files."""
-    def __init__(self, callback):
+WATCHED_EXTENSIONS = ('.pdf', '.txt', '.docx')
+
+CREATED, MODIFIED, DELETED = "created", "modified", "deleted"
+
+
+def _merge(previous: Optional[str], current: str) -> Optional[str]:
+    """Folds a new event for a path into its pending change (None = no net change)."""
+    if previous is None:
+        return current
+    if current == DELETED:
+        # A file created and removed within one window never existed for the index
+        return None if previous == CREATED else DELETED
+    if previous == DELETED:
+        # Removed and written again (e.g. editors saving via replace)
+        return MODIFIED
+    if previous == CREATED:
+        return CREATED
+    return current
+
+
+class DocumentChangeHandler(FileSystemEventHandler):
+    """
+    Collects file system events for watched documents into a per-path change set.
+
+    Events are merged per path until no new event has arrived for `quiet_period`
+    seconds and every pending file has kept the same size and mtime for one more
+    period (so copies still being written are not picked up half-way). The callback
+    then receives the whole change set, e.g. {"/docs/a.pdf": "created"}, once.
+    """
+    def __init__(self, callback: Callable[[Dict[str, str]], None], quiet_period: float = 2.0,
+                 extensions: Tuple[str, ...] = WATCHED_EXTENSIONS):
         self.callback = callback
-        self.last_triggered = 0
-        self.debounce_period = 5 # seconds
+        self.quiet_period = quiet_period
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self._pending: Dict[str, str] = {}
+        self._stats: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _watched(self, path) -> bool:
+        return bool(path) and str(path).lower().endswith(self.extensions)
+
+    def _record(self, path: str, kind: str):
+        with self._lock:
+            merged = _merge(self._pending.get(path), kind)
+            if merged is None:
+                self._pending.pop(path, None)
+            else:
+                self._pending[path] = merged
+            self._stats.pop(path, None)
+            self._last_event = time.monotonic()
+        self._wake.set()
 
     def on_any_event(self, event):
-        """
-        Catches all events and triggers the callback for relevant PDF changes.
-        """
-        # Ignore directory events and non-PDF files
-        if event.is_directory or not event.src_path.lower().endswith('.pdf'):
+        """Records created/modified/deleted/moved events for watched documents."""
+        if event.is_directory:
             return
+        if event.event_type == 'moved':
+            # A move is a delete of the source and a create of the destination; either
+            # side may be outside the watched extensions (e.g. "upload.tmp" -> "a.pdf").
+            if self._watched(event.src_path):
+                self._record(event.src_path, DELETED)
+            if self._watched(getattr(event, 'dest_path', None)):
+                self._record(event.dest_path, CREATED)
+        elif event.event_type in (CREATED, MODIFIED, DELETED) and self._watched(event.src_path):
+            self._record(event.src_path, event.event_type)
 
-        # Debounce to avoid multiple rapid triggers for a single file save
-        current_time = time.time()
-        if current_time - self.last_triggered < self.debounce_period:
-            logging.info(f"Debouncing event for {os.path.basename(event.src_path)}")
-            return
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _take_if_settled(self) -> Optional[Dict[str, str]]:
+        """Returns the change set if it is quiet and stable, otherwise None."""
+        with self._lock:
+            if not self._pending or time.monotonic() - self._last_event < self.quiet_period:
+                return None
+            paths = [path for path, kind in self._pending.items() if kind != DELETED]
+        stats = {path: self._stat(path) for path in paths}
+        with self._lock:
+            settled = all(self._stats.get(path, ()) == stat for path, stat in stats.items())
+            self._stats.update(stats)
+            if not settled:
+                return None
+            changes = {}
+            for path, kind in self._pending.items():
+                if kind != DELETED and stats.get(path) is None:
+                    # Vanished without a delete event we saw
+                    if kind == CREATED:
+                        continue
+                    kind = DELETED
+                changes[path] = kind
+            self._pending.clear()
+            self._stats.clear()
+            return changes
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.quiet_period / 2)
+            self._wake.clear()
+            changes = self._take_if_settled()
+            if not changes:
+                continue
+            counts = {kind: sum(1 for k in changes.values() if k == kind) for kind in (CREATED, MODIFIED, DELETED)}
+            logging.info("Detected document changes (%s). Triggering re-indexing.",
+                         ", ".join(f"{n} {kind}" for kind, n in counts.items() if n))
+            try:
+                self.callback(changes)
+            except Exception as e:
+                logging.error(f"Document change callback failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="document-changes", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
 
-        if event.event_type in ['created', 'modified']:
-            logging.info(f"Detected change in {os.path.basename(event.src_path)}. Triggering re-indexing.")
-            self.last_triggered = current_time
-            self.callback()
 
 class DocumentMonitor:
     """Monitors a directory for document changes."""
-    def __init__(self, path, callback):
+    def __init__(self, path, callback, quiet_period: float = 2.0):
         self.observer = Observer()
         self.path = path
-        self.event_handler = PDFChangeHandler(callback=callback)
+        self.event_handler = DocumentChangeHandler(callback=callback, quiet_period=quiet_period)
+        self._started = False
 
     def start(self):
         """Starts the monitoring in a non-blocking way."""
+        if self._started:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        self.event_handler.start()
         self.observer.schedule(self.event_handler, self.path, recursive=False)
         self.observer.start()
+        self._started = True
         logging.info(f"Started monitoring directory: {self.path}")
 
     def stop(self):
-        """Stops the monitoring."""
+        """Stops the monitoring (safe to call if it was never started)."""
+        if not self._started:
+            return
         self.observer.stop()
         self.observer.join()
+        self.event_handler.stop()
+        self._started = False
         logging.info("Stopped monitoring directory.")
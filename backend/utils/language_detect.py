@@ -1,4 +1,52 @@
-from langdetect import detect, LangDetectException
+"""
+Deterministic English/Indonesian language detection.
+
+The corpus and its users mix Indonesian and English, so only those two need
+telling apart. Text is scored by its function words (stopwords are abundant and
+almost disjoint between the two languages) plus Indonesian -nya/-kan word
+endings, over at most the first SAMPLE_WORDS words. This takes microseconds,
+gives the same answer on every run, and is used both to tag chunks at ingestion
+and to pick the index partition for a query. Text without a clear majority
+(too short, mixed or language-neutral, like tables of figures) is 'unknown'.
+"""
+import re
+from functools import lru_cache
+
+SAMPLE_WORDS = 300
+# Share of the evidence the winning language needs
+MIN_SHARE = 0.75
+
+ENGLISH = frozenset("""
+    a an the of and or to in on at by for from with without into about as is are was were be been being
+    this that these those it its which who whom whose what when where why how must shall should can could
+    may might will would not no has have had do does did their there they than then any all each such
+    if under between within only also other
+""".split())
+
+INDONESIAN = frozenset("""
+    yang dan di ke dari dalam untuk dengan pada adalah ini itu tersebut atau oleh sebagai tidak bukan
+    akan dapat harus bagi atas tentang serta bahwa telah sudah belum secara apa apakah bagaimana berapa
+    siapa kapan mana mengapa kenapa saja juga jika apabila maka karena sehingga agar setiap antara
+    kepada terhadap paling sebagaimana dimaksud ada tidaklah tolong mohon
+""".split())
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+
+def _scores(text: str):
+    english = indonesian = 0.0
+    for i, match in enumerate(_WORD.finditer(text.lower())):
+        if i >= SAMPLE_WORDS:
+            break
+        word = match.group()
+        if word in ENGLISH:
+            english += 1
+        elif word in INDONESIAN:
+            indonesian += 1
+        elif len(word) > 5 and word.endswith(("nya", "kan")):
+            indonesian += 0.5
+    return english, indonesian
+
 
 def detect_language(text: str) -> str:
     """
@@ -8,24 +56,26 @@ def detect_language(text: str) -> str:
         text: The input text.
 
     Returns:
-        The ISO 639-1 language code ('en', 'id') or 'unknown' if detection fails.
+        The ISO 639-1 language code ('en', 'id') or 'unknown' if there is no clear majority.
     """
     if not text or not text.strip():
         return 'unknown'
-    
-    try:
-        # Detect the language
-        lang = detect(text)
-        # We are primarily concerned with English and Indonesian
-        if lang in ['en', 'id']:
-            return lang
-        else:
-            # Return the detected language if it's something else but supported
-            # For this project, we'll consider other languages as 'unknown' for simplicity
-            return 'unknown'
-    except LangDetectException:
-        # This exception is thrown for texts that are too short or ambiguous
+    english, indonesian = _scores(text)
+    total = english + indonesian
+    if total < 1:
         return 'unknown'
+    if english / total >= MIN_SHARE:
+        return 'en'
+    if indonesian / total >= MIN_SHARE:
+        return 'id'
+    return 'unknown'
+
+
+@lru_cache(maxsize=4096)
+def detect_query_language(query: str) -> str:
+    """detect_language for user queries, cached since the same questions recur."""
+    return detect_language(query)
+
 
 if __name__ == '__main__':
     # --- Test Cases ---
@@ -41,4 +91,4 @@ if __name__ == '__main__':
     for name, text in test_texts.items():
         detected_lang = detect_language(text)
         print(f"- Query: '{text}'")
-        print(f"  Detected Language: {detected_lang}\n")
\ No newline at end of file
+        print(f"  Detected Language: {detected_lang}\n")
@@ -0,0 +1,211 @@
+"""
+Opt-in per-request profiling.
+
+A profiled call gets a sampling CPU profile of the thread running it (stacks
+read from ``sys._current_frames()`` at a fixed interval by a helper thread)
+plus a tracemalloc diff of the allocations made while it ran. The CPU profile
+is stored as a speedscope file (https://www.speedscope.app) and the allocation
+report as JSON, both under ``shared/profiles/`` and retrievable through the
+admin endpoints. Unprofiled requests pay nothing beyond the trigger check.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROFILES_DIR = os.path.join(project_root, 'shared', 'profiles')
+SAMPLE_INTERVAL = 0.005   # seconds between stack samples
+MAX_PROFILES = 50         # older profiles are deleted
+TOP_ALLOCATIONS = 50
+
+
+def profile_sample_rate() -> float:
+    """Fraction of eligible requests profiled without an explicit trigger (PROFILE_SAMPLE_RATE)."""
+    try:
+        return float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    except ValueError:
+        return 0.0
+
+
+def should_profile(flag: Optional[str] = None) -> bool:
+    """True when a request asked for profiling (header/query flag) or was sampled."""
+    if flag is not None and flag.lower() in ("1", "true", "yes"):
+        return True
+    rate = profile_sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+class _Sampler(threading.Thread):
+    """Samples the stack of one thread until stopped."""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples: List[Tuple[Tuple[str, str, int], ...]] = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()  # root first, as speedscope expects
+                self.samples.append(tuple(stack))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfiler:
+    """Runs calls under the sampling profiler and tracemalloc, one at a time."""
+
+    def __init__(self, profiles_dir: str = PROFILES_DIR, interval: float = SAMPLE_INTERVAL):
+        self.profiles_dir = profiles_dir
+        self.interval = interval
+        # tracemalloc is process-wide: overlapping profiles would mix their allocations
+        self._busy = threading.Lock()
+
+    def profile_call(self, label: str, fn: Callable, *args, **kwargs) -> Tuple[Any, Optional[str]]:
+        """
+        Calls fn(*args, **kwargs) in the current thread, profiling it if no other
+        profile is running. Returns (result, profile_id or None).
+        """
+        if not self._busy.acquire(blocking=False):
+            return fn(*args, **kwargs), None
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(25)
+            before = tracemalloc.take_snapshot()
+            sampler = _Sampler(threading.get_ident(), self.interval)
+            wall_start = time.perf_counter()
+            sampler.start()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                sampler.stop()
+                duration = time.perf_counter() - wall_start
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if started_tracing:
+                    tracemalloc.stop()
+                profile_id = self._save(label, sampler.samples, duration, before, after, peak)
+            return result, profile_id
+        finally:
+            self._busy.release()
+
+    # --- Storage ---
+
+    def _save(self, label: str, samples, duration: float, before, after, peak: int) -> str:
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        frames: List[Dict[str, Any]] = []
+        frame_index: Dict[Tuple[str, str, int], int] = {}
+        sample_refs = []
+        for stack in samples:
+            refs = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                refs.append(frame_index[frame])
+            sample_refs.append(refs)
+        speedscope = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{label} {profile_id}",
+            "exporter": "kms-request-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": label,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": sample_refs,
+                "weights": [self.interval] * len(sample_refs),
+            }],
+        }
+
+        # Leave out the profiler's own bookkeeping (sample lists, snapshots)
+        ignore = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+        memory = {
+            "label": label,
+            "peak_traced_bytes": peak,
+            "net_allocated_bytes": sum(s.size_diff for s in stats),
+            "top_allocations": [
+                {
+                    "location": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                    "size_diff_bytes": s.size_diff,
+                    "count_diff": s.count_diff,
+                }
+                for s in stats[:TOP_ALLOCATIONS]
+            ],
+        }
+
+        with open(self._path(profile_id, "speedscope"), 'w', encoding='utf-8') as f:
+            json.dump(speedscope, f)
+        with open(self._path(profile_id, "memory"), 'w', encoding='utf-8') as f:
+            json.dump(memory, f, indent=2)
+        with open(self._path(profile_id, "meta"), 'w', encoding='utf-8') as f:
+            json.dump({
+                "id": profile_id,
+                "label": label,
+                "created": datetime.now().isoformat(timespec='seconds'),
+                "duration_seconds": duration,
+                "samples": len(sample_refs),
+                "peak_traced_bytes": peak,
+            }, f)
+        self._prune()
+        print(f"📈 Stored profile {profile_id} ({label}, {duration:.2f}s, {len(sample_refs)} samples)")
+        return profile_id
+
+    def _path(self, profile_id: str, kind: str) -> str:
+        return os.path.join(self.profiles_dir, f"{profile_id}.{kind}.json")
+
+    def _prune(self):
+        metas = sorted(f for f in os.listdir(self.profiles_dir) if f.endswith(".meta.json"))
+        for name in metas[:-MAX_PROFILES]:
+            profile_id = name[:-len(".meta.json")]
+            for kind in ("speedscope", "memory", "meta"):
+                try:
+                    os.remove(self._path(profile_id, kind))
+                except OSError:
+                    pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Stored profiles, newest first."""
+        if not os.path.isdir(self.profiles_dir):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.profiles_dir), reverse=True):
+            if name.endswith(".meta.json"):
+                with open(os.path.join(self.profiles_dir, name), 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+        return profiles
+
+    def profile_path(self, profile_id: str, kind: str = "speedscope") -> Optional[str]:
+        """Path of a stored profile file, or None if it does not exist."""
+        # Profile ids are generated by us; reject anything that could escape the directory
+        if os.path.basename(profile_id) != profile_id or kind not in ("speedscope", "memory"):
+            return None
+        path = self._path(profile_id, kind)
+        return path if os.path.exists(path) else None
+
+
+# Global instance for easy access
+request_profiler = RequestProfiler()
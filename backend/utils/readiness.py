@@ -0,0 +1,72 @@
+"""
+Start-up readiness tracking.
+
+The API binds immediately; expensive initialisation (initial indexing, loading
+the FAISS index and metadata, tokenizer files, importing the assistant flow)
+runs as named warm-up tasks in the background. `/api/ready` reports them so a
+load balancer only routes traffic once retrieval is warm, while `/api/health`
+keeps answering from the first second.
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable
+
+PENDING, RUNNING, READY, FAILED = "pending", "running", "ready", "failed"
+
+
+class Readiness:
+    """Tracks named warm-up components; ready once every required one is."""
+
+    def __init__(self, required: Iterable[str] = ()):
+        self.required = tuple(required)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._components: Dict[str, Dict[str, Any]] = {name: {"state": PENDING} for name in self.required}
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self._components.setdefault(name, {"state": PENDING}).update(fields)
+
+    def run_task(self, name: str, fn: Callable[[], Any]) -> bool:
+        """Runs one warm-up task, recording its state, duration and any error."""
+        self._update(name, state=RUNNING, error=None)
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            self._update(name, state=FAILED, error=f"{type(e).__name__}: {e}",
+                         seconds=round(time.perf_counter() - start, 3))
+            print(f"⚠️  Warm-up of {name} failed: {e}")
+            return False
+        self._update(name, state=READY, seconds=round(time.perf_counter() - start, 3))
+        return True
+
+    def run_parallel(self, tasks: Dict[str, Callable[[], Any]]) -> bool:
+        """Runs independent warm-up tasks concurrently; True if all succeeded."""
+        for name in tasks:
+            self._update(name, state=PENDING)
+        with ThreadPoolExecutor(max_workers=len(tasks) or 1, thread_name_prefix="warmup") as pool:
+            futures = [pool.submit(self.run_task, name, fn) for name, fn in tasks.items()]
+            return all(f.result() for f in futures)
+
+    def start(self, warm_up: Callable[[], Any]) -> threading.Thread:
+        """Runs `warm_up` on a daemon thread so start-up never blocks serving."""
+        thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+        thread.start()
+        return thread
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return all(self._components.get(name, {}).get("state") == READY for name in self.required)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(info) for name, info in self._components.items()}
+        return {
+            "ready": all(components.get(name, {}).get("state") == READY for name in self.required),
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "components": components,
+        }
+
@@ -1,11 +1,63 @@
 import os
+import json
+import queue
+import atexit
+import threading
 import tiktoken
 from datetime import datetime
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, List
+
+from backend.utils.usage_store import UsageStore
+from backend.utils.metrics import metrics, TOKENS, LLM_COST, TOKEN_LOG_DROPPED
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_LOG_FILE = os.path.join(project_root, 'shared', 'logs', 'token_usage.jsonl')
+
+
+@lru_cache(maxsize=None)
+def _encoding_for(model: str):
+    """Resolves (once per model) the tiktoken encoding used to estimate token counts."""
+    try:
+        if model.startswith("text-embedding"):
+            return tiktoken.get_encoding("cl100k_base")
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def _usage_tokens(usage) -> Optional[tuple]:
+    """
+    Extracts (input_tokens, output_tokens) from provider-reported usage, which may be
+    an OpenAI usage object or a LangChain ``token_usage`` dict. Returns None if absent.
+    """
+    if usage is None:
+        return None
+    get = usage.get if isinstance(usage, dict) else lambda key, default=None: getattr(usage, key, default)
+    prompt_tokens = get("prompt_tokens")
+    if prompt_tokens is None:
+        return None
+    return int(prompt_tokens), int(get("completion_tokens", 0) or 0)
+
+
+def document_names(metadatas) -> Optional[str]:
+    """
+    The distinct source documents (``file_name``) behind some chunk metadata, sorted
+    and comma-joined, as recorded in a usage record's ``document`` field.
+    """
+    names = sorted({meta.get("file_name") for meta in metadatas if meta and meta.get("file_name")})
+    return ", ".join(names) or None
+
 
 class TokenLogger:
-    """Comprehensive token usage and cost tracking for all LLM activities."""
-    
+    """Comprehensive token usage and cost tracking for all LLM activities.
+
+    Records are structured JSON lines. Logging only enqueues a record; a background
+    writer thread counts any tokens the provider did not report, then appends records
+    to the log in batches and rotates the file when it grows past ``max_bytes``.
+    Each batch is also folded into the usage store's rollups for cost queries.
+    """
+
     # OpenAI pricing per 1K tokens (as of 2024, update as needed)
     PRICING = {
         "gpt-4o": {"input": 0.005, "output": 0.015},      # $5.00 / 1M input, $15.00 / 1M output
@@ -16,97 +68,234 @@ class TokenLogger:
         "gpt-4.1-nano": {"input": 0.0001, "output": 0.0002},  # Estimated for nano model
         "text-embedding-3-large": {"input": 0.00013, "output": 0.0}, # $0.13 / 1M tokens (embedding only)
     }
-    
-    def __init__(self, log_file: str = "shared/logs/token_usage.log"):
+
+    def __init__(self, log_file: str = DEFAULT_LOG_FILE, max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 5, batch_size: int = 256, flush_interval: float = 1.0,
+                 max_queue: int = 100_000, usage_store: Optional[UsageStore] = None):
         """Initialize the token logger."""
         self.log_file = log_file
+        self.usage_store = usage_store
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
+
     def count_tokens(self, text: str, model: str = "gpt-4") -> int:
         """Count tokens in text using the appropriate tokenizer for the model."""
-        try:
-            if model.startswith("text-embedding"):
-                encoding = tiktoken.get_encoding("cl100k_base")
-            else:
-                encoding = tiktoken.encoding_for_model(model)
-        except Exception:
-            encoding = tiktoken.get_encoding("cl100k_base")
-        
-        return len(encoding.encode(text))
-    
+        return len(_encoding_for(model).encode(text or ""))
+
     def calculate_cost(self, input_tokens: int, output_tokens: int, model: str) -> float:
         """Calculate cost based on input and output tokens for the specific model."""
         model_pricing = self.PRICING.get(model, self.PRICING["gpt-4.1-nano"])
-        
+
         input_cost = (input_tokens / 1000) * model_pricing["input"]
         output_cost = (output_tokens / 1000) * model_pricing["output"]
-        
+
         return input_cost + output_cost
-    
-    def log_activity(self, activity_type: str, model: str, input_tokens: int, 
-                    output_tokens: int = 0, additional_info: Optional[Dict[str, Any]] = None):
-        """Log token usage and cost for any LLM activity."""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        total_tokens = input_tokens + output_tokens
-        cost = self.calculate_cost(input_tokens, output_tokens, model)
-        
-        log_entry = f"[{timestamp}] {activity_type.upper()}\n"
-        log_entry += f"Model: {model}\n"
-        log_entry += f"Input tokens: {input_tokens:,}\n"
-        log_entry += f"Output tokens: {output_tokens:,}\n"
-        log_entry += f"Total tokens: {total_tokens:,}\n"
-        log_entry += f"Estimated cost: ${cost:.6f}\n"
-        
+
+    def log_activity(self, activity_type: str, model: str, input_tokens: Optional[int] = None,
+                    output_tokens: Optional[int] = 0, additional_info: Optional[Dict[str, Any]] = None,
+                    input_text: Optional[str] = None, output_text: Optional[str] = None,
+                    source: Optional[str] = None):
+        """
+        Log token usage and cost for any LLM activity. Never blocks: the record is
+        queued and written by the background writer.
+
+        Token counts that are None are counted in the background from
+        `input_text` / `output_text`. `source` labels where the counts came from
+        ('provider' or 'estimated'); by default, given counts are taken as provider-reported.
+        """
+        record = {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "activity": activity_type,
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "usage_source": source or ("provider" if input_tokens is not None else "estimated"),
+        }
         if additional_info:
-            for key, value in additional_info.items():
-                log_entry += f"{key}: {value}\n"
-        
-        log_entry += "-" * 50 + "\n"
-        
+            record.update({k: v for k, v in additional_info.items() if v is not None})
+        self._ensure_writer()
         try:
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(log_entry)
-        except Exception as e:
-            print(f"[TOKEN LOGGING ERROR] Could not write to {self.log_file}: {e}")
-    
-    def log_embedding(self, text: str, model: str = "text-embedding-3-large", 
-                     file_name: Optional[str] = None):
-        """Log embedding token usage."""
-        input_tokens = self.count_tokens(text, model)
-        additional_info = {"File": file_name} if file_name else None
-        self.log_activity("embedding", model, input_tokens, 0, additional_info)
-    
+            self._queue.put_nowait((record, input_text, output_text))
+        except queue.Full:
+            # Accounting must never slow down a request; count what we shed instead.
+            self.dropped += 1
+            TOKEN_LOG_DROPPED.inc()
+
+    def log_embedding(self, text: Optional[str] = None, model: str = "text-embedding-3-large",
+                     file_name: Optional[str] = None, usage=None, input_tokens: Optional[int] = None,
+                     document: Optional[str] = None, source: Optional[str] = None):
+        """
+        Log embedding token usage for the source `document`. Provider `usage` wins; a
+        locally counted `input_tokens` skips re-encoding but is recorded as estimated
+        unless `source` says otherwise (a share of a provider-reported batch total).
+        """
+        reported = _usage_tokens(usage)
+        if reported is not None:
+            input_tokens = reported[0]
+        self.log_activity("embedding", model, input_tokens, 0, {"file": file_name, "document": document},
+                          input_text=text, source=source or ("provider" if reported is not None else "estimated"))
+
     def log_answer_generation(self, prompt: str, response: str, model: str = "gpt-4.1-nano",
-                            query: Optional[str] = None):
-        """Log answer generation token usage."""
-        input_tokens = self.count_tokens(prompt, model)
-        output_tokens = self.count_tokens(response, model)
-        additional_info = {"Query": query} if query else None
-        self.log_activity("answer_generation", model, input_tokens, output_tokens, additional_info)
-    
+                            query: Optional[str] = None, usage=None, document: Optional[str] = None):
+        """Log answer generation token usage against the cited `document`(s)."""
+        reported = _usage_tokens(usage)
+        input_tokens, output_tokens = reported or (None, None)
+        self.log_activity("answer_generation", model, input_tokens, output_tokens,
+                          {"query": query, "document": document}, input_text=prompt, output_text=response,
+                          source="provider" if reported is not None else "estimated")
+
     def log_summarization(self, input_text: str, summary: str, model: str = "gpt-4.1-nano",
-                         summary_type: str = "document"):
-        """Log summarization token usage."""
-        input_tokens = self.count_tokens(input_text, model)
-        output_tokens = self.count_tokens(summary, model)
-        additional_info = {"Summary type": summary_type}
-        self.log_activity("summarization", model, input_tokens, output_tokens, additional_info)
-    
-    def log_chat_summarization(self, chat_history: str, summary: str, model: str = "gpt-4.1-nano"):
+                         summary_type: str = "document", usage=None, document: Optional[str] = None):
+        """Log summarization token usage against the summarized `document`(s)."""
+        reported = _usage_tokens(usage)
+        input_tokens, output_tokens = reported or (None, None)
+        self.log_activity("summarization", model, input_tokens, output_tokens,
+                          {"summary_type": summary_type, "document": document},
+                          input_text=input_text, output_text=summary,
+                          source="provider" if reported is not None else "estimated")
+
+    def log_chat_summarization(self, chat_history: str, summary: str, model: str = "gpt-4.1-nano", usage=None):
         """Log chat history summarization token usage."""
-        input_tokens = self.count_tokens(chat_history, model)
-        output_tokens = self.count_tokens(summary, model)
-        self.log_activity("chat_summarization", model, input_tokens, output_tokens)
-    
+        reported = _usage_tokens(usage)
+        input_tokens, output_tokens = reported or (None, None)
+        self.log_activity("chat_summarization", model, input_tokens, output_tokens,
+                          input_text=chat_history, output_text=summary,
+                          source="provider" if reported is not None else "estimated")
+
     def get_total_usage(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
-        """Get total token usage and cost for a date range."""
-        # This is a placeholder for future implementation
-        # Would parse the log file and aggregate usage
+        """
+        Get total token usage and cost for a date range ('YYYY-MM-DD' or ISO datetimes,
+        both inclusive), broken down by activity. Served from the usage store rollups;
+        records still queued in the writer (at most ``flush_interval`` old) are not included.
+        """
+        if self.usage_store is None:
+            return {"total_tokens": 0, "total_cost": 0.0, "activities": {}}
+        rows = self.usage_store.query(start_date, end_date, group_by="activity")
         return {
-            "total_tokens": 0,
-            "total_cost": 0.0,
-            "activities": {}
+            "total_tokens": sum(r["total_tokens"] for r in rows),
+            "total_cost": round(sum(r["cost"] for r in rows), 8),
+            "activities": {r["group"]: r for r in rows}
         }
 
+    def flush(self, timeout: float = 5.0):
+        """Blocks until every queued record has been written (for shutdown, scripts and tests)."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        try:
+            self._queue.put((None, done, None), timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    # --- Background writer ---
+
+    def _ensure_writer(self):
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="token-logger", daemon=True)
+                self._writer.start()
+
+    def _complete(self, record: Dict[str, Any], input_text: Optional[str], output_text: Optional[str]) -> Dict[str, Any]:
+        model = record["model"]
+        if record["input_tokens"] is None:
+            record["input_tokens"] = self._estimate_tokens(input_text, model)
+        if record["output_tokens"] is None:
+            record["output_tokens"] = self._estimate_tokens(output_text, model)
+        record["total_tokens"] = record["input_tokens"] + record["output_tokens"]
+        record["cost"] = round(self.calculate_cost(record["input_tokens"], record["output_tokens"], model), 8)
+        TOKENS.inc(record["input_tokens"], activity=record["activity"], model=model, direction="input")
+        TOKENS.inc(record["output_tokens"], activity=record["activity"], model=model, direction="output")
+        LLM_COST.inc(record["cost"], activity=record["activity"])
+        return record
+
+    def _estimate_tokens(self, text: Optional[str], model: str) -> int:
+        if not text:
+            return 0
+        try:
+            return self.count_tokens(text, model)
+        except Exception:
+            # Tokenizer unavailable (e.g. encoding files cannot be downloaded);
+            # ~4 characters per token keeps the record usable.
+            return max(1, len(text) // 4)
+
+    def _write_loop(self):
+        while True:
+            batch: List[Dict[str, Any]] = []
+            waiters: List[threading.Event] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            try:
+                while True:
+                    record, input_text, output_text = item
+                    if record is None:
+                        waiters.append(input_text)  # flush marker carries its Event
+                    else:
+                        try:
+                            batch.append(self._complete(record, input_text, output_text))
+                        except Exception as e:
+                            # One bad record must not take the writer (and every later record) down
+                            print(f"[TOKEN LOGGING ERROR] Skipping unaccountable record {record!r}: {e}")
+                    if len(batch) >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._write_batch(batch)
+                    self._store_batch(batch)
+            finally:
+                for done in waiters:
+                    done.set()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in batch)
+        try:
+            self._rotate_if_needed(len(lines))
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except Exception as e:
+            print(f"[TOKEN LOGGING ERROR] Could not write to {self.log_file}: {e}")
+
+    def _store_batch(self, batch: List[Dict[str, Any]]):
+        if self.usage_store is None:
+            return
+        try:
+            self.usage_store.add(batch)
+        except Exception as e:
+            print(f"[TOKEN LOGGING ERROR] Could not update usage rollups: {e}")
+
+    def _rotate_if_needed(self, incoming: int):
+        try:
+            size = os.path.getsize(self.log_file)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        # token_usage.jsonl -> .1 -> .2 ... like logging.handlers.RotatingFileHandler
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.log_file}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.log_file}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.log_file, f"{self.log_file}.1")
+        else:
+            os.remove(self.log_file)
+
 # Global instance for easy access
-token_logger = TokenLogger() 
\ No newline at end of file
+token_logger = TokenLogger(usage_store=UsageStore())
+atexit.register(token_logger.flush)
+metrics.gauge("kms_token_log_queue_depth", "Token usage records waiting for the background writer.",
+              callback=token_logger._queue.qsize)
@@ -0,0 +1,83 @@
+"""
+Staging document uploads.
+
+The multipart parser spools each uploaded file to a temporary file first; the API
+caps the raw request body as it arrives (UploadBodyLimit), so an oversized upload
+is cut off before it is spooled in full. The spooled file is then copied in
+fixed-size blocks into a temporary file next to its destination while its SHA-256
+is computed, so the content hash (the same digest the loader records in the
+catalog) is known as soon as the last block is written, without reading the
+document again. A file that crosses the size limit is abandoned at that block.
+The temporary file is fsynced and moved into place with an atomic rename, so the
+document monitor and the loader never see a half-written document; its `.part`
+suffix keeps it out of both until then.
+"""
+import os
+import hashlib
+import tempfile
+from typing import BinaryIO, NamedTuple
+
+# Largest accepted document, in MiB
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+# Most files accepted by one batch upload
+MAX_BATCH_FILES = int(os.getenv("MAX_UPLOAD_FILES", "50"))
+BLOCK_SIZE = 1024 * 1024
+PART_SUFFIX = ".part"
+
+
+class UploadTooLarge(Exception):
+    """The upload is larger than the configured limit."""
+
+
+class StagedUpload(NamedTuple):
+    filename: str
+    path: str  # temporary file, renamed into place by commit_upload
+    content_hash: str
+    size: int
+
+
+def safe_filename(filename: str) -> str:
+    """The upload's base name; rejects empty, hidden and path-only names."""
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if not name or name.startswith('.'):
+        raise ValueError(f"Invalid file name: {filename!r}")
+    return name
+
+
+def stage_upload(source: BinaryIO, filename: str, directory: str, max_bytes: int = MAX_UPLOAD_BYTES,
+                 block_size: int = BLOCK_SIZE) -> StagedUpload:
+    """
+    Copies `source` into a temporary file in `directory`, hashing it on the way.
+    Raises UploadTooLarge (leaving nothing behind) once more than `max_bytes` arrive.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{filename}.", suffix=PART_SUFFIX, dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for block in iter(lambda: source.read(block_size), b''):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"{filename} is larger than the {max_bytes // (1024 * 1024)} MiB upload limit")
+                digest.update(block)
+                f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        discard_upload(tmp_path)
+        raise
+    return StagedUpload(filename, tmp_path, digest.hexdigest(), size)
+
+
+def commit_upload(staged: StagedUpload, directory: str) -> str:
+    """Atomically moves a staged upload to its final name (replacing any older version)."""
+    final_path = os.path.join(directory, staged.filename)
+    os.replace(staged.path, final_path)
+    return final_path
+
+
+def discard_upload(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,192 @@
+"""
+Append-only token usage store with incrementally maintained rollups.
+
+Every record written by the TokenLogger is appended to ``records`` and folded
+into per-hour and per-day rollups keyed by (bucket, activity, model, document).
+Date-range cost queries then read a handful of rollup rows instead of
+re-parsing the log, no matter how many calls have been recorded.
+"""
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_USAGE_DB = os.path.join(project_root, 'shared', 'logs', 'usage.db')
+
+GROUP_COLUMNS = {
+    "activity": "activity",
+    "model": "model",
+    "document": "document",
+    "day": "substr(bucket, 1, 10)",
+    "hour": "bucket",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    activity TEXT NOT NULL,
+    model TEXT NOT NULL,
+    document TEXT NOT NULL DEFAULT '',
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS rollup_hourly (
+    bucket TEXT NOT NULL,             -- YYYY-MM-DDTHH
+    activity TEXT NOT NULL,
+    model TEXT NOT NULL,
+    document TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (bucket, activity, model, document)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    bucket TEXT NOT NULL,             -- YYYY-MM-DD
+    activity TEXT NOT NULL,
+    model TEXT NOT NULL,
+    document TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (bucket, activity, model, document)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO {table} (bucket, activity, model, document, calls, input_tokens, output_tokens, cost)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket, activity, model, document) DO UPDATE SET
+    calls = calls + excluded.calls,
+    input_tokens = input_tokens + excluded.input_tokens,
+    output_tokens = output_tokens + excluded.output_tokens,
+    cost = cost + excluded.cost
+"""
+
+_CORE_FIELDS = {"timestamp", "activity", "model", "document", "input_tokens", "output_tokens", "total_tokens", "cost"}
+
+
+def _parse_bound(value: Optional[str], end: bool = False) -> Tuple[Optional[datetime], bool]:
+    """Parses 'YYYY-MM-DD' or an ISO datetime; returns (datetime, is_date_only)."""
+    if not value:
+        return None, True
+    if len(value) == 10:
+        day = datetime.strptime(value, "%Y-%m-%d")
+        return (day + timedelta(days=1) - timedelta(hours=1)) if end else day, True
+    return datetime.fromisoformat(value), False
+
+
+class UsageStore:
+    """SQLite-backed usage records plus hourly/daily rollups."""
+
+    def __init__(self, db_path: str = DEFAULT_USAGE_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread: the logger's writer thread appends while API
+        # threads query. WAL lets readers proceed during writes.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, records: Iterable[Dict[str, Any]]):
+        """Appends records and folds them into the rollups in one transaction."""
+        rows = []
+        hourly: Dict[tuple, List] = {}
+        daily: Dict[tuple, List] = {}
+        for record in records:
+            timestamp = record["timestamp"]
+            document = record.get("document") or ""
+            input_tokens = int(record.get("input_tokens") or 0)
+            output_tokens = int(record.get("output_tokens") or 0)
+            cost = float(record.get("cost") or 0.0)
+            extra = {k: v for k, v in record.items() if k not in _CORE_FIELDS}
+            rows.append((timestamp, record["activity"], record["model"], document,
+                         input_tokens, output_tokens, cost, json.dumps(extra, ensure_ascii=False) if extra else None))
+            for table, bucket in ((hourly, timestamp[:13]), (daily, timestamp[:10])):
+                totals = table.setdefault((bucket, record["activity"], record["model"], document), [0, 0, 0, 0.0])
+                totals[0] += 1
+                totals[1] += input_tokens
+                totals[2] += output_tokens
+                totals[3] += cost
+        if not rows:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO records (timestamp, activity, model, document, input_tokens, output_tokens, cost, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany(_UPSERT.format(table="rollup_hourly"), [k + tuple(v) for k, v in hourly.items()])
+            conn.executemany(_UPSERT.format(table="rollup_daily"), [k + tuple(v) for k, v in daily.items()])
+
+    def query(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+              group_by: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregates usage between two inclusive bounds ('YYYY-MM-DD' or ISO datetimes,
+        hour resolution). Whole-day ranges read the daily rollup, anything finer the
+        hourly one. Returns one row per group (or a single total row).
+        """
+        if group_by is not None and group_by not in GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of {sorted(GROUP_COLUMNS)}")
+        start, start_is_date = _parse_bound(start_date)
+        end, end_is_date = _parse_bound(end_date, end=True)
+        if start_is_date and end_is_date and group_by != "hour":
+            table, fmt = "rollup_daily", "%Y-%m-%d"
+        else:
+            table, fmt = "rollup_hourly", "%Y-%m-%dT%H"
+
+        where, params = [], []
+        if start is not None:
+            where.append("bucket >= ?")
+            params.append(start.strftime(fmt))
+        if end is not None:
+            where.append("bucket <= ?")
+            params.append(end.strftime(fmt))
+        key = GROUP_COLUMNS[group_by] if group_by else "'total'"
+        sql = (f"SELECT {key} AS grp, SUM(calls), SUM(input_tokens), SUM(output_tokens), SUM(cost) FROM {table}"
+               + (f" WHERE {' AND '.join(where)}" if where else "")
+               + " GROUP BY grp ORDER BY grp")
+        results = []
+        for grp, calls, input_tokens, output_tokens, cost in self._connect().execute(sql, params):
+            if not calls:
+                continue
+            results.append({
+                "group": grp,
+                "calls": calls,
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "cost": round(cost, 8),
+            })
+        return results
+
+    def rebuild_from_jsonl(self, log_file: str) -> int:
+        """Replays a token_usage.jsonl file into an empty store. Returns the record count."""
+        count = 0
+        batch = []
+        with open(log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= 10_000:
+                    self.add(batch)
+                    count += len(batch)
+                    batch = []
+        self.add(batch)
+        return count + len(batch)
@@ -1,11 +1,26 @@
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
+export interface UploadResult {
+  filename: string;
+  size: number;
+  content_hash: string;
+  duplicate_of: string | null;
+  indexed: boolean;
+}
+
 export interface Document {
   id: string;
   name: string;
   size: number;
   modified: string;
   type: string;
+  status?: 'indexed' | 'no_text' | 'failed' | 'pending';
+  pages?: number;
+  chunks?: number;
+  tokens?: number;
+  embedding_cost?: number;
+  generation?: number | null;
+  error?: string | null;
 }
 
 export interface ChatMessage {
@@ -15,6 +30,7 @@ export interface ChatMessage {
     content: string;
     source?: string;
   }>;
+  collection?: string;
 }
 
 export interface ChatResponse {
@@ -57,11 +73,32 @@ class ApiClient {
     return this.request<Document[]>('/api/documents');
   }
 
-  async uploadDocument(file: File): Promise<{ message: string; filename: string }> {
+  private collectionQuery(collection?: string): string {
+    return collection ? `?collection=${encodeURIComponent(collection)}` : '';
+  }
+
+  async uploadDocument(file: File, collection?: string): Promise<UploadResult & { message: string }> {
     const formData = new FormData();
     formData.append('file', file);
 
-    const response = await fetch(`${this.baseUrl}/api/upload`, {
+    const response = await fetch(`${this.baseUrl}/api/upload${this.collectionQuery(collection)}`, {
+      method: 'POST',
+      body: formData,
+    });
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.detail || `Upload failed: ${response.status}`);
+    }
+
+    return response.json();
+  }
+
+  async uploadDocuments(files: File[], collection?: string): Promise<{ message: string; files: UploadResult[] }> {
+    const formData = new FormData();
+    files.forEach((file) => formData.append('files', file));
+
+    const response = await fetch(`${this.baseUrl}/api/upload/batch${this.collectionQuery(collection)}`, {
       method: 'POST',
       body: formData,
     });
@@ -89,8 +126,8 @@ class ApiClient {
   }
 
   // Health check
-  async healthCheck(): Promise<{ status: string; documents_count: number; timestamp: string }> {
-    return this.request<{ status: string; documents_count: number; timestamp: string }>('/api/health');
+  async healthCheck(): Promise<{ status: string; documents_count: number; indexed_documents: number; index_generation: number | null; timestamp: string }> {
+    return this.request<{ status: string; documents_count: number; indexed_documents: number; index_generation: number | null; timestamp: string }>('/api/health');
   }
 }
 
@@ -0,0 +1,134 @@
+"""
+Shared helpers for the benchmark scripts: peak-RSS sampling, timing and a
+results history keyed by commit so regressions show up between runs.
+"""
+import os
+import sys
+import json
+import math
+import time
+import resource
+import threading
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def max_rss_bytes() -> int:
+    """Lifetime peak RSS of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRSS:
+    """
+    Tracks the peak RSS reached inside a `with` block by polling /proc/self/statm
+    from a helper thread. Falls back to the process-lifetime ru_maxrss when /proc
+    is unavailable, in which case earlier stages can mask later ones.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_bytes = 0
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        rss = current_rss_bytes()
+        if rss is None:
+            self.start_bytes = self.peak_bytes = max_rss_bytes()
+            return self
+        self.start_bytes = self.peak_bytes = rss
+        self._thread = threading.Thread(target=self._poll, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes() or 0)
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self.peak_bytes = max(self.peak_bytes, current_rss_bytes() or 0)
+        else:
+            self.peak_bytes = max_rss_bytes()
+        return False
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+def append_result(name: str, record: Dict[str, Any], results_file: Optional[str] = None) -> str:
+    """Appends a run to tests/benchmarks/results/<name>.jsonl and returns the path."""
+    path = results_file or os.path.join(RESULTS_DIR, f"{name}.jsonl")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = dict(record, timestamp=datetime.now().isoformat(timespec='seconds'), commit=git_commit())
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return path
+
+
+def load_baseline(name: str, config: Dict[str, Any], commit: Optional[str] = None,
+                  results_file: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Most recent earlier run with the same config: from `commit` if given,
+    otherwise from any commit other than the current one.
+    """
+    path = results_file or os.path.join(RESULTS_DIR, f"{name}.jsonl")
+    if not os.path.exists(path):
+        return None
+    head = git_commit()
+    baseline = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("config") != config:
+                continue
+            if commit is not None and record.get("commit") != commit:
+                continue
+            if commit is None and head is not None and record.get("commit") == head:
+                continue
+            baseline = record
+    return baseline
+
+
+def timed(fn, *args, **kwargs):
+    """Runs fn under PeakRSS and returns (result, seconds, PeakRSS)."""
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        seconds = time.perf_counter() - start
+    return result, seconds, rss
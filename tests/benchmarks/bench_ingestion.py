@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Ingestion throughput benchmark.
+
+Generates a synthetic corpus of Indonesian and English regulation-style PDFs
+and measures each ingestion stage on it:
+
+- extract:         raw PyMuPDF text extraction (lower bound for the loaders)
+- pdf_loader:      ingest.pdf_loader.load_and_chunk_documents (extraction + batched token chunking)
+- langchain_loader: ingest.pdf_ingester.load_and_chunk_pdfs_langchain
+- embed_batching:  embeddings.vector_store.embed_chunks against an in-process
+                   stub embedder (token-budget batching from the chunks'
+                   token counts, no network)
+
+For every stage it reports pages/s, chunks/s, tokens/s and peak RSS. Runs are
+appended to tests/benchmarks/results/ingestion.jsonl with the commit they ran
+on, and compared with the latest run of the same configuration from another
+commit.
+
+    python tests/benchmarks/bench_ingestion.py --docs 20 --pages 30
+    python tests/benchmarks/bench_ingestion.py --stages pdf_loader,embed_batching --fail-on-regression
+"""
+import os
+import sys
+import random
+import shutil
+import hashlib
+import argparse
+import tempfile
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+import fitz  # PyMuPDF
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+CORPUS_CACHE = os.path.join(BENCH_DIR, 'results', 'corpus')
+
+# Add project root and load-test tools to Python path
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BENCH_DIR)
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), 'load'))
+
+from bench_common import timed, append_result, load_baseline  # noqa: E402
+
+STAGES = ("extract", "pdf_loader", "langchain_loader", "embed_batching")
+
+# Vocabulary for regulation-like prose; sentences are assembled from these so
+# page text has realistic word lengths and repetition for both languages.
+_VOCAB = {
+    "id": {
+        "heading": ["Pasal", "Bagian", "Bab", "Ayat"],
+        "subjects": ["Bank", "Direksi", "Dewan Komisaris", "Otoritas Jasa Keuangan", "Penyelenggara", "Satuan kerja manajemen risiko"],
+        "verbs": ["wajib menerapkan", "bertanggung jawab atas", "harus memastikan", "menetapkan kebijakan mengenai", "melaporkan"],
+        "objects": ["manajemen risiko teknologi informasi", "tata kelola data nasabah", "rencana pemulihan bencana",
+                    "pengamanan sistem elektronik", "audit intern secara berkala", "penggunaan pihak penyedia jasa"],
+        "tails": ["sesuai dengan ketentuan peraturan perundang-undangan.", "paling lambat 30 hari kerja.",
+                  "sebagaimana dimaksud pada ayat (1).", "dengan memperhatikan prinsip kehati-hatian."],
+    },
+    "en": {
+        "heading": ["Article", "Section", "Chapter", "Paragraph"],
+        "subjects": ["The Bank", "The Board of Directors", "The Board of Commissioners", "The Financial Services Authority",
+                     "The Operator", "The risk management unit"],
+        "verbs": ["shall implement", "is responsible for", "must ensure", "shall establish a policy on", "shall report"],
+        "objects": ["information technology risk management", "customer data governance", "a disaster recovery plan",
+                    "electronic system security", "periodic internal audits", "the use of third-party service providers"],
+        "tails": ["in accordance with the prevailing laws and regulations.", "no later than 30 working days.",
+                  "as referred to in paragraph (1).", "with due regard to the prudential principle."],
+    },
+}
+
+
+def regulation_text(language: str, words: int, rng: random.Random) -> str:
+    """Roughly `words` words of regulation-style text in `language` ('id' or 'en')."""
+    vocab = _VOCAB[language]
+    lines: List[str] = []
+    count = 0
+    article = rng.randint(1, 200)
+    while count < words:
+        if rng.random() < 0.15:
+            line = f"{rng.choice(vocab['heading'])} {article}"
+            article += 1
+        else:
+            line = f"({rng.randint(1, 9)}) {rng.choice(vocab['subjects'])} {rng.choice(vocab['verbs'])} " \
+                   f"{rng.choice(vocab['objects'])} {rng.choice(vocab['tails'])}"
+        lines.append(line)
+        count += len(line.split())
+    return "\n".join(lines)
+
+
+def _write_pdf(path: str, language: str, pages: int, words_per_page: int, rng: random.Random):
+    doc = fitz.open()
+    rect = fitz.Rect(40, 40, 555, 802)  # A4 with margins
+    for _ in range(pages):
+        text = regulation_text(language, words_per_page, rng)
+        # insert_textbox returns a negative value when the text does not fit; retry smaller
+        for fontsize in (9, 8, 7, 6, 5, 4):
+            page = doc.new_page(width=595, height=842)
+            if page.insert_textbox(rect, text, fontsize=fontsize) >= 0 or fontsize == 4:
+                break
+            doc.delete_page(page.number)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def generate_corpus(out_dir: str, docs: int, pages: int, words_per_page: int,
+                    languages=("id", "en"), seed: int = 0) -> Dict[str, Any]:
+    """Writes `docs` PDFs alternating between `languages`; returns a corpus summary."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    files = []
+    for i in range(docs):
+        language = languages[i % len(languages)]
+        path = os.path.join(out_dir, f"regulation_{language}_{i:04d}.pdf")
+        _write_pdf(path, language, pages, words_per_page, rng)
+        files.append(path)
+    return {
+        "dir": out_dir,
+        "documents": docs,
+        "pages": docs * pages,
+        "bytes": sum(os.path.getsize(f) for f in files),
+    }
+
+
+def cached_corpus(docs: int, pages: int, words_per_page: int, languages, seed: int) -> Dict[str, Any]:
+    """Generates the corpus once per parameter set under tests/benchmarks/results/corpus/."""
+    key = hashlib.sha1(f"{docs}:{pages}:{words_per_page}:{','.join(languages)}:{seed}".encode()).hexdigest()[:12]
+    out_dir = os.path.join(CORPUS_CACHE, key)
+    if not os.path.isdir(out_dir) or len(os.listdir(out_dir)) != docs:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(CORPUS_CACHE, exist_ok=True)
+        # Generate beside the final location so an interrupted run never leaves a partial corpus
+        tmp_dir = tempfile.mkdtemp(dir=CORPUS_CACHE)
+        generate_corpus(tmp_dir, docs, pages, words_per_page, languages, seed)
+        os.replace(tmp_dir, out_dir)
+    files = [os.path.join(out_dir, f) for f in os.listdir(out_dir)]
+    return {"dir": out_dir, "documents": len(files), "pages": docs * pages,
+            "bytes": sum(os.path.getsize(f) for f in files)}
+
+
+class StubEmbeddingsClient:
+    """Drop-in for the OpenAI client's `embeddings.create`, computing vectors locally."""
+
+    def __init__(self, dimensions: int = 256):
+        from stub_openai_server import deterministic_vector
+        self._vector = deterministic_vector
+        self.dimensions = dimensions
+        self.requests = 0
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, input, model):
+        self.requests += 1
+        data = [SimpleNamespace(embedding=self._vector(text, self.dimensions)) for text in input]
+        tokens = sum(max(1, int(len(text.split()) * 1.3)) for text in input)
+        return SimpleNamespace(data=data, usage=SimpleNamespace(prompt_tokens=tokens, completion_tokens=0))
+
+
+def _word_tokens(texts) -> int:
+    # Same approximation the stub embedder reports, so stages are comparable
+    return sum(max(1, int(len(t.split()) * 1.3)) for t in texts)
+
+
+# --- Stages ---
+
+def stage_extract(corpus_dir: str) -> Dict[str, int]:
+    texts = []
+    for name in sorted(os.listdir(corpus_dir)):
+        with fitz.open(os.path.join(corpus_dir, name)) as doc:
+            texts.extend(page.get_text() for page in doc)
+    return {"chunks": 0, "tokens": _word_tokens(texts)}
+
+
+def stage_pdf_loader(corpus_dir: str) -> Dict[str, int]:
+    from backend.ingest.pdf_loader import load_and_chunk_documents
+    chunks = load_and_chunk_documents(corpus_dir)
+    return {"chunks": len(chunks), "tokens": _word_tokens(c["text"] for c in chunks)}
+
+
+def stage_langchain_loader(corpus_dir: str) -> Dict[str, int]:
+    from backend.ingest.pdf_ingester import load_and_chunk_pdfs_langchain
+    docs = load_and_chunk_pdfs_langchain(corpus_dir)
+    return {"chunks": len(docs), "tokens": _word_tokens(d.page_content for d in docs)}
+
+
+def run_embed_batching(corpus_dir: str, dimensions: int) -> Dict[str, Any]:
+    """Loads chunks (untimed), then times embed_chunks against the stub embedder."""
+    from backend.ingest.pdf_loader import load_and_chunk_documents
+    from backend.embeddings import vector_store
+    from backend.utils.token_logger import TokenLogger
+
+    chunks = load_and_chunk_documents(corpus_dir)
+    client = StubEmbeddingsClient(dimensions)
+    with tempfile.TemporaryDirectory() as log_dir:
+        # Keep benchmark traffic out of the real usage log
+        quiet_logger = TokenLogger(log_file=os.path.join(log_dir, 'token_usage.jsonl'))
+        with mock.patch.object(vector_store, "get_openai_client", return_value=client), \
+                mock.patch.object(vector_store, "token_logger", quiet_logger), \
+                mock.patch("builtins.print"):
+            embeddings, seconds, rss = timed(vector_store.embed_chunks, chunks)
+        quiet_logger.flush()
+    if embeddings is None:
+        raise RuntimeError("embed_chunks returned no embeddings")
+    return {"chunks": len(chunks), "tokens": _word_tokens(c["text"] for c in chunks),
+            "requests": client.requests, "seconds": seconds, "rss": rss}
+
+
+def run_stage(stage: str, corpus: Dict[str, Any], dimensions: int) -> Dict[str, Any]:
+    try:
+        if stage == "embed_batching":
+            outcome = run_embed_batching(corpus["dir"], dimensions)
+            seconds, rss = outcome.pop("seconds"), outcome.pop("rss")
+        else:
+            fn = {"extract": stage_extract, "pdf_loader": stage_pdf_loader,
+                  "langchain_loader": stage_langchain_loader}[stage]
+            with mock.patch("builtins.print"):
+                outcome, seconds, rss = timed(fn, corpus["dir"])
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    result = {
+        "seconds": round(seconds, 4),
+        "pages_per_s": round(corpus["pages"] / seconds, 2) if seconds else None,
+        "chunks_per_s": round(outcome["chunks"] / seconds, 2) if seconds and outcome["chunks"] else None,
+        "tokens_per_s": round(outcome["tokens"] / seconds, 2) if seconds else None,
+        "peak_rss_mb": round(rss.peak_bytes / 2**20, 1),
+        "rss_growth_mb": round((rss.peak_bytes - rss.start_bytes) / 2**20, 1),
+    }
+    result.update({k: v for k, v in outcome.items() if k in ("chunks", "tokens", "requests")})
+    return result
+
+
+def compare(stages: Dict[str, Dict], baseline: Optional[Dict], threshold: float) -> List[str]:
+    """Returns human-readable regressions: throughput drops or RSS growth beyond `threshold`."""
+    regressions = []
+    if not baseline:
+        return regressions
+    for stage, result in stages.items():
+        prev = baseline.get("stages", {}).get(stage)
+        if not prev or "error" in prev or "error" in result:
+            continue
+        if prev.get("pages_per_s") and result.get("pages_per_s"):
+            change = (result["pages_per_s"] - prev["pages_per_s"]) / prev["pages_per_s"]
+            if change < -threshold:
+                regressions.append(f"{stage}: pages/s {change:+.1%} vs {baseline.get('commit')}")
+        if prev.get("peak_rss_mb") and result.get("peak_rss_mb"):
+            change = (result["peak_rss_mb"] - prev["peak_rss_mb"]) / prev["peak_rss_mb"]
+            if change > threshold:
+                regressions.append(f"{stage}: peak RSS {change:+.1%} vs {baseline.get('commit')}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion stages on a synthetic PDF corpus.")
+    parser.add_argument("--docs", type=int, default=10, help="Number of PDFs to generate")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per PDF")
+    parser.add_argument("--words-per-page", type=int, default=450)
+    parser.add_argument("--languages", default="id,en", help="Comma-separated languages to alternate (id, en)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--dimensions", type=int, default=256, help="Stub embedding size")
+    parser.add_argument("--corpus-dir", default=None, help="Benchmark an existing folder of PDFs instead")
+    parser.add_argument("--results", default=None, help="Results history file (default: tests/benchmarks/results/ingestion.jsonl)")
+    parser.add_argument("--baseline-commit", default=None, help="Compare against this commit's latest run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", dest="save", action="store_false")
+    args = parser.parse_args()
+
+    languages = tuple(l.strip() for l in args.languages.split(',') if l.strip())
+    if args.corpus_dir:
+        files = [f for f in os.listdir(args.corpus_dir) if f.lower().endswith('.pdf')]
+        pages = 0
+        for name in files:
+            with fitz.open(os.path.join(args.corpus_dir, name)) as doc:
+                pages += doc.page_count
+        corpus = {"dir": args.corpus_dir, "documents": len(files), "pages": pages,
+                  "bytes": sum(os.path.getsize(os.path.join(args.corpus_dir, f)) for f in files)}
+        config = {"corpus_dir": os.path.abspath(args.corpus_dir)}
+    else:
+        print(f"📄 Preparing corpus: {args.docs} docs x {args.pages} pages ({','.join(languages)})...")
+        corpus = cached_corpus(args.docs, args.pages, args.words_per_page, languages, args.seed)
+        config = {"docs": args.docs, "pages": args.pages, "words_per_page": args.words_per_page,
+                  "languages": list(languages), "seed": args.seed}
+    config["dimensions"] = args.dimensions
+
+    stages = {}
+    for stage in [s.strip() for s in args.stages.split(',') if s.strip()]:
+        if stage not in STAGES:
+            parser.error(f"Unknown stage {stage}")
+        print(f"⏱️  {stage}...")
+        stages[stage] = run_stage(stage, corpus, args.dimensions)
+
+    baseline = load_baseline("ingestion", config, args.baseline_commit, args.results)
+    print(f"\n📊 Ingestion benchmark ({corpus['documents']} docs, {corpus['pages']} pages, {corpus['bytes'] / 2**20:.2f} MiB)")
+    for stage, result in stages.items():
+        if "error" in result:
+            print(f"   - {stage:16s} ERROR {result['error']}")
+            continue
+        print(f"   - {stage:16s} {result['seconds']:8.2f}s  {result['pages_per_s'] or 0:9.1f} pages/s  "
+              f"{result['chunks_per_s'] or 0:9.1f} chunks/s  {result['tokens_per_s'] or 0:11.0f} tokens/s  "
+              f"peak RSS {result['peak_rss_mb']:.0f} MiB (+{result['rss_growth_mb']:.0f})")
+
+    regressions = compare(stages, baseline, args.threshold)
+    if baseline:
+        print(f"\n🔁 Compared with {baseline.get('commit')} ({baseline.get('timestamp')}): "
+              + ("no regressions" if not regressions else f"{len(regressions)} regression(s)"))
+        for line in regressions:
+            print(f"   ⚠️  {line}")
+
+    if args.save:
+        path = append_result("ingestion", {"config": config, "corpus": {k: v for k, v in corpus.items() if k != "dir"},
+                                           "stages": stages}, args.results)
+        print(f"\n📝 Results appended to {path}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
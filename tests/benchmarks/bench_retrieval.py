@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Retrieval benchmark at index scale.
+
+Builds vector store snapshots of the same shape the ingestion pipeline
+publishes (FAISS index + memory-mapped chunk store, see embeddings/snapshots.py)
+from synthetic clustered vectors or recorded ones, then for each size:
+
+- cold load:  time and RSS growth of constructing a Retriever on the files
+- latency:    p50/p99 of Retriever.retrieve_chunks (search + metadata lookup)
+              with embed_query answered locally, plus search-only latency
+- recall@k:   overlap of the returned chunk ids with exact (flat L2) search
+
+Runs are appended to tests/benchmarks/results/retrieval.jsonl with the commit
+they ran on and compared with the previous commit's run of the same config.
+
+    python tests/benchmarks/bench_retrieval.py --sizes 10000,100000,1000000 --dim 256
+    python tests/benchmarks/bench_retrieval.py --sizes 100000 --index-factory IVF1024,Flat --nprobe 16
+    python tests/benchmarks/bench_retrieval.py --vectors recorded.npy --queries-file queries.npy
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import mock
+
+import numpy as np
+import faiss
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+INDEX_CACHE = os.path.join(BENCH_DIR, 'results', 'indexes')
+
+# Add project root and benchmark helpers to Python path
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BENCH_DIR)
+
+from bench_common import PeakRSS, current_rss_bytes, percentile, append_result, load_baseline  # noqa: E402
+
+DEFAULT_FACTORY = "IDMap,Flat"  # what create_and_save_vector_store builds
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0, clusters: int = 1000) -> np.ndarray:
+    """
+    Unit-length float32 vectors drawn around `clusters` random centres, so nearest
+    neighbours are meaningful (uniform noise makes every ANN index look perfect or useless).
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((min(clusters, n), dim), dtype=np.float32)
+    vectors = np.empty((n, dim), dtype=np.float32)
+    block = 100_000
+    for start in range(0, n, block):
+        end = min(n, start + block)
+        assignment = rng.integers(0, len(centres), end - start)
+        vectors[start:end] = centres[assignment] + 0.6 * rng.standard_normal((end - start, dim), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def query_vectors(base: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """Queries near stored vectors (a perturbed random sample), like paraphrased questions."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(base), count)
+    queries = base[picks] + 0.3 * rng.standard_normal((count, base.shape[1]), dtype=np.float32)
+    queries = queries.astype(np.float32)
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def build_index(vectors: np.ndarray, factory: str) -> faiss.Index:
+    index = faiss.index_factory(vectors.shape[1], factory)
+    if not index.is_trained:
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), 100_000), replace=False)]
+        index.train(sample)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    try:
+        index.add_with_ids(vectors, ids)
+    except RuntimeError:
+        index.add(vectors)  # indexes without an IDMap number vectors sequentially anyway
+    return index
+
+
+def chunk_records(n: int, text_words: int):
+    """Chunks in the ingestion pipeline's layout ({"text", "metadata"}; chunk i has FAISS id i)."""
+    words = ("ketentuan bank wajib menerapkan manajemen risiko teknologi informasi "
+             "the bank shall implement information technology risk management").split()
+    text = " ".join(words[i % len(words)] for i in range(text_words))
+    for i in range(n):
+        yield {"text": text, "metadata": {"file_name": f"doc_{i // 500:05d}.pdf", "page_number": i % 500 + 1,
+                                          "chunk_id": str(i)}}
+
+
+def prepare_store(vectors: np.ndarray, factory: str, text_words: int, key: str) -> Tuple[str, str, Optional[float]]:
+    """
+    Builds (or reuses) a snapshot for `vectors`, written by the same code as
+    ingestion; returns (index path, snapshot dir, index build seconds).
+    """
+    from backend.embeddings.snapshots import write_snapshot, current_snapshot, INDEX_FILE
+
+    out_dir = os.path.join(INDEX_CACHE, key)
+    snapshot = current_snapshot(out_dir)
+    if snapshot is not None:
+        return os.path.join(snapshot, INDEX_FILE), snapshot, None
+    os.makedirs(INDEX_CACHE, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=INDEX_CACHE)
+    start = time.perf_counter()
+    index = build_index(vectors, factory)
+    build_seconds = time.perf_counter() - start
+    write_snapshot(index, chunk_records(len(vectors), text_words), root=tmp_dir)
+    os.replace(tmp_dir, out_dir)
+    snapshot = current_snapshot(out_dir)
+    return os.path.join(snapshot, INDEX_FILE), snapshot, build_seconds
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, ids = exact.search(queries, k)
+    return ids
+
+
+def load_retriever(index_path: str, metadata_path: str, nprobe: Optional[int]):
+    """Constructs a Retriever on the given snapshot files; returns (retriever, seconds, PeakRSS)."""
+    from backend.qa import retriever as retriever_module
+
+    with mock.patch.dict(os.environ, {"OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "bench"}), \
+            mock.patch.object(retriever_module, "store_paths", return_value=(index_path, metadata_path)), \
+            mock.patch("builtins.print"), PeakRSS() as rss:
+        start = time.perf_counter()
+        retriever = retriever_module.Retriever()
+        seconds = time.perf_counter() - start
+    if retriever.index is None:
+        raise RuntimeError(f"Retriever failed to load {index_path}")
+    if nprobe:
+        faiss.ParameterSpace().set_index_parameter(retriever.index, "nprobe", nprobe)
+    return retriever, seconds, rss
+
+
+def run_queries(retriever, queries: np.ndarray, k: int) -> Tuple[List[float], List[float], List[List[int]]]:
+    """Per-query end-to-end and search-only latencies (ms) and the returned chunk ids."""
+    end_to_end, search_only, returned = [], [], []
+    current = {"vector": None}
+    with mock.patch.object(retriever, "embed_query", lambda _query: current["vector"]):
+        for query in queries:
+            current["vector"] = query.reshape(1, -1)
+            start = time.perf_counter()
+            chunks = retriever.retrieve_chunks("benchmark query", k=k)
+            end_to_end.append((time.perf_counter() - start) * 1000)
+            returned.append([int(c["metadata"]["chunk_id"]) for c in chunks])
+
+            start = time.perf_counter()
+            retriever.index.search(current["vector"], k)
+            search_only.append((time.perf_counter() - start) * 1000)
+    return end_to_end, search_only, returned
+
+
+def recall_at_k(returned: List[List[int]], exact: np.ndarray, k: int) -> float:
+    hits = sum(len(set(ids[:k]) & set(int(i) for i in truth[:k] if i != -1)) for ids, truth in zip(returned, exact))
+    return hits / (len(returned) * k) if returned else 0.0
+
+
+def bench_size(n: int, args, recorded: Optional[np.ndarray], recorded_queries: Optional[np.ndarray]) -> Dict[str, Any]:
+    source = "recorded" if recorded is not None else "synthetic"
+    vectors = recorded[:n] if recorded is not None else synthetic_vectors(n, args.dim, args.seed)
+    queries = recorded_queries if recorded_queries is not None else query_vectors(vectors, args.queries, args.seed + 1)
+    key_source = f"{source}:{args.vectors}" if recorded is not None else f"{source}:{args.seed}"
+    key = hashlib.sha1(f"snapshot:{n}:{vectors.shape[1]}:{args.index_factory}:{args.text_words}:{key_source}".encode()).hexdigest()[:12]
+
+    print(f"🏗️  {n:,} vectors x {vectors.shape[1]} ({args.index_factory})...")
+    index_path, metadata_path, build_seconds = prepare_store(vectors, args.index_factory, args.text_words, key)
+    truth = exact_neighbours(vectors, queries, args.k)
+    del vectors
+
+    import backend.qa.retriever  # noqa: F401  (keep import cost out of the resident figure)
+    rss_before = current_rss_bytes() or 0
+    retriever, load_seconds, rss = load_retriever(index_path, metadata_path, args.nprobe)
+    resident_bytes = (current_rss_bytes() or 0) - rss_before
+
+    for query in queries[:args.warmup]:
+        with mock.patch.object(retriever, "embed_query", return_value=query.reshape(1, -1)):
+            retriever.retrieve_chunks("warmup", k=args.k)
+    end_to_end, search_only, returned = run_queries(retriever, queries, args.k)
+    end_to_end.sort()
+    search_only.sort()
+    result = {
+        "vectors": n,
+        "build_seconds": round(build_seconds, 3) if build_seconds is not None else None,
+        "index_bytes": os.path.getsize(index_path),
+        "metadata_bytes": sum(os.path.getsize(os.path.join(metadata_path, name)) for name in ("chunks.jsonl", "offsets.npy")),
+        "cold_load_seconds": round(load_seconds, 3),
+        "load_peak_rss_mb": round((rss.peak_bytes - rss.start_bytes) / 2**20, 1),
+        "resident_mb": round(resident_bytes / 2**20, 1),
+        "latency_ms": {"p50": percentile(end_to_end, 50), "p99": percentile(end_to_end, 99),
+                       "mean": sum(end_to_end) / len(end_to_end)},
+        "search_ms": {"p50": percentile(search_only, 50), "p99": percentile(search_only, 99)},
+        f"recall@{args.k}": round(recall_at_k(returned, truth, args.k), 4),
+    }
+    del retriever
+    return result
+
+
+def compare(sizes: Dict[str, Dict], baseline: Optional[Dict], threshold: float, k: int) -> List[str]:
+    """Regressions: p99 latency, cold load or resident memory up, or recall down, by more than `threshold`."""
+    regressions = []
+    if not baseline:
+        return regressions
+    for size, result in sizes.items():
+        prev = baseline.get("sizes", {}).get(size)
+        if not prev or "error" in prev or "error" in result:
+            continue
+        for label, now, before in (
+            ("p99 latency", result["latency_ms"]["p99"], prev["latency_ms"]["p99"]),
+            ("cold load", result["cold_load_seconds"], prev["cold_load_seconds"]),
+            ("resident memory", result["resident_mb"], prev["resident_mb"]),
+        ):
+            if before and now and (now - before) / before > threshold:
+                regressions.append(f"{size}: {label} {(now - before) / before:+.1%} vs {baseline.get('commit')}")
+        recall_key = f"recall@{k}"
+        if prev.get(recall_key) is not None and result[recall_key] < prev[recall_key] - 0.01:
+            regressions.append(f"{size}: {recall_key} {result[recall_key]:.3f} (was {prev[recall_key]:.3f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval latency, memory and recall at index scale.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated index sizes")
+    parser.add_argument("--dim", type=int, default=256,
+                        help="Synthetic vector size (text-embedding-3-large is 3072; 1M x 3072 needs ~12 GiB)")
+    parser.add_argument("--index-factory", default=DEFAULT_FACTORY, help="faiss.index_factory string, e.g. IVF1024,Flat or HNSW32")
+    parser.add_argument("--nprobe", type=int, default=None, help="nprobe for IVF indexes")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=1000, help="Number of synthetic queries")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--text-words", type=int, default=80, help="Words of text stored per chunk")
+    parser.add_argument("--vectors", default=None, help="Recorded vectors (.npy, float32 [n, dim]) instead of synthetic ones")
+    parser.add_argument("--queries-file", default=None, help="Recorded query vectors (.npy) to use with --vectors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=None, help="Results history file (default: tests/benchmarks/results/retrieval.jsonl)")
+    parser.add_argument("--baseline-commit", default=None)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--no-save", dest="save", action="store_false")
+    args = parser.parse_args()
+
+    # Stays memory-mapped when already float32, so the recorded set is not held in RAM twice
+    recorded = np.load(args.vectors, mmap_mode='r').astype(np.float32, copy=False) if args.vectors else None
+    recorded_queries = np.load(args.queries_file).astype(np.float32, copy=False) if args.queries_file else None
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if recorded is not None:
+        sizes = [min(n, len(recorded)) for n in sizes]
+
+    config = {"index_factory": args.index_factory, "nprobe": args.nprobe, "k": args.k,
+              "dim": recorded.shape[1] if recorded is not None else args.dim,
+              "queries": len(recorded_queries) if recorded_queries is not None else args.queries,
+              "text_words": args.text_words, "source": os.path.abspath(args.vectors) if args.vectors else "synthetic",
+              "seed": args.seed}
+
+    results = {}
+    for n in sizes:
+        try:
+            results[str(n)] = bench_size(n, args, recorded, recorded_queries)
+        except (MemoryError, RuntimeError) as e:
+            results[str(n)] = {"error": f"{type(e).__name__}: {e}"}
+
+    print(f"\n📊 Retrieval benchmark ({args.index_factory}, dim {config['dim']}, k={args.k}, {config['queries']} queries)")
+    for size, r in results.items():
+        if "error" in r:
+            print(f"   - {int(size):>9,} ERROR {r['error']}")
+            continue
+        print(f"   - {int(size):>9,} vectors  load {r['cold_load_seconds']:6.2f}s  resident {r['resident_mb']:8.1f} MiB  "
+              f"p50 {r['latency_ms']['p50']:7.2f}ms  p99 {r['latency_ms']['p99']:7.2f}ms  "
+              f"(search p50 {r['search_ms']['p50']:.2f}ms)  recall@{args.k} {r[f'recall@{args.k}']:.3f}")
+
+    baseline = load_baseline("retrieval", config, args.baseline_commit, args.results)
+    regressions = compare(results, baseline, args.threshold, args.k)
+    if baseline:
+        print(f"\n🔁 Compared with {baseline.get('commit')} ({baseline.get('timestamp')}): "
+              + ("no regressions" if not regressions else f"{len(regressions)} regression(s)"))
+        for line in regressions:
+            print(f"   ⚠️  {line}")
+
+    if args.save:
+        path = append_result("retrieval", {"config": config, "sizes": results}, args.results)
+        print(f"\n📝 Results appended to {path}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
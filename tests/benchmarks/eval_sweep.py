@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Configuration sweep: quality, cost and latency of the assistant across a grid of settings.
+
+Runs a golden question set through `run_assistant` for every configuration of
+a grid and reports, per configuration:
+
+- hit rate:      share of questions whose sources include an expected document
+                 (and page, if given), with source recall and MRR
+- prompt tokens: LLM input tokens per question (answer generation, refine
+                 summarization, history summary); completion and query
+                 embedding tokens are reported alongside
+- latency:       p50/p95/mean of run_assistant end to end
+- cost:          estimated USD per question at TokenLogger.PRICING, plus the
+                 embedding cost of building the configuration's vector store
+
+Knobs are the environment variables the backend reads at import:
+
+    k                   RETRIEVAL_K          chunks retrieved per question
+    max_history_pairs   MAX_HISTORY_PAIRS    turns kept verbatim before older ones are summarized
+    model               ANSWER_MODEL         answer generation model
+    summary_batch_size  SUMMARY_BATCH_SIZE   documents per refine chain run
+    rerank              RERANK               cross-encoder re-ranking (0/1)
+    chunk_tokens        CHUNK_TOKENS         chunk size in tokens        } each combination gets
+    chunk_overlap       CHUNK_OVERLAP        chunk overlap in tokens     } its own vector store
+    dedup_threshold     DEDUP_THRESHOLD      near-duplicate folding      }
+
+Every configuration runs in a fresh process (so the settings take effect),
+`--workers` at a time. Vector stores are built once per corpus and chunking
+settings and cached under results/eval/stores/; the answers of a configuration
+are cached under results/eval/runs/, keyed by commit, golden set and
+configuration, so growing a grid only runs the new points (`--rerun` ignores
+the run cache). Sweeps are appended to tests/benchmarks/results/eval_sweep.jsonl.
+
+The golden set is JSON lines of
+
+    {"question": "...", "expected": [{"file_name": "a.pdf", "page": 4}], "history": [["user", "assistant"]]}
+
+where `page` and `history` are optional; an empty `expected` means the
+question should be answered without sources (chit-chat, out of scope).
+
+    python tests/benchmarks/eval_sweep.py --grid k=3,5,8 --grid chunk_tokens=384,512 --workers 4
+    python tests/benchmarks/eval_sweep.py --grid model=gpt-4.1-nano,gpt-4o-mini --grid max_history_pairs=2,5
+    python tests/benchmarks/eval_sweep.py --grid k=3,5 --start-stub   # offline dry run against the stub provider
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import itertools
+import threading
+import multiprocessing
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+LOAD_DIR = os.path.join(PROJECT_ROOT, 'tests', 'load')
+EVAL_CACHE = os.path.join(BENCH_DIR, 'results', 'eval')
+DEFAULT_GOLDEN = os.path.join(BENCH_DIR, 'golden_questions.jsonl')
+DEFAULT_CORPUS = os.path.join(PROJECT_ROOT, 'shared', 'documents')
+
+# Add project root and benchmark helpers to Python path
+sys.path.append(PROJECT_ROOT)
+sys.path.append(BENCH_DIR)
+
+from bench_common import percentile, append_result, git_commit  # noqa: E402
+
+KNOBS = {
+    "k": "RETRIEVAL_K",
+    "max_history_pairs": "MAX_HISTORY_PAIRS",
+    "model": "ANSWER_MODEL",
+    "summary_batch_size": "SUMMARY_BATCH_SIZE",
+    "rerank": "RERANK",
+    "chunk_tokens": "CHUNK_TOKENS",
+    "chunk_overlap": "CHUNK_OVERLAP",
+    "dedup_threshold": "DEDUP_THRESHOLD",
+}
+STORE_KNOBS = ("chunk_tokens", "chunk_overlap", "dedup_threshold")
+
+
+def parse_grid(specs: Sequence[str]) -> List[Dict[str, str]]:
+    """`["k=3,5", "model=a,b"]` -> every combination, e.g. [{"k": "3", "model": "a"}, ...]."""
+    axes: Dict[str, List[str]] = {}
+    for spec in specs:
+        name, sep, values = spec.partition("=")
+        name = name.strip()
+        if not sep or name not in KNOBS:
+            raise ValueError(f"Bad grid axis {spec!r}: use knob=v1,v2 with a knob from {', '.join(KNOBS)}")
+        if name in axes:
+            raise ValueError(f"Knob {name} is given twice")
+        axes[name] = [value.strip() for value in values.split(",") if value.strip()]
+        if not axes[name]:
+            raise ValueError(f"Knob {name} has no values")
+    return [dict(zip(axes, combination)) for combination in itertools.product(*axes.values())]
+
+
+def config_env(config: Dict[str, str]) -> Dict[str, str]:
+    return {KNOBS[name]: str(value) for name, value in config.items()}
+
+
+def config_label(config: Dict[str, str]) -> str:
+    return " ".join(f"{name}={value}" for name, value in config.items()) or "defaults"
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def load_golden(path: str) -> List[Dict[str, Any]]:
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not item.get("question") or not isinstance(item.get("expected"), list):
+                raise ValueError(f"{path}:{number}: needs a question and an expected list")
+            questions.append(item)
+    return questions
+
+
+def corpus_fingerprint(corpus_dir: str) -> str:
+    """Changes when a document is added, removed or rewritten."""
+    files = []
+    for name in sorted(os.listdir(corpus_dir)):
+        stat = os.stat(os.path.join(corpus_dir, name))
+        files.append((name, stat.st_size, stat.st_mtime_ns))
+    return _digest(files)
+
+
+def store_key(config: Dict[str, str], corpus: str, embedding_model: str) -> str:
+    """Configurations that chunk and embed the corpus alike share a vector store."""
+    return _digest({"corpus": corpus, "embedding_model": embedding_model,
+                    "provider": os.getenv("OPENAI_BASE_URL"),
+                    "store": {name: config[name] for name in STORE_KNOBS if name in config}})
+
+
+def _matches(source: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    if os.path.basename(str(source.get("document") or "")) != expected["file_name"]:
+        return False
+    return expected.get("page") is None or source.get("page") == expected["page"]
+
+
+def score_sources(sources: List[Dict[str, Any]], expected: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Hit, recall of the expected sources and reciprocal rank of the first relevant source."""
+    if not expected:
+        return {"hit": float(not sources), "recall": float(not sources), "reciprocal_rank": float(not sources)}
+    found = [any(_matches(source, item) for source in sources) for item in expected]
+    rank = next((i for i, source in enumerate(sources) if any(_matches(source, item) for item in expected)), None)
+    return {"hit": float(any(found)), "recall": sum(found) / len(found),
+            "reciprocal_rank": 0.0 if rank is None else 1 / (rank + 1)}
+
+
+class UsageRecorder:
+    """
+    Stands in for TokenLogger.log_activity: totals tokens and estimated cost
+    instead of queueing records, so each question's usage can be read back.
+    """
+
+    def __init__(self, calculate_cost: Callable[[int, int, str], float],
+                 count_tokens: Callable[[Sequence[str]], List[int]]):
+        self._calculate_cost = calculate_cost
+        self._count_tokens = count_tokens
+        self._lock = threading.Lock()
+        self._totals = self._empty()
+
+    def record(self, activity_type: str, model: str, input_tokens: Optional[int] = None,
+               output_tokens: Optional[int] = 0, additional_info: Optional[Dict[str, Any]] = None,
+               input_text: Optional[str] = None, output_text: Optional[str] = None,
+               source: Optional[str] = None):
+        # Same rule as the logger: counts the provider did not report come from the text
+        if input_tokens is None:
+            input_tokens = self._count_tokens([input_text or ""])[0]
+        if output_tokens is None:
+            output_tokens = self._count_tokens([output_text or ""])[0]
+        cost = self._calculate_cost(input_tokens, output_tokens, model)
+        with self._lock:
+            if activity_type == "embedding":
+                self._totals["embedding_tokens"] += input_tokens
+            else:
+                self._totals["prompt_tokens"] += input_tokens
+                self._totals["completion_tokens"] += output_tokens
+                self._totals["llm_calls"] += 1
+            self._totals["cost_usd"] += cost
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "embedding_tokens": 0, "llm_calls": 0, "cost_usd": 0.0}
+
+    def take(self) -> Dict[str, Any]:
+        """The totals since the last call, resetting them."""
+        with self._lock:
+            totals, self._totals = self._totals, self._empty()
+        return totals
+
+
+def _recording_usage(stack: ExitStack) -> UsageRecorder:
+    """Routes the process's TokenLogger to a recorder."""
+    from backend.ingest.chunker import count_tokens
+    from backend.utils.token_logger import token_logger
+
+    recorder = UsageRecorder(token_logger.calculate_cost, count_tokens)
+    stack.enter_context(mock.patch.object(token_logger, "log_activity", recorder.record))
+    return recorder
+
+
+def build_store(store_root: str, corpus_dir: str, config: Dict[str, str]) -> Dict[str, Any]:
+    """Worker: chunks and embeds the corpus with the configuration's store knobs into `store_root`."""
+    os.environ.update(config_env({name: config[name] for name in STORE_KNOBS if name in config}))
+    from backend.embeddings import vector_store
+    from backend.embeddings.snapshots import current_snapshot, read_manifest
+
+    tmp_root = f"{store_root}.part-{os.getpid()}"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(vector_store, "DOCUMENTS_DIR", corpus_dir))
+        stack.enter_context(mock.patch.object(vector_store, "SNAPSHOTS_DIR", tmp_root))
+        recorder = _recording_usage(stack)
+        start = time.perf_counter()
+        vector_store.create_and_save_vector_store(precompute_summaries=False)
+        seconds = time.perf_counter() - start
+    snapshot = current_snapshot(tmp_root)
+    if snapshot is None:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        raise RuntimeError(f"No vector store was built from {corpus_dir}")
+    usage = recorder.take()
+    info = {"vectors": read_manifest(snapshot)["vectors"], "build_seconds": round(seconds, 2),
+            "embedding_tokens": usage["embedding_tokens"], "cost_usd": round(usage["cost_usd"], 6)}
+    with open(os.path.join(tmp_root, "eval_store.json"), 'w', encoding='utf-8') as f:
+        json.dump(info, f)
+    # Publish the finished store in one step so an interrupted build is never reused
+    shutil.rmtree(store_root, ignore_errors=True)
+    os.replace(tmp_root, store_root)
+    return info
+
+
+def run_config(config: Dict[str, str], questions: List[Dict[str, Any]], store_root: str) -> List[Dict[str, Any]]:
+    """Worker: answers the golden set with the configuration's settings; one result per question."""
+    os.environ.update(config_env(config))
+    from backend.qa import retriever as retriever_module
+    from backend.assistant import langgraph_flow
+
+    results = []
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(retriever_module, "SNAPSHOTS_DIR", store_root))
+        recorder = _recording_usage(stack)
+        for item in questions:
+            history = [tuple(turn) for turn in item.get("history") or []]
+            error = None
+            start = time.perf_counter()
+            try:
+                answer = langgraph_flow.run_assistant(item["question"], history)
+            except Exception as e:
+                answer, error = {"type": "error", "sources": []}, f"{type(e).__name__}: {e}"
+            latency_ms = (time.perf_counter() - start) * 1000
+            results.append(dict(score_sources(answer["sources"], item["expected"]), **recorder.take(),
+                                question=item["question"], type=answer["type"], sources=answer["sources"],
+                                latency_ms=round(latency_ms, 1), error=error))
+    return results
+
+
+def summarize_config(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-configuration averages over the golden set; cost is per question."""
+    count = len(results)
+    latencies = sorted(r["latency_ms"] for r in results)
+
+    def mean(field):
+        return sum(r[field] for r in results) / count if count else None
+
+    return {
+        "questions": count,
+        "errors": sum(1 for r in results if r["error"]),
+        "hit_rate": mean("hit"),
+        "recall": mean("recall"),
+        "mrr": mean("reciprocal_rank"),
+        "prompt_tokens": mean("prompt_tokens"),
+        "completion_tokens": mean("completion_tokens"),
+        "embedding_tokens": mean("embedding_tokens"),
+        "llm_calls": mean("llm_calls"),
+        "latency_ms": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                       "mean": sum(latencies) / count if count else None},
+        "cost_per_question_usd": mean("cost_usd"),
+    }
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, value: Any):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.part-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def sweep(configs: List[Dict[str, str]], questions: List[Dict[str, Any]], corpus_dir: str, workers: int,
+          rerun: bool = False, cache_dir: str = EVAL_CACHE) -> List[Dict[str, Any]]:
+    """Builds the missing vector stores, then runs the configurations without cached answers, in parallel."""
+    from backend.embeddings.vector_store import EMBEDDING_MODEL
+
+    corpus = corpus_fingerprint(corpus_dir)
+    golden = _digest(questions)
+    stores = {i: store_key(config, corpus, EMBEDDING_MODEL) for i, config in enumerate(configs)}
+    store_roots = {key: os.path.join(cache_dir, 'stores', key) for key in stores.values()}
+    run_files = {i: os.path.join(cache_dir, 'runs', _digest({"commit": git_commit(), "golden": golden,
+                                                               "store": stores[i], "config": config}) + ".json")
+                 for i, config in enumerate(configs)}
+
+    # Fresh interpreter per task: the backend reads its settings once, at import
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1) as pool:
+        builds = {}
+        for i, config in enumerate(configs):
+            root = store_roots[stores[i]]
+            if stores[i] not in builds and _read_json(os.path.join(root, "eval_store.json")) is None:
+                chunking = config_label({name: config[name] for name in STORE_KNOBS if name in config})
+                print(f"🏗️  Building vector store {stores[i]} ({chunking})...")
+                builds[stores[i]] = pool.submit(build_store, root, corpus_dir, config)
+        for future in builds.values():
+            future.result()
+
+        runs = {}
+        for i, config in enumerate(configs):
+            if rerun or _read_json(run_files[i]) is None:
+                print(f"⏱️  {config_label(config)}...")
+                runs[i] = pool.submit(run_config, config, questions, store_roots[stores[i]])
+        for i, future in runs.items():
+            _write_json(run_files[i], future.result())
+
+    report = []
+    for i, config in enumerate(configs):
+        results = _read_json(run_files[i])
+        report.append({"config": config, "store": dict(_read_json(os.path.join(store_roots[stores[i]], "eval_store.json")),
+                                                       key=stores[i], built=stores[i] in builds),
+                       "cached": i not in runs, **summarize_config(results), "results": results})
+    return report
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(report: List[Dict[str, Any]]):
+    width = max(len(config_label(entry["config"])) for entry in report)
+    print(f"\n📊 Configuration sweep ({len(report)} configurations x {report[0]['questions']} questions)")
+    print(f"   {'configuration':{width}s}   hit   mrr  prompt tok  p50 ms  p95 ms  $/question  store $  errors")
+    for entry in report:
+        print(f"   {config_label(entry['config']):{width}s}  {_fmt(entry['hit_rate'], '.2f'):>4s}  "
+              f"{_fmt(entry['mrr'], '.2f'):>4s}  {_fmt(entry['prompt_tokens'], '10.0f')}  "
+              f"{_fmt(entry['latency_ms']['p50'], '6.0f')}  {_fmt(entry['latency_ms']['p95'], '6.0f')}  "
+              f"{_fmt(entry['cost_per_question_usd'], '10.6f')}  {entry['store']['cost_usd']:7.4f}  "
+              f"{entry['errors']:6d}{'  (cached)' if entry['cached'] else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep assistant settings over a golden question set.")
+    parser.add_argument("--grid", action="append", default=[], metavar="KNOB=V1,V2",
+                        help=f"Values to sweep for one knob (repeatable): {', '.join(KNOBS)}")
+    parser.add_argument("--golden", default=DEFAULT_GOLDEN, help="Golden question set (JSON lines)")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS, help="Documents to index (default: shared/documents)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Configurations run at once")
+    parser.add_argument("--rerun", action="store_true", help="Ignore cached answers (vector stores are kept)")
+    parser.add_argument("--start-stub", action="store_true", help="Run against the offline OpenAI stub (tests/load)")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--results", default=None, help="Results history file (default: tests/benchmarks/results/eval_sweep.jsonl)")
+    parser.add_argument("--no-save", dest="save", action="store_false")
+    args = parser.parse_args()
+
+    try:
+        configs = parse_grid(args.grid)
+        questions = load_golden(args.golden)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.start_stub:
+        sys.path.insert(0, LOAD_DIR)
+        from load_runner import start_stub_server
+        start_stub_server(args.stub_port, args.stub_latency_ms, 0.0)
+        print(f"🧪 Stub OpenAI provider on port {args.stub_port}")
+
+    report = sweep(configs, questions, args.corpus_dir, args.workers, args.rerun)
+    print_report(report)
+    if args.save:
+        path = append_result("eval_sweep", {
+            "config": {"golden": os.path.relpath(os.path.abspath(args.golden), PROJECT_ROOT),
+                       "corpus": corpus_fingerprint(args.corpus_dir), "grid": args.grid,
+                       "provider": "stub" if args.start_stub else "openai"},
+            "configs": [{k: v for k, v in entry.items() if k != "results"} for entry in report],
+        }, args.results)
+        print(f"\n📝 Results appended to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Load generator for the Knowledge Assistant API.
+
+Replays a query corpus against /api/chat (and optionally /api/upload and the
+ingestion entry point) at a fixed concurrency, then reports throughput,
+p50/p95/p99 latency and error rate per endpoint. Reports are written as JSON
+to tests/load/reports/ so runs can be compared.
+
+Fully offline run (stub provider + in-process app):
+    python tests/load/load_runner.py --start-stub --in-process --requests 200 --concurrency 16
+Against a running server:
+    python tests/load/load_runner.py --target http://localhost:8000 --duration 60
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+LOAD_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(LOAD_DIR))
+REPORTS_DIR = os.path.join(LOAD_DIR, 'reports')
+DEFAULT_CORPUS = os.path.join(LOAD_DIR, 'queries.txt')
+
+# Add project root and the benchmark helpers to Python path
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(os.path.dirname(LOAD_DIR), 'benchmarks'))
+
+from bench_common import percentile
+
+
+def summarize(samples: Dict[str, List[tuple]], wall_seconds: float) -> Dict[str, Dict]:
+    """Per-endpoint throughput, latency percentiles (ms) and error rate."""
+    report = {}
+    for endpoint, results in samples.items():
+        latencies = sorted(latency for latency, ok, _ in results)
+        errors = [status for _, ok, status in results if not ok]
+        by_status: Dict[str, int] = {}
+        for status in errors:
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+        report[endpoint] = {
+            "requests": len(results),
+            "errors": len(errors),
+            "error_rate": len(errors) / len(results) if results else 0.0,
+            "errors_by_status": by_status,
+            "throughput_rps": len(results) / wall_seconds if wall_seconds else 0.0,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if latencies else None,
+                "mean": sum(latencies) / len(latencies) if latencies else None,
+            },
+        }
+    return report
+
+
+def load_corpus(path: str) -> List[str]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def start_stub_server(port: int, latency_ms: float, error_rate: float):
+    """Runs the OpenAI stub in a background thread and points the backend at it."""
+    import uvicorn
+    from stub_openai_server import StubConfig, create_stub_app
+
+    config = uvicorn.Config(
+        create_stub_app(StubConfig(latency_ms=latency_ms, error_rate=error_rate)),
+        host="127.0.0.1", port=port, log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}/v1"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_BASE"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    return server
+
+
+def _upload_payload(i: int):
+    text = f"Dokumen uji beban {i}. Ketentuan mengenai tata kelola teknologi informasi bank umum.\n" * 20
+    return {"file": (f"loadtest_{os.getpid()}_{i}.txt", text.encode("utf-8"), "text/plain")}
+
+
+async def run(args) -> Dict:
+    queries = load_corpus(args.corpus)
+    rng = random.Random(args.seed)
+    mix = {}
+    for part in args.mix.split(','):
+        name, weight = part.split('=')
+        mix[name.strip()] = float(weight)
+    endpoints = list(mix)
+    weights = [mix[e] for e in endpoints]
+
+    if args.in_process:
+        from backend.app import app
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+    else:
+        transport = None
+        base_url = args.target
+
+    samples: Dict[str, List[tuple]] = {e: [] for e in endpoints}
+    uploaded: List[str] = []
+    counter = {"issued": 0}
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        async def one_request(endpoint: str, i: int):
+            start = time.perf_counter()
+            status = None
+            try:
+                if endpoint == "chat":
+                    # Spread requests over simulated users, as admission control is fair per user
+                    response = await client.post("/api/chat", json={"content": rng.choice(queries), "conversation_history": []},
+                                                 headers={"X-User-Id": f"load-{i % args.concurrency}"})
+                elif endpoint == "upload":
+                    response = await client.post("/api/upload", files=_upload_payload(i))
+                    if response.status_code == 200:
+                        uploaded.append(response.json().get("filename"))
+                elif endpoint == "ingest":
+                    from backend.embeddings.vector_store import create_and_save_vector_store
+                    await asyncio.to_thread(create_and_save_vector_store)
+                    response = None
+                else:
+                    raise ValueError(f"Unknown endpoint {endpoint}")
+                status = response.status_code if response is not None else 200
+                ok = status < 400
+            except Exception as e:
+                status = type(e).__name__
+                ok = False
+            samples[endpoint].append(((time.perf_counter() - start) * 1000, ok, status))
+
+        async def worker():
+            while True:
+                if deadline is not None:
+                    if time.perf_counter() >= deadline:
+                        return
+                elif counter["issued"] >= args.requests:
+                    return
+                counter["issued"] += 1
+                i = counter["issued"]
+                await one_request(rng.choices(endpoints, weights)[0], i)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        wall = time.perf_counter() - started
+
+        if args.cleanup:
+            for name in uploaded:
+                await client.delete(f"/api/documents/{name}")
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "commit": _git_commit(),
+        "config": {
+            "target": "in-process" if args.in_process else args.target,
+            "concurrency": args.concurrency,
+            "requests": counter["issued"],
+            "duration_s": args.duration,
+            "mix": mix,
+            "corpus": os.path.relpath(args.corpus, PROJECT_ROOT),
+            "stub": {"latency_ms": args.stub_latency_ms, "error_rate": args.stub_error_rate} if args.start_stub else None,
+        },
+        "wall_seconds": wall,
+        "endpoints": summarize(samples, wall),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    print(f"\n📊 Load test report ({report['config']['target']}, concurrency {report['config']['concurrency']}, {report['wall_seconds']:.1f}s)")
+    for endpoint, stats in report["endpoints"].items():
+        lat = stats["latency_ms"]
+        line = (f"   - {endpoint:7s} {stats['requests']:6d} req  {stats['throughput_rps']:8.2f} req/s  "
+                f"p50 {lat['p50'] or 0:8.1f}ms  p95 {lat['p95'] or 0:8.1f}ms  p99 {lat['p99'] or 0:8.1f}ms  "
+                f"errors {stats['error_rate']:.1%}")
+        prev = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if prev and prev["latency_ms"]["p95"] and lat["p95"]:
+            change = (lat["p95"] - prev["latency_ms"]["p95"]) / prev["latency_ms"]["p95"]
+            line += f"  (p95 {change:+.1%} vs {baseline.get('commit')})"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Knowledge Assistant API.")
+    parser.add_argument("--target", default="http://localhost:8000", help="Base URL of a running backend")
+    parser.add_argument("--in-process", action="store_true", help="Drive backend.app in-process via ASGI instead of HTTP")
+    parser.add_argument("--start-stub", action="store_true", help="Start the OpenAI stub and point the backend at it")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--stub-latency-ms", type=float, default=50.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Text file with one query per line")
+    parser.add_argument("--mix", default="chat=1", help="Endpoint weights, e.g. chat=0.9,upload=0.1 (chat, upload, ingest)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cleanup", dest="cleanup", action="store_false", help="Keep documents uploaded by the test")
+    parser.add_argument("--output", default=None, help="Report path (default: tests/load/reports/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Previous report to compare p95 latency against")
+    args = parser.parse_args()
+
+    if args.start_stub:
+        sys.path.insert(0, LOAD_DIR)
+        start_stub_server(args.stub_port, args.stub_latency_ms, args.stub_error_rate)
+
+    report = asyncio.run(run(args))
+
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(REPORTS_DIR, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\n📝 Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI embeddings and chat-completions APIs.
+
+Vectors and answers are derived from a hash of the input, so repeated runs are
+deterministic; latency and error rates are configurable so the backend can be
+load-tested offline. Point the backend at it with:
+
+    OPENAI_BASE_URL=http://localhost:8100/v1   (openai client)
+    OPENAI_API_BASE=http://localhost:8100/v1   (LangChain ChatOpenAI)
+    OPENAI_API_KEY=stub
+"""
+import os
+import time
+import json
+import base64
+import random
+import asyncio
+import hashlib
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 50.0          # mean added latency per request
+    jitter_ms: float = 20.0           # uniform +/- jitter around the mean
+    error_rate: float = 0.0           # fraction of requests that fail
+    error_status: int = 429           # status returned for injected failures
+    dimensions: int = 3072            # text-embedding-3-large size
+    seed: int = 0
+
+
+def deterministic_vector(text: str, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Unit-length float32 vector derived only from (text, seed)."""
+    digest = hashlib.sha256(f"{seed}:{text}".encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+    vector = rng.standard_normal(dimensions).astype("float32")
+    return vector / np.linalg.norm(vector)
+
+
+def _approx_tokens(text: str) -> int:
+    # Close enough for load testing; avoids tokenizer cost inside the stub
+    return max(1, int(len(text.split()) * 1.3))
+
+
+def create_stub_app(config: StubConfig = None) -> FastAPI:
+    config = config or StubConfig()
+    app = FastAPI(title="OpenAI stub")
+    rng = random.Random(config.seed)
+    stats = {"embeddings": 0, "chat": 0, "errors": 0}
+
+    async def _delay_or_fail():
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"error": {"message": "Injected stub failure", "type": "stub_error"}},
+                headers={"Retry-After": "1"} if config.error_status == 429 else None,
+            )
+        return None
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        failure = await _delay_or_fail()
+        if failure is not None:
+            return failure
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        dimensions = body.get("dimensions") or config.dimensions
+        data = []
+        for i, text in enumerate(inputs):
+            vector = deterministic_vector(str(text), dimensions, config.seed)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(_approx_tokens(str(t)) for t in inputs)
+        stats["embeddings"] += 1
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        failure = await _delay_or_fail()
+        if failure is not None:
+            return failure
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        answer = f"Stub answer {digest}: berdasarkan konteks yang diberikan, ketentuan berlaku sebagaimana dijelaskan."
+        usage = {
+            "prompt_tokens": _approx_tokens(prompt),
+            "completion_tokens": _approx_tokens(answer),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": f"chatcmpl-{digest}", "created": int(time.time()), "model": body.get("model")}
+        stats["chat"] += 1
+
+        if body.get("stream"):
+            async def events():
+                for word in answer.split(" "):
+                    chunk = dict(base, object="chat.completion.chunk", choices=[
+                        {"index": 0, "delta": {"content": word + " "}, "finish_reason": None}
+                    ])
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(0)
+                final = dict(base, object="chat.completion.chunk", choices=[
+                    {"index": 0, "delta": {}, "finish_reason": "stop"}
+                ])
+                yield f"data: {json.dumps(final)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return dict(base, object="chat.completion", usage=usage, choices=[
+            {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}
+        ])
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI API stand-in for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=float(os.getenv("STUB_LATENCY_MS", 50)))
+    parser.add_argument("--jitter-ms", type=float, default=float(os.getenv("STUB_JITTER_MS", 20)))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("STUB_ERROR_RATE", 0)))
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        dimensions=args.dimensions,
+        seed=args.seed,
+    )
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from langchain.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.chat_models import ChatOpenAI
-from chains.summarization_refine_chain import summarize_documents
+from backend.chains.summarization_refine_chain import summarize_documents
 
 def main():
     parser = argparse.ArgumentParser(description='Summarize a PDF document')
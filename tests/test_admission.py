@@ -0,0 +1,120 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.admission import AdmissionController, OutboundLimiter, QueueFull
+
+class TestAdmissionController(unittest.TestCase):
+    def test_users_are_served_round_robin(self):
+        async def scenario():
+            controller = AdmissionController(max_active=1, max_queued=10, max_queued_per_user=5, max_wait=5)
+            await controller.acquire("alice")
+            order = []
+
+            async def request(user, label):
+                await controller.acquire(user)
+                order.append(label)
+                await asyncio.sleep(0)
+                controller.release()
+
+            tasks = [asyncio.create_task(request("alice", f"a{i}")) for i in range(3)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(request("bob", "b0")))
+            await asyncio.sleep(0)
+            self.assertEqual(controller.queued(), 4)
+            controller.release()
+            await asyncio.gather(*tasks)
+            self.assertEqual((controller.active(), controller.queued()), (0, 0))
+            return order
+        self.assertEqual(asyncio.run(scenario()), ["a0", "b0", "a1", "a2"])
+
+    def test_full_queue_and_user_share_are_rejected_at_once(self):
+        async def scenario():
+            controller = AdmissionController(max_active=1, max_queued=3, max_queued_per_user=2, max_wait=5)
+            await controller.acquire("alice")
+            waiters = [asyncio.create_task(controller.acquire("alice")) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(QueueFull) as user_full:
+                await controller.acquire("alice")
+            waiters.append(asyncio.create_task(controller.acquire("bob")))
+            await asyncio.sleep(0)
+            start = time.perf_counter()
+            with self.assertRaises(QueueFull) as queue_full:
+                await controller.acquire("carol")
+            self.assertLess(time.perf_counter() - start, 0.05)
+            for task in waiters:
+                task.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+            return user_full.exception, queue_full.exception, controller
+        user_full, queue_full, controller = asyncio.run(scenario())
+        self.assertEqual((user_full.reason, queue_full.reason), ("user_queue_full", "queue_full"))
+        self.assertGreaterEqual(queue_full.retry_after, 1)
+        self.assertEqual((controller.active(), controller.queued()), (1, 0))
+
+    def test_timed_out_waiters_leave_no_trace_and_threads_can_release(self):
+        async def scenario():
+            controller = AdmissionController(max_active=1, max_queued=5, max_wait=0.05)
+            await controller.acquire("alice")
+            with self.assertRaises(QueueFull) as timeout:
+                await controller.acquire("bob")
+            self.assertEqual((timeout.exception.reason, controller.queued()), ("queue_timeout", 0))
+            controller.max_wait = 5
+            waiter = asyncio.create_task(controller.acquire("bob"))
+            await asyncio.sleep(0)
+            threading.Thread(target=controller.release).start()
+            await waiter
+            controller.release()
+            return controller
+        controller = asyncio.run(scenario())
+        self.assertEqual((controller.active(), controller.queued()), (0, 0))
+
+class TestOutboundLimiter(unittest.TestCase):
+    def test_concurrent_calls_are_capped(self):
+        limiter = OutboundLimiter(limit=2)
+        peak = []
+
+        def call():
+            with limiter.slot("embedding"):
+                peak.append(limiter.in_flight())
+                time.sleep(0.01)
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((max(peak), limiter.in_flight()), (2, 0))
+
+    def test_workers_share_the_host_cap(self):
+        self.assertEqual([OutboundLimiter(8, workers).limit for workers in (1, 3, 4, 16)], [8, 2, 2, 1])
+
+class TestChatAdmission(unittest.TestCase):
+    def test_saturated_server_answers_429_with_retry_after(self):
+        from backend import app as app_module
+        controller = AdmissionController(max_active=1, max_queued=0)
+        flow = SimpleNamespace(run_assistant=lambda query, history, collection: {"content": "ok", "sources": []},
+                               stream_assistant=lambda query, history, collection: iter([{"event": "done", "sources": []}]))
+        with mock.patch.object(app_module, "admission", controller), \
+                mock.patch.object(app_module, "_assistant", return_value=flow):
+            client = TestClient(app_module.app)
+            self.assertEqual(client.post("/api/chat", json={"content": "hi"}).json()["content"], "ok")
+            self.assertEqual(client.post("/api/chat/stream", json={"content": "hi"}).status_code, 200)
+            self.assertEqual(controller.active(), 0)
+            controller._active = 1  # another request holds the only slot
+            for path in ("/api/chat", "/api/chat/stream"):
+                response = client.post(path, json={"content": "hi"})
+                self.assertEqual(response.status_code, 429)
+                self.assertGreaterEqual(int(response.headers["Retry-After"]), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,7 @@ import unittest
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from qa.answer_generator import AnswerGenerator
+from backend.qa.answer_generator import AnswerGenerator
 
 class TestAnswerGenerator(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,37 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+# Add benchmark tools to Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from bench_common import load_baseline
+from bench_ingestion import generate_corpus, stage_pdf_loader, compare
+
+class TestIngestionBenchmark(unittest.TestCase):
+    def test_synthetic_corpus_is_chunked(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            corpus = generate_corpus(tmp, docs=2, pages=3, words_per_page=200, languages=("id", "en"))
+            self.assertEqual(corpus["pages"], 6)
+            self.assertEqual(sorted(os.listdir(tmp)), ["regulation_en_0001.pdf", "regulation_id_0000.pdf"])
+            outcome = stage_pdf_loader(tmp)
+        self.assertGreaterEqual(outcome["chunks"], 6)
+        self.assertGreater(outcome["tokens"], 6 * 200)
+
+    def test_baseline_matches_config_and_flags_regressions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            results = os.path.join(tmp, "ingestion.jsonl")
+            with open(results, "w", encoding="utf-8") as f:
+                for commit, pages_per_s in (("aaa", 100.0), ("bbb", 200.0)):
+                    f.write(json.dumps({"config": {"docs": 1}, "commit": commit,
+                                        "stages": {"pdf_loader": {"pages_per_s": pages_per_s, "peak_rss_mb": 50}}}) + "\n")
+            self.assertIsNone(load_baseline("ingestion", {"docs": 2}, results_file=results))
+            baseline = load_baseline("ingestion", {"docs": 1}, commit="bbb", results_file=results)
+        regressions = compare({"pdf_loader": {"pages_per_s": 150.0, "peak_rss_mb": 50}}, baseline, 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("pages/s", regressions[0])
+
+if __name__ == "__main__":
+    unittest.main()
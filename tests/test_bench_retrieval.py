@@ -0,0 +1,31 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add benchmark tools to Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+import bench_retrieval
+from bench_retrieval import synthetic_vectors, query_vectors, prepare_store, exact_neighbours, load_retriever, run_queries, recall_at_k
+
+class TestRetrievalBenchmark(unittest.TestCase):
+    def test_flat_index_through_retriever_has_full_recall(self):
+        vectors = synthetic_vectors(2000, 32, clusters=20)
+        queries = query_vectors(vectors, 25)
+        with tempfile.TemporaryDirectory() as tmp, patch.object(bench_retrieval, "INDEX_CACHE", tmp):
+            index_path, metadata_path, build_seconds = prepare_store(vectors, "IDMap,Flat", 10, "test")
+            self.assertIsNotNone(build_seconds)
+            self.assertIsNone(prepare_store(vectors, "IDMap,Flat", 10, "test")[2])  # reused
+            retriever, _, _ = load_retriever(index_path, metadata_path, None)
+            end_to_end, search_only, returned = run_queries(retriever, queries, 5)
+        self.assertEqual(len(end_to_end), 25)
+        self.assertEqual(len(search_only), 25)
+        self.assertEqual(recall_at_k(returned, exact_neighbours(vectors, queries, 5), 5), 1.0)
+
+    def test_recall_counts_partial_overlap(self):
+        self.assertEqual(recall_at_k([[1, 2, 3, 4]], [[1, 2, 9, 8]], 4), 0.5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import faiss
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.embeddings.bundle import BundleError, export_bundle, import_bundle, read_bundle_info
+from backend.embeddings.snapshots import write_snapshot, verify_snapshot, ChunkStore, INDEX_FILE, CATALOG_FILE
+
+try:
+    import pyarrow
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+def build_snapshot(root, count=25):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((count, 8)).astype(np.float32)
+    chunks = [{"text": f"Pasal {i} ketentuan umum", "metadata": {"file_name": "pojk.pdf", "page_number": i,
+                                                                 "language": ("id", "en", "unknown")[i % 3]}}
+              for i in range(count)]
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(8))
+    index.add_with_ids(vectors, np.arange(count))
+    catalog = [{"file_name": "pojk.pdf", "chunks": count, "status": "indexed"}]
+    snapshot = write_snapshot(index, chunks, root=root, info={"embedding_model": "text-embedding-3-large"},
+                              catalog=catalog)
+    return snapshot, vectors, chunks
+
+@unittest.skipUnless(HAVE_PYARROW, "pyarrow is not installed")
+class TestBundleRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source, self.vectors, self.chunks = build_snapshot(os.path.join(self.tmp.name, "source"))
+        self.path = os.path.join(self.tmp.name, "store.parquet")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_import_rebuilds_the_snapshot_without_embedding(self):
+        export_bundle(self.path, self.source, row_group_size=10)
+        self.assertEqual(pyarrow.parquet.ParquetFile(self.path).num_row_groups, 3)
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": ""}):  # any embedding call would fail
+            imported = import_bundle(self.path, root=os.path.join(self.tmp.name, "node"),
+                                     expected_model="text-embedding-3-large")
+        manifest = verify_snapshot(imported)
+        self.assertEqual((manifest["vectors"], manifest["partitions"]), (25, {"en": 16, "id": 17}))
+        self.assertEqual(list(ChunkStore(imported).chunks()), self.chunks)
+        index = faiss.read_index(os.path.join(imported, INDEX_FILE))
+        distances, ids = index.search(self.vectors[[3, 17]], 1)
+        self.assertEqual(ids[:, 0].tolist(), [3, 17])
+        self.assertIn(CATALOG_FILE, manifest["files"])
+
+    def test_float16_bundle_is_smaller_and_close(self):
+        full = os.path.join(self.tmp.name, "full.parquet")
+        export_bundle(full, self.source)
+        info = export_bundle(self.path, self.source, dtype="float16")
+        self.assertEqual((info["dtype"], read_bundle_info(self.path)["dimension"]), ("float16", 8))
+        self.assertLess(os.path.getsize(self.path), os.path.getsize(full))
+        imported = import_bundle(self.path, root=os.path.join(self.tmp.name, "node"))
+        index = faiss.read_index(os.path.join(imported, INDEX_FILE))
+        distances, ids = index.search(self.vectors, 1)
+        self.assertEqual(ids[:, 0].tolist(), list(range(25)))
+
+    def test_wrong_model_is_rejected(self):
+        export_bundle(self.path, self.source)
+        with self.assertRaises(BundleError):
+            import_bundle(self.path, root=os.path.join(self.tmp.name, "node"), expected_model="other-model")
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "node")))
+
+class TestBundleWithoutPyarrow(unittest.TestCase):
+    def test_missing_pyarrow_is_a_clear_error(self):
+        with tempfile.TemporaryDirectory() as root, mock.patch.dict(sys.modules, {"pyarrow": None}):
+            source, _, _ = build_snapshot(root, count=3)
+            with self.assertRaises(BundleError) as error:
+                export_bundle(os.path.join(root, "store.parquet"), source)
+        self.assertIn("pyarrow", str(error.exception))
+
+class TestRebuildOfImportedStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "snapshots")
+        self.docs = os.path.join(self.tmp.name, "documents")
+        os.makedirs(self.docs)
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(4))
+        index.add_with_ids(np.zeros((1, 4), dtype=np.float32), np.arange(1))
+        write_snapshot(index, [{"text": "t", "metadata": {"file_name": "pojk.pdf"}}], root=self.root,
+                       info={"imported_from": "store.parquet"}, catalog=[{"name": "pojk.pdf", "status": "indexed"}])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _rebuild(self, **kwargs):
+        """Runs a rebuild that gets past the guard only to find no text; returns (loader, error)."""
+        from backend.embeddings import vector_store
+
+        def no_text(folder, file_stats):
+            file_stats["pojk.pdf"] = {"error": None}
+            return []
+
+        with mock.patch.object(vector_store, "DOCUMENTS_DIR", self.docs), \
+                mock.patch.object(vector_store, "SNAPSHOTS_DIR", self.root), \
+                mock.patch.object(vector_store, "load_and_chunk_documents", side_effect=no_text) as load, \
+                mock.patch("builtins.print"):
+            with self.assertRaises(vector_store.IndexBuildError) as raised:
+                vector_store.create_and_save_vector_store(precompute_summaries=False, **kwargs)
+        return load, str(raised.exception)
+
+    def test_refuses_while_the_imported_documents_are_missing(self):
+        load, error = self._rebuild()
+        self.assertFalse(load.called)
+        self.assertIn("imported from a bundle", error)
+        self.assertTrue(self._rebuild(force=True)[0].called)
+
+    def test_rebuilds_once_the_documents_are_copied_alongside(self):
+        with open(os.path.join(self.docs, "pojk.pdf"), "wb") as f:
+            f.write(b"%PDF")
+        self.assertTrue(self._rebuild()[0].called)
+
+if __name__ == '__main__':
+    unittest.main()
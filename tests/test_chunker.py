@@ -0,0 +1,86 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import tiktoken
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ingest import chunker
+from backend.ingest.chunker import chunk_sections, count_tokens, split_tokens, token_offsets
+
+# A real tiktoken encoding that needs no downloaded files: every byte is one token
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes_test",
+    pat_str=r"""'s|'t|'re|'ve|'m|'ll|'d| ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+TEXT = " ".join(f"ketentuan{i}" for i in range(300))
+
+class TestChunker(unittest.TestCase):
+    def test_windows_overlap_and_respect_word_boundaries(self):
+        offsets = token_offsets([TEXT], BYTE_ENCODING)[0]
+        self.assertEqual(len(offsets), len(TEXT))
+        chunks = list(split_tokens(TEXT, offsets, chunk_tokens=200, overlap=40))
+        self.assertGreater(len(chunks), 5)
+        words = set(TEXT.split())
+        for text, tokens in chunks:
+            self.assertLessEqual(tokens, 200)
+            self.assertTrue(set(text.split()) <= words, "a chunk split a word")
+        for (previous, _), (current, _) in zip(chunks, chunks[1:]):
+            self.assertIn(previous.split()[-1], current.split())  # consecutive chunks overlap
+        covered = set(w for text, _ in chunks for w in text.split())
+        self.assertEqual(covered, words)
+
+    def test_token_count_matches_encoding(self):
+        sections = [SimpleNamespace(text=TEXT), SimpleNamespace(text="Pasal 1")]
+        chunks = list(chunk_sections(sections, chunk_tokens=300, overlap=30, encoding=BYTE_ENCODING))
+        for _, text, tokens in chunks:
+            self.assertAlmostEqual(tokens, len(BYTE_ENCODING.encode_ordinary(text)), delta=2)
+        self.assertIs(chunks[-1][0], sections[1])
+
+    def test_sections_are_encoded_in_batches(self):
+        sections = [SimpleNamespace(text=f"halaman {i} " * 20) for i in range(70)]
+        with mock.patch.object(BYTE_ENCODING, "encode_ordinary_batch", wraps=BYTE_ENCODING.encode_ordinary_batch) as batch:
+            list(chunk_sections(sections, encoding=BYTE_ENCODING))
+        self.assertEqual(batch.call_count, 3)  # 32 + 32 + 6 sections
+        self.assertEqual(sum(len(call.args[0]) for call in batch.call_args_list), 70)
+
+    def test_fallback_without_encoding_files(self):
+        with mock.patch.object(chunker, "get_encoding", return_value=None):
+            self.assertEqual(count_tokens(["abcdefgh ij"]), [3])
+            chunks = list(chunk_sections([SimpleNamespace(text=TEXT)], chunk_tokens=100, overlap=10))
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(tokens <= 100 for _, _, tokens in chunks))
+
+    def test_overlap_must_be_smaller_than_chunk(self):
+        with self.assertRaises(ValueError):
+            list(chunk_sections([SimpleNamespace(text=TEXT)], chunk_tokens=10, overlap=10))
+
+class TestEmbedChunksReusesTokenCounts(unittest.TestCase):
+    def test_chunks_with_token_count_are_not_re_encoded(self):
+        from backend.embeddings import vector_store
+
+        client = SimpleNamespace(embeddings=SimpleNamespace(create=mock.Mock(side_effect=lambda input, model: SimpleNamespace(
+            data=[SimpleNamespace(embedding=[0.0, 1.0]) for _ in input], usage=None))))
+        logger = mock.Mock()
+        chunks = [{"text": "a b", "metadata": {"token_count": 200000}},
+                  {"text": "c d", "metadata": {"token_count": 150000}},
+                  {"text": "e f", "metadata": {}}]
+        with mock.patch.object(vector_store, "get_openai_client", return_value=client), \
+                mock.patch.object(vector_store, "token_logger", logger), \
+                mock.patch.object(vector_store, "count_tokens", return_value=[2]) as counted, \
+                mock.patch("builtins.print"):
+            embeddings = vector_store.embed_chunks(chunks)
+        counted.assert_called_once_with(["e f"])
+        self.assertEqual(embeddings.shape, (3, 2))
+        self.assertEqual(client.embeddings.create.call_count, 2)
+        self.assertEqual([c.kwargs["input_tokens"] for c in logger.log_embedding.call_args_list], [200000, 150002])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import faiss
+from fastapi.testclient import TestClient
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.embeddings import collection_manager
+from backend.embeddings.collection_manager import CollectionManager, CollectionError, validate_collection
+from backend.embeddings.snapshots import write_snapshot
+from backend.utils.coordination import ReindexCoordinator
+
+class TestCollectionManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.loads = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def store_file(self, name, content=b"x"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def manager(self, budget):
+        def load(paths):
+            self.loads.append(os.path.basename(paths[0]))
+            return {"paths": paths}, 60
+        return CollectionManager(locate=lambda name: (os.path.join(self.tmp.name, name),)
+                                 if os.path.exists(os.path.join(self.tmp.name, name)) else None,
+                                 load=load, budget_bytes=budget)
+
+    def test_least_recently_used_collection_is_evicted_over_budget(self):
+        for name in ("hr", "legal", "risk"):
+            self.store_file(name)
+        manager = self.manager(budget=150)
+        hr = manager.get("hr")
+        manager.get("legal")
+        self.assertIs(manager.get("hr"), hr)
+        manager.get("risk")
+        self.assertEqual([entry["collection"] for entry in manager.resident()], ["hr", "risk"])
+        manager.get("legal")
+        self.assertEqual(self.loads, ["hr", "legal", "risk", "legal"])
+        self.assertEqual(manager.resident_bytes(), 120)
+        # A collection larger than the budget still loads, alone
+        small = self.manager(budget=10)
+        small.get("hr")
+        small.get("legal")
+        self.assertEqual([entry["collection"] for entry in small.resident()], ["legal"])
+
+    def test_rewritten_store_is_reloaded_and_missing_one_raises(self):
+        path = self.store_file("hr")
+        manager = self.manager(budget=1000)
+        first = manager.get("hr")
+        self.store_file("hr", b"new generation")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        self.assertIsNot(manager.get("hr"), first)
+        self.assertEqual(self.loads, ["hr", "hr"])
+        with self.assertRaises(FileNotFoundError):
+            manager.get("missing")
+
+    def test_names_are_validated(self):
+        self.assertEqual(validate_collection(None), "default")
+        self.assertEqual(validate_collection(" HR-Policies "), "hr-policies")
+        for name in ("../etc", "a/b", "-x", "x" * 65):
+            with self.assertRaises(CollectionError):
+                validate_collection(name)
+
+def build(root, texts):
+    vectors = np.eye(4, dtype=np.float32)[:len(texts)]
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(4))
+    index.add_with_ids(vectors, np.arange(len(texts)))
+    write_snapshot(index, [{"text": text, "metadata": {"file_name": "a.pdf", "page_number": i}}
+                           for i, text in enumerate(texts)], root=root)
+
+class TestRetrieverCollections(unittest.TestCase):
+    def test_each_collection_searches_its_own_index(self):
+        from backend.qa import retriever as retriever_module
+        with tempfile.TemporaryDirectory() as root:
+            build(os.path.join(root, "default"), ["default policy", "default leave"])
+            build(os.path.join(root, "hr"), ["hr leave policy"])
+            manager = CollectionManager(locate=retriever_module.store_paths, load=retriever_module._load_store)
+            with mock.patch.object(retriever_module, "SNAPSHOTS_DIR", os.path.join(root, "default")), \
+                    mock.patch.object(retriever_module, "snapshots_dir", lambda name: os.path.join(root, name)), \
+                    mock.patch.object(retriever_module, "collection_stores", manager), \
+                    mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test"}), \
+                    mock.patch("builtins.print"):
+                query = np.eye(4, dtype=np.float32)[0]
+                hr = retriever_module.Retriever("hr").retrieve_chunks("q", k=5, query_embedding=query)
+                default = retriever_module.Retriever().retrieve_chunks("q", k=5, query_embedding=query)
+                self.assertIsNone(retriever_module.Retriever("finance").index)
+                self.assertEqual([c["text"] for c in hr], ["hr leave policy"])
+                self.assertEqual([c["text"] for c in default], ["default policy", "default leave"])
+                self.assertEqual(sorted(e["collection"] for e in manager.resident()), ["default", "hr"])
+
+class TestKeyedReindex(unittest.TestCase):
+    def test_leader_rebuilds_each_requested_collection(self):
+        builds = []
+        with tempfile.TemporaryDirectory() as run_dir:
+            leader = ReindexCoordinator(lambda key="default": builds.append(key), run_dir, poll_interval=0.05)
+            follower = ReindexCoordinator(lambda key=None: self.fail("followers never rebuild"), run_dir,
+                                          poll_interval=0.05)
+            leader.serve()
+            try:
+                hr = follower.request(timeout=5, key="hr")
+                default = follower.request(timeout=5)
+            finally:
+                leader.stop()
+            self.assertEqual((hr["error"], default["error"]), (None, None))
+            self.assertIsNone(follower.current_generation("legal"))
+        self.assertEqual(builds, ["hr", "default"])
+
+class TestCollectionEndpoints(unittest.TestCase):
+    def setUp(self):
+        from backend import app as app_module
+        self.app_module = app_module
+        self.tmp = tempfile.TemporaryDirectory()
+        self.reindex = mock.Mock()
+        self.patches = [mock.patch.object(collection_manager, "COLLECTION_DOCUMENTS_DIR", os.path.join(self.tmp.name, "docs")),
+                        mock.patch.object(collection_manager, "COLLECTION_SNAPSHOTS_DIR", os.path.join(self.tmp.name, "snapshots")),
+                        mock.patch.object(app_module, "_collection_catalogs", {}),
+                        mock.patch.object(app_module, "_reindex", self.reindex)]
+        for patch in self.patches:
+            patch.start()
+        self.client = TestClient(app_module.app)
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def test_upload_creates_the_collection_and_reindexes_only_it(self):
+        response = self.client.post("/api/upload", params={"collection": "hr"},
+                                    files={"file": ("leave.txt", b"Annual leave is 12 days.")})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "docs", "hr", "leave.txt")))
+        self.assertEqual(self.reindex.call_args[0][-1], "hr")
+        documents = self.client.get("/api/documents", params={"collection": "hr"}).json()
+        self.assertEqual([d["name"] for d in documents], ["leave.txt"])
+        self.assertIn("hr", self.client.get("/api/collections").json()["collections"])
+
+    def test_chat_rejects_unknown_and_invalid_collections(self):
+        flow = mock.Mock()
+        with mock.patch.object(self.app_module, "_assistant", return_value=flow):
+            unknown = self.client.post("/api/chat", json={"content": "hi", "collection": "finance"})
+            invalid = self.client.post("/api/chat/stream", json={"content": "hi", "collection": "../hr"})
+        self.assertEqual((unknown.status_code, invalid.status_code), (404, 400))
+        flow.run_assistant.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import unittest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.coordination import LeaderElection, ReindexCoordinator, CommittedPaths
+
+class TestLeaderElection(unittest.TestCase):
+    def test_single_leader_and_takeover(self):
+        with tempfile.TemporaryDirectory() as run_dir:
+            first, second = LeaderElection(run_dir), LeaderElection(run_dir)
+            self.assertTrue(first.try_acquire())
+            self.assertFalse(second.try_acquire())
+            first.release()
+            self.assertTrue(second.try_acquire())
+            second.release()
+
+class TestReindexCoordinator(unittest.TestCase):
+    def test_requests_from_any_worker_are_built_by_the_leader_once(self):
+        builds = []
+
+        def rebuild():
+            builds.append(time.time())
+            time.sleep(0.2)
+
+        with tempfile.TemporaryDirectory() as run_dir:
+            leader = ReindexCoordinator(rebuild, run_dir, poll_interval=0.05)
+            follower = ReindexCoordinator(lambda: self.fail("followers never rebuild"), run_dir, poll_interval=0.05)
+            leader.serve()
+            try:
+                results = []
+                workers = [threading.Thread(target=lambda: results.append(follower.request(timeout=5))) for _ in range(5)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+            finally:
+                leader.stop()
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r is not None and r["error"] is None for r in results))
+        # Simultaneous requests share a build (at most one follow-up for late arrivals)
+        self.assertLessEqual(len(builds), 2)
+
+    def test_request_times_out_without_a_leader(self):
+        with tempfile.TemporaryDirectory() as run_dir:
+            coordinator = ReindexCoordinator(lambda: None, run_dir, poll_interval=0.05)
+            self.assertIsNone(coordinator.request(timeout=0.2))
+
+class TestCommittedPaths(unittest.TestCase):
+    def test_only_unchanged_api_writes_are_claimed(self):
+        with tempfile.TemporaryDirectory() as run_dir, tempfile.TemporaryDirectory() as docs:
+            uploaded, edited, copied = (os.path.join(docs, name) for name in ("a.pdf", "b.pdf", "c.pdf"))
+            for path in (uploaded, edited, copied):
+                with open(path, "wb") as f:
+                    f.write(b"%PDF")
+            api, leader = CommittedPaths(run_dir), CommittedPaths(run_dir)
+            api.mark(uploaded)
+            api.mark(edited)
+            with open(edited, "ab") as f:
+                f.write(b" edited by hand")
+            os.remove(uploaded)
+            api.mark(uploaded)  # deleted through the API after the upload
+            changes = {uploaded: "deleted", edited: "created", copied: "created"}
+            self.assertEqual(leader.claim(changes), {edited: "created", copied: "created"})
+            # Marks are consumed
+            self.assertEqual(leader.claim({uploaded: "deleted"}), {uploaded: "deleted"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import random
+import unittest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ingest.dedup import deduplicate_chunks, minhash_signature, estimated_similarity
+
+PREAMBLE = ("Menimbang: a. bahwa untuk meningkatkan kualitas penerapan manajemen risiko teknologi informasi "
+            "oleh bank umum perlu dilakukan penyempurnaan ketentuan; b. bahwa berdasarkan pertimbangan "
+            "sebagaimana dimaksud dalam huruf a perlu menetapkan Peraturan Otoritas Jasa Keuangan. "
+            "Mengingat: Undang-Undang Nomor 21 Tahun 2011 tentang Otoritas Jasa Keuangan.")
+
+def chunk(text, file_name, page):
+    return {"text": text, "metadata": {"file_name": file_name, "page_number": page,
+                                       "chunk_id": f"{file_name}-{page}", "content_hash": f"hash-{file_name}"}}
+
+def unique_text(seed):
+    rng = random.Random(seed)
+    words = ["bank", "risiko", "data", "nasabah", "audit", "sistem", "wajib", "laporan", "direksi", "pasal"]
+    return " ".join(rng.choice(words) + str(rng.randint(0, 999)) for _ in range(80))
+
+class TestDeduplicateChunks(unittest.TestCase):
+    def test_near_duplicates_fold_into_first_occurrence_with_sources(self):
+        original = PREAMBLE + " " + unique_text(99)
+        amended = original.replace("Tahun 2011", "Tahun 2011 sebagaimana telah diubah")
+        chunks = [chunk(original, "pojk_2016.pdf", 1), chunk(unique_text(1), "pojk_2016.pdf", 2),
+                  chunk(amended, "pojk_2022.pdf", 1), chunk(unique_text(2), "pojk_2022.pdf", 3),
+                  chunk(original, "seojk.pdf", 1)]
+        unique, folded = deduplicate_chunks(chunks)
+        self.assertEqual(folded, 2)
+        self.assertEqual([c["metadata"]["chunk_id"] for c in unique], ["pojk_2016.pdf-1", "pojk_2016.pdf-2", "pojk_2022.pdf-3"])
+        sources = unique[0]["metadata"]["sources"]
+        self.assertEqual([(s["file_name"], s["page_number"]) for s in sources],
+                         [("pojk_2016.pdf", 1), ("pojk_2022.pdf", 1), ("seojk.pdf", 1)])
+        self.assertNotIn("sources", unique[1]["metadata"])
+
+    def test_different_articles_are_kept(self):
+        chunks = [chunk(unique_text(i), "a.pdf", i) for i in range(50)]
+        unique, folded = deduplicate_chunks(chunks)
+        self.assertEqual((len(unique), folded), (50, 0))
+
+    def test_signature_similarity_tracks_overlap(self):
+        words = unique_text(7).split()
+        base = minhash_signature(" ".join(words))
+        self.assertEqual(estimated_similarity(base, minhash_signature(" ".join(words))), 1.0)
+        half = minhash_signature(" ".join(words[:40] + unique_text(8).split()[:40]))
+        self.assertLess(estimated_similarity(base, half), 0.6)
+
+    def test_sources_are_reported_for_every_location(self):
+        from backend.assistant.langgraph_flow import _extract_sources_from_chunks
+        unique, _ = deduplicate_chunks([chunk(PREAMBLE, "a.pdf", 1), chunk(PREAMBLE, "b.pdf", 4)])
+        sources = _extract_sources_from_chunks(unique + [chunk(unique_text(3), "a.pdf", 1)])
+        self.assertEqual(sources, [{"document": "a.pdf", "page": 1}, {"document": "b.pdf", "page": 4}])
+
+if __name__ == '__main__':
+    unittest.main()
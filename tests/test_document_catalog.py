@@ -0,0 +1,109 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import faiss
+from fastapi.testclient import TestClient
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.embeddings.catalog import DocumentCatalog, catalog_entries
+from backend.embeddings.snapshots import write_snapshot
+
+def stats(size, mtime, pages=1, error=None):
+    return {"size": size, "mtime": mtime, "content_hash": f"h{size}", "pages": pages, "error": error}
+
+def chunk(name, tokens):
+    return {"text": "t", "metadata": {"file_name": name, "token_count": tokens}}
+
+def publish(root, entries):
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(4))
+    index.add_with_ids(np.zeros((1, 4), dtype='float32'), np.arange(1))
+    write_snapshot(index, [chunk("a.pdf", 1)], root=root, catalog=entries)
+
+class TestCatalogEntries(unittest.TestCase):
+    def test_status_tokens_and_cost_per_document(self):
+        file_stats = {"a.pdf": stats(10, 1.0, pages=3), "scan.pdf": stats(20, 2.0),
+                      "broken.docx": stats(5, 3.0, error="BadZipFile: not a zip")}
+        kept = [chunk("a.pdf", 100), chunk("a.pdf", 50)]
+        entries = {e["name"]: e for e in catalog_entries(file_stats, kept + [chunk("a.pdf", 70)], kept,
+                                                         lambda tokens: tokens * 0.001)}
+        self.assertEqual(entries["a.pdf"]["status"], "indexed")
+        self.assertEqual((entries["a.pdf"]["chunks"], entries["a.pdf"]["tokens"], entries["a.pdf"]["embedded_tokens"]),
+                         (3, 220, 150))
+        self.assertAlmostEqual(entries["a.pdf"]["embedding_cost"], 0.15)
+        self.assertEqual(entries["a.pdf"]["pages"], 3)
+        self.assertEqual(entries["scan.pdf"]["status"], "no_text")
+        self.assertEqual(entries["broken.docx"]["status"], "failed")
+
+class TestDocumentCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "snapshots")
+        self.docs = os.path.join(self.tmp.name, "documents")
+        os.makedirs(self.docs)
+        entries = catalog_entries({f"doc_{i:05d}.pdf": stats(i, float(i)) for i in range(20000)},
+                                  [chunk(f"doc_{i:05d}.pdf", 1) for i in range(0, 20000, 2)], [], lambda t: 0.0)
+        publish(self.root, entries)
+        # Without a documents folder the view is the published catalog alone
+        self.catalog = DocumentCatalog(self.root, refresh_interval=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_in_both_orders(self):
+        total, newest = self.catalog.page(0, 3)
+        self.assertEqual(total, 20000)
+        self.assertEqual([e["name"] for e in newest], ["doc_19999.pdf", "doc_19998.pdf", "doc_19997.pdf"])
+        _, page = self.catalog.page(19998, 5)
+        self.assertEqual([e["name"] for e in page], ["doc_00001.pdf", "doc_00000.pdf"])
+        _, by_name = self.catalog.page(10, 2, sort="name", descending=False)
+        self.assertEqual([e["name"] for e in by_name], ["doc_00010.pdf", "doc_00011.pdf"])
+        self.assertEqual(self.catalog.page(20000, 10), (20000, []))
+        with self.assertRaises(ValueError):
+            self.catalog.page(sort="colour")
+
+    def test_counts_and_generation_follow_publishes(self):
+        self.assertEqual((self.catalog.count(), self.catalog.count("indexed"), self.catalog.generation), (20000, 10000, 1))
+        publish(self.root, catalog_entries({"new.pdf": stats(1, 1.0)}, [chunk("new.pdf", 1)], [], lambda t: 0.0))
+        self.assertEqual(self.catalog.count(), 20000)  # within refresh_interval
+        self.catalog.refresh(force=True)
+        self.assertEqual((self.catalog.count(), self.catalog.generation), (1, 2))
+        self.assertEqual(self.catalog.get("new.pdf")["generation"], 2)
+
+    def test_unindexed_folder_is_listed_as_pending(self):
+        with open(os.path.join(self.docs, "a.pdf"), "wb") as f:
+            f.write(b"%PDF")
+        catalog = DocumentCatalog(os.path.join(self.tmp.name, "empty"), self.docs)
+        self.assertEqual([(e["name"], e["status"]) for e in catalog.page()[1]], [("a.pdf", "pending")])
+
+    def test_folder_is_merged_with_the_published_catalog(self):
+        for name in ("doc_00000.pdf", "doc_00001.pdf", "new.pdf", "notes.md"):
+            with open(os.path.join(self.docs, name), "wb") as f:
+                f.write(b"%PDF")
+        catalog = DocumentCatalog(self.root, self.docs, refresh_interval=60)
+        self.assertEqual(sorted((e["name"], e["status"], e["generation"]) for e in catalog.page()[1]),
+                         [("doc_00000.pdf", "indexed", 1), ("doc_00001.pdf", "no_text", 1), ("new.pdf", "pending", None)])
+        os.remove(os.path.join(self.docs, "doc_00000.pdf"))
+        catalog.refresh(force=True)
+        self.assertEqual((catalog.count(), catalog.get("doc_00000.pdf")), (2, None))
+
+    def test_documents_endpoint_paginates_from_the_catalog(self):
+        from backend import app as app_module
+        with mock.patch.object(app_module, "_document_catalog", self.catalog):
+            client = TestClient(app_module.app)
+            response = client.get("/api/documents", params={"offset": 2, "limit": 2, "sort": "size", "order": "asc"})
+            health = client.get("/api/health").json()
+            bad = client.get("/api/documents", params={"sort": "colour"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-Total-Count"], "20000")
+        self.assertEqual([(d["name"], d["status"]) for d in response.json()], [("doc_00002.pdf", "indexed"), ("doc_00003.pdf", "no_text")])
+        self.assertEqual((health["documents_count"], health["indexed_documents"], health["index_generation"]), (20000, 10000, 1))
+        self.assertEqual(bad.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Add benchmark tools to Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+
+from eval_sweep import parse_grid, config_env, store_key, score_sources, summarize_config, run_config, UsageRecorder
+
+class TestSweepGrid(unittest.TestCase):
+    def test_grid_is_the_product_of_its_axes(self):
+        configs = parse_grid(["k=3,5,8", "chunk_tokens=384, 512"])
+        self.assertEqual(len(configs), 6)
+        self.assertEqual(configs[0], {"k": "3", "chunk_tokens": "384"})
+        self.assertEqual(config_env(configs[-1]), {"RETRIEVAL_K": "8", "CHUNK_TOKENS": "512"})
+        self.assertEqual(parse_grid([]), [{}])
+        for specs in (["top_k=3"], ["k"], ["k=3", "k=5"], ["model="]):
+            with self.assertRaises(ValueError):
+                parse_grid(specs)
+
+    def test_only_chunking_knobs_need_their_own_store(self):
+        base = store_key({"k": "3", "chunk_tokens": "384"}, "corpus", "text-embedding-3-large")
+        self.assertEqual(base, store_key({"k": "8", "model": "gpt-4o", "chunk_tokens": "384"}, "corpus",
+                                         "text-embedding-3-large"))
+        self.assertNotEqual(base, store_key({"k": "3", "chunk_tokens": "512"}, "corpus", "text-embedding-3-large"))
+        self.assertNotEqual(base, store_key({"k": "3", "chunk_tokens": "384"}, "other corpus", "text-embedding-3-large"))
+
+class TestSweepScoring(unittest.TestCase):
+    def test_sources_are_matched_by_document_and_optional_page(self):
+        sources = [{"document": "a.pdf", "page": 2}, {"document": "b.pdf", "page": 7}]
+        self.assertEqual(score_sources(sources, [{"file_name": "b.pdf", "page": 7}, {"file_name": "c.pdf"}]),
+                         {"hit": 1.0, "recall": 0.5, "reciprocal_rank": 0.5})
+        self.assertEqual(score_sources(sources, [{"file_name": "a.pdf", "page": 3}])["hit"], 0.0)
+        self.assertEqual(score_sources(sources, [{"file_name": "a.pdf"}])["reciprocal_rank"], 1.0)
+        # No expected sources: the question should be answered without retrieval
+        self.assertEqual(score_sources([], [])["hit"], 1.0)
+        self.assertEqual(score_sources(sources, [])["hit"], 0.0)
+
+    def test_usage_is_split_by_activity_and_counted_when_unreported(self):
+        recorder = UsageRecorder(lambda i, o, model: (i + 2 * o) / 1000, lambda texts: [len(t.split()) for t in texts])
+        recorder.record("embedding", "text-embedding-3-large", 12)
+        recorder.record("answer_generation", "gpt-4.1-nano", None, None, input_text="a b c", output_text="d e")
+        self.assertEqual(recorder.take(), {"prompt_tokens": 3, "completion_tokens": 2, "embedding_tokens": 12,
+                                           "llm_calls": 1, "cost_usd": 0.019})
+        self.assertEqual(recorder.take()["llm_calls"], 0)
+
+    def test_summary_averages_per_question(self):
+        results = [{"hit": 1.0, "recall": 1.0, "reciprocal_rank": 1.0, "prompt_tokens": 100, "completion_tokens": 10,
+                    "embedding_tokens": 20, "llm_calls": 1, "cost_usd": 0.002, "latency_ms": ms, "error": None}
+                   for ms in (100.0, 300.0)]
+        results[1].update(hit=0.0, reciprocal_rank=0.0, prompt_tokens=300, error="TimeoutError")
+        summary = summarize_config(results)
+        self.assertEqual((summary["hit_rate"], summary["mrr"], summary["prompt_tokens"]), (0.5, 0.5, 200))
+        self.assertEqual((summary["errors"], summary["cost_per_question_usd"]), (1, 0.002))
+        self.assertEqual(summary["latency_ms"], {"p50": 100.0, "p95": 300.0, "mean": 200.0})
+
+class TestSweepRun(unittest.TestCase):
+    def test_each_question_gets_its_own_usage_and_score(self):
+        from backend.assistant import langgraph_flow
+        from backend.utils.token_logger import token_logger
+
+        def answer(question, history):
+            token_logger.log_answer_generation("prompt " * len(history), "answer", "gpt-4.1-nano",
+                                               usage={"prompt_tokens": 100 + len(history), "completion_tokens": 5})
+            return {"type": "answer", "content": "answer", "sources": [{"document": "a.pdf", "page": 1}]}
+
+        questions = [{"question": "q1", "expected": [{"file_name": "a.pdf"}]},
+                     {"question": "q2", "expected": [{"file_name": "b.pdf"}], "history": [["hi", "hello"]]}]
+        with patch.object(langgraph_flow, "run_assistant", side_effect=answer) as run_assistant:
+            results = run_config({}, questions, "/nonexistent")
+        self.assertEqual(run_assistant.call_args_list[1][0], ("q2", [("hi", "hello")]))
+        self.assertEqual([(r["hit"], r["prompt_tokens"], r["llm_calls"]) for r in results], [(1.0, 100, 1), (0.0, 101, 1)])
+        self.assertTrue(all(r["error"] is None and r["latency_ms"] >= 0 for r in results))
+
+if __name__ == "__main__":
+    unittest.main()
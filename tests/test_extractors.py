@@ -0,0 +1,113 @@
+import os
+import sys
+import shutil
+import zipfile
+import tempfile
+import tracemalloc
+import unittest
+from xml.sax.saxutils import escape
+
+import fitz  # PyMuPDF
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.ingest.extractors import iter_sections, supported_extensions, extract_txt
+from backend.ingest.pdf_loader import iter_document_chunks, load_and_chunk_documents, load_and_chunk_pdfs
+
+def write_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+
+def write_docx(path, paragraphs):
+    body = ''.join(f'<w:p><w:r><w:t>{escape(p)}</w:t></w:r></w:p>' for p in paragraphs)
+    xml = ('<?xml version="1.0" encoding="UTF-8"?>'
+           '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+           f'<w:body>{body}</w:body></w:document>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('word/document.xml', xml)
+
+class TestExtractors(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_registry_covers_accepted_upload_formats(self):
+        self.assertEqual(set(supported_extensions()), {'.pdf', '.txt', '.docx'})
+        with self.assertRaises(ValueError):
+            list(iter_sections(os.path.join(self.dir, 'notes.md')))
+
+    def test_pdf_sections_are_pages(self):
+        path = os.path.join(self.dir, 'a.pdf')
+        write_pdf(path, ["Pasal satu", "", "Pasal tiga"])
+        sections = list(iter_sections(path))
+        self.assertEqual([s.page_number for s in sections], [1, 3])
+        self.assertEqual(sections[1].text, "Pasal tiga")
+
+    def test_txt_sections_cut_at_line_breaks_with_offsets(self):
+        path = os.path.join(self.dir, 'a.txt')
+        lines = [f"line {i} " + "x" * 40 for i in range(100)]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        sections = list(extract_txt(path, section_chars=500))
+        self.assertGreater(len(sections), 5)
+        self.assertEqual([s.page_number for s in sections], list(range(1, len(sections) + 1)))
+        self.assertEqual('\n'.join(s.text for s in sections).split('\n'), lines)
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        for section in sections:
+            self.assertTrue(content[section.position["char_offset"]:].lstrip().startswith(section.text))
+
+    def test_docx_paragraphs_are_streamed_into_sections(self):
+        path = os.path.join(self.dir, 'a.docx')
+        write_docx(path, [f"Ayat {i} & ketentuan" for i in range(2000)])
+        sections = list(iter_sections(path))
+        self.assertGreater(len(sections), 1)
+        self.assertEqual(sections[0].position, {"paragraph": 1})
+        self.assertEqual(sum(len(s.text.split('\n')) for s in sections), 2000)
+        self.assertIn("Ayat 0 & ketentuan", sections[0].text)
+
+    def test_large_text_file_streams_in_constant_memory(self):
+        path = os.path.join(self.dir, 'big.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            for i in range(200000):
+                f.write(f"Baris {i} tentang manajemen risiko teknologi informasi.\n")  # ~11 MB
+        tracemalloc.start()
+        try:
+            count = sum(1 for _ in iter_sections(path))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(count, 1000)
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_loader_indexes_every_supported_format(self):
+        write_pdf(os.path.join(self.dir, 'a.pdf'), ["Pasal satu"])
+        with open(os.path.join(self.dir, 'b.txt'), 'w', encoding='utf-8') as f:
+            f.write("Ketentuan umum")
+        write_docx(os.path.join(self.dir, 'c.docx'), ["Ketentuan penutup"])
+        with open(os.path.join(self.dir, 'd.md'), 'w') as f:
+            f.write("ignored")
+        chunks = load_and_chunk_documents(self.dir)
+        self.assertEqual([c["metadata"]["file_name"] for c in chunks], ['a.pdf', 'b.txt', 'c.docx'])
+        self.assertEqual(chunks[1]["metadata"]["char_offset"], 0)
+        self.assertEqual(chunks[2]["metadata"]["paragraph"], 1)
+
+    def test_chunks_are_streamed_and_the_old_name_still_works(self):
+        for name in ('a.txt', 'b.txt'):
+            with open(os.path.join(self.dir, name), 'w', encoding='utf-8') as f:
+                f.write(f"Ketentuan {name}")
+        file_stats = {}
+        chunks = iter_document_chunks(self.dir, file_stats)
+        self.assertEqual(next(chunks)["metadata"]["file_name"], 'a.txt')
+        self.assertEqual(list(file_stats), ['a.txt'])  # b.txt not read yet
+        self.assertEqual([c["metadata"]["file_name"] for c in chunks], ['b.txt'])
+        self.assertIs(load_and_chunk_pdfs, load_and_chunk_documents)
+
+if __name__ == '__main__':
+    unittest.main()
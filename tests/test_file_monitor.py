@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+
+from watchdog.events import FileCreatedEvent, FileModifiedEvent, FileDeletedEvent, FileMovedEvent
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.file_monitor import DocumentChangeHandler, DocumentMonitor
+
+class TestDocumentChangeHandler(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.change_sets = []
+        self.handler = DocumentChangeHandler(self.change_sets.append, quiet_period=0.1)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name, content=None):
+        path = os.path.join(self.dir, name)
+        if content is not None:
+            with open(path, 'w') as f:
+                f.write(content)
+        return path
+
+    def settle(self):
+        """Drives the handler's settle check the way its background thread would."""
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            time.sleep(0.06)
+            changes = self.handler._take_if_settled()
+            if changes is not None:
+                return changes
+        self.fail("change set never settled")
+
+    def test_events_are_merged_per_path(self):
+        a, b, c = self.path('a.pdf', 'x'), self.path('b.txt', 'x'), self.path('c.docx')
+        gone = self.path('gone.pdf')
+        self.handler.dispatch(FileCreatedEvent(a))
+        self.handler.dispatch(FileModifiedEvent(a))
+        self.handler.dispatch(FileModifiedEvent(b))
+        self.handler.dispatch(FileDeletedEvent(c))
+        self.handler.dispatch(FileCreatedEvent(gone))
+        self.handler.dispatch(FileDeletedEvent(gone))
+        self.handler.dispatch(FileCreatedEvent(self.path('notes.md', 'x')))
+        self.assertEqual(self.settle(), {a: 'created', b: 'modified', c: 'deleted'})
+
+    def test_move_is_delete_plus_create(self):
+        old, new = self.path('old.pdf'), self.path('new.pdf', 'x')
+        self.handler.dispatch(FileMovedEvent(old, new))
+        self.handler.dispatch(FileMovedEvent(self.path('upload.tmp'), self.path('upload.pdf', 'x')))
+        self.assertEqual(self.settle(), {old: 'deleted', new: 'created', self.path('upload.pdf'): 'created'})
+
+    def test_waits_until_writes_are_complete(self):
+        growing = self.path('growing.pdf', 'x')
+        self.handler.dispatch(FileCreatedEvent(growing))
+        stop = threading.Event()
+
+        def writer():
+            # Keeps appending without emitting events, like a slow copy the observer coalesced
+            while not stop.is_set():
+                with open(growing, 'a') as f:
+                    f.write('x')
+                time.sleep(0.02)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            time.sleep(0.15)
+            for _ in range(5):
+                self.assertIsNone(self.handler._take_if_settled())
+                time.sleep(0.06)
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(self.settle(), {growing: 'created'})
+
+class TestDocumentMonitor(unittest.TestCase):
+    def test_stop_without_start_is_safe(self):
+        with tempfile.TemporaryDirectory() as directory:
+            DocumentMonitor(directory, callback=lambda changes: None).stop()
+
+    def test_bulk_copy_is_one_change_set(self):
+        change_sets = []
+        done = threading.Event()
+
+        def callback(changes):
+            change_sets.append(changes)
+            done.set()
+
+        with tempfile.TemporaryDirectory() as directory:
+            monitor = DocumentMonitor(directory, callback=callback, quiet_period=0.5)
+            monitor.start()
+            try:
+                expected = set()
+                for i in range(500):
+                    path = os.path.join(directory, f"doc_{i:03d}.pdf")
+                    with open(path, 'wb') as f:
+                        f.write(b'%PDF-1.4 ' * 64)
+                    expected.add(path)
+                self.assertTrue(done.wait(10))
+                time.sleep(1.0)  # no second pass follows
+            finally:
+                monitor.stop()
+        self.assertEqual(len(change_sets), 1)
+        self.assertEqual(set(change_sets[0]), expected)
+        self.assertEqual(set(change_sets[0].values()), {'created'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.assistant.intent_router import IntentRouter, EXAMPLES, INTENTS, REPLIES
+
+DIM = 8
+
+def direction(*intents):
+    vector = np.zeros(DIM, dtype=np.float32)
+    for intent in intents:
+        vector[INTENTS.index(intent)] = 1.0
+    return vector
+
+LABELS = {text: intent for intent, examples in EXAMPLES.items() for text, _ in examples}
+
+def fake_embed(queries=None):
+    """Examples point along their intent's axis; anything else is looked up in `queries`."""
+    def embed(texts):
+        return np.stack([direction(LABELS[t]) if t in LABELS else queries[t] for t in texts])
+    return mock.Mock(side_effect=embed)
+
+class TestIntentRouter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.router = IntentRouter(cache_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_bare_greetings_and_thanks_need_no_embedding(self):
+        self.assertEqual(self.router.route_text("Terima kasih!"), ("chit_chat", 1.0, REPLIES["thanks.id"]))
+        self.assertEqual(self.router.route_text("  Hi "), ("chit_chat", 1.0, REPLIES["greeting.en"]))
+        self.assertIsNone(self.router.route_text("resume the loan process"))
+
+    def test_nearest_centroid_wins_and_fast_path_needs_a_margin(self):
+        embed = fake_embed()
+        route = self.router.route("what's the weather", direction("out_of_scope"), embed)
+        self.assertEqual(route.intent, "out_of_scope")
+        self.assertIn(route.reply, (REPLIES["out_of_scope.en"], REPLIES["out_of_scope.id"]))
+        self.assertEqual(self.router.route("resume the loan process", direction("qa"), embed), ("qa", 1.0, None))
+        # Halfway between chit-chat and qa: not certain enough to skip retrieval
+        ambiguous = self.router.route("thanks, and what about article 5?", direction("chit_chat", "qa"), embed)
+        self.assertEqual((ambiguous.intent, ambiguous.reply), ("qa", None))
+        embed.assert_called_once()
+
+    def test_example_embeddings_are_stored_and_reused(self):
+        self.router.route("hello", direction("chit_chat"), fake_embed())
+        embed = fake_embed()
+        route = IntentRouter(cache_dir=self.tmp.name).route("ringkas", direction("summarize"), embed)
+        self.assertEqual(route.intent, "summarize")
+        embed.assert_not_called()
+
+    def test_falls_back_to_keywords_without_embeddings(self):
+        self.assertEqual(self.router.route("tolong ringkas dokumen ini", None, fake_embed()).intent, "summarize")
+        failing = mock.Mock(return_value=None)
+        self.assertEqual(self.router.route("berapa modal minimum?", direction("qa"), failing).intent, "qa")
+
+class TestAssistantFastPath(unittest.TestCase):
+    def setUp(self):
+        from backend.assistant import langgraph_flow
+        self.flow = langgraph_flow
+        self.tmp = tempfile.TemporaryDirectory()
+        self.retriever = mock.Mock()
+        self.retriever.retrieve_chunks.return_value = []
+        self.patches = [mock.patch.object(langgraph_flow, "intent_router", IntentRouter(cache_dir=self.tmp.name)),
+                        mock.patch.object(langgraph_flow, "Retriever", return_value=self.retriever),
+                        mock.patch.object(langgraph_flow, "AnswerGenerator")]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def test_small_talk_is_answered_without_retrieval(self):
+        result = self.flow.run_assistant("Halo")
+        self.assertEqual(result, {"type": "reply", "content": REPLIES["greeting.id"], "sources": []})
+        self.flow.Retriever.assert_not_called()
+
+    def test_out_of_scope_skips_search_and_generation(self):
+        query = "Who won the match last night?"
+        retrieval_query = f"\nCurrent user question: {query}"
+        self.retriever.embed_queries = fake_embed({query: direction("out_of_scope"), retrieval_query: direction("qa")})
+        events = list(self.flow.stream_assistant(query))
+        self.assertEqual(events[-1]["type"], "reply")
+        self.retriever.retrieve_chunks.assert_not_called()
+        self.flow.AnswerGenerator.assert_not_called()
+
+    def test_questions_reuse_the_retrieval_embedding(self):
+        query = "What must a bank report?"
+        retrieval_query = f"\nCurrent user question: {query}"
+        search_vector = direction("qa", "summarize")
+        self.retriever.embed_queries = fake_embed({query: direction("qa"), retrieval_query: search_vector})
+        self.assertEqual(self.flow.run_assistant(query)["type"], "answer")
+        self.retriever.embed_queries.assert_any_call([query, retrieval_query])
+        _, kwargs = self.retriever.retrieve_chunks.call_args
+        np.testing.assert_array_equal(kwargs["query_embedding"], search_vector)
+
+if __name__ == '__main__':
+    unittest.main()
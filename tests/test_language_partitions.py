@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import faiss
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.language_detect import detect_language, detect_query_language
+from backend.embeddings.snapshots import write_snapshot, verify_snapshot, current_snapshot
+
+class TestDetectLanguage(unittest.TestCase):
+    def test_english_and_indonesian(self):
+        self.assertEqual(detect_language("What are the obligations of the bank when an incident occurs?"), "en")
+        self.assertEqual(detect_language("Apa kewajiban bank apabila terjadi insiden siber?"), "id")
+        self.assertEqual(detect_language("Bank wajib menyampaikan laporannya kepada Otoritas Jasa Keuangan "
+                                         "paling lambat 5 hari kerja setelah insiden diketahui."), "id")
+        self.assertEqual(detect_query_language("Who is responsible for the IT strategic plan?"), "en")
+
+    def test_neutral_or_mixed_text_is_unknown(self):
+        for text in ("", "Rp 1.000.000.000 | 12,5% | 2024", "POJK 11/POJK.03/2022",
+                     "the bank yang wajib and the data dari nasabah"):
+            self.assertEqual(detect_language(text), "unknown")
+
+def unit(*components):
+    vector = np.zeros(4, dtype='float32')
+    for axis, weight in components:
+        vector[axis] = weight
+    return vector / np.linalg.norm(vector)
+
+class TestLanguagePartitions(unittest.TestCase):
+    def setUp(self):
+        from backend.embeddings.vector_store import build_language_partitions
+        languages = ["en", "id", "id", "unknown", "en"]
+        self.vectors = np.stack([unit((0, 1)), unit((1, 1)), unit((1, 1), (2, 0.1)), unit((3, 1)), unit((0, 1), (1, 1))])
+        self.chunks = [{"text": f"chunk {i}", "metadata": {"file_name": "a.pdf", "page_number": i, "language": lang}}
+                       for i, lang in enumerate(languages)]
+        self.partitions = build_language_partitions(self.vectors, self.chunks)
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(4))
+        index.add_with_ids(self.vectors, np.arange(len(self.chunks)))
+        self.tmp = tempfile.TemporaryDirectory()
+        write_snapshot(index, self.chunks, root=self.tmp.name, partitions=self.partitions)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_partitions_hold_their_language_and_neutral_chunks(self):
+        from backend.embeddings.vector_store import build_language_partitions
+        self.assertEqual({lang: p.ntotal for lang, p in self.partitions.items()}, {"en": 3, "id": 3})
+        manifest = verify_snapshot(current_snapshot(self.tmp.name))
+        self.assertEqual(manifest["partitions"], {"en": 3, "id": 3})
+        self.assertIn("index-id.faiss", manifest["files"])
+        self.assertEqual(build_language_partitions(self.vectors[:2], [self.chunks[0], self.chunks[4]]), {})
+
+    def test_search_prefers_the_partition_and_falls_back(self):
+        from backend.qa import retriever as retriever_module
+        with mock.patch.object(retriever_module, "SNAPSHOTS_DIR", self.tmp.name), \
+                mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test"}), \
+                mock.patch("builtins.print"):
+            retriever = retriever_module.Retriever()
+
+            def pages(vector, k, language):
+                return [c["metadata"]["page_number"] for c in retriever.retrieve_chunks("q", k, vector, language)]
+
+            self.assertEqual(sorted(retriever.partitions), ["en", "id"])
+            self.assertEqual(pages(unit((1, 1)), 2, None), [1, 2])
+            # Only English and neutral chunks are searched for an English query
+            self.assertEqual(pages(unit((1, 1)), 2, "en"), [4, 0])
+            # Nothing in the partition is close enough: cross-language search
+            self.assertEqual(pages(unit((2, 1)), 1, "en"), [2])
+            # The partition has fewer than k chunks: cross-language search
+            self.assertEqual(len(pages(unit((1, 1)), 4, "id")), 4)
+            # Over-fetching candidates for re-ranking does not bypass a partition that holds k
+            reranker = mock.Mock(active=True, rerank=lambda query, results, k: results[:k])
+            with mock.patch.object(retriever_module, "reranker", reranker), \
+                    mock.patch.object(retriever_module, "RERANK_CANDIDATES", 50):
+                self.assertEqual(pages(unit((1, 1)), 2, "en"), [4, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+import numpy as np
+from fastapi.testclient import TestClient
+
+# Add load test tools to Python path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'load'))
+
+from stub_openai_server import StubConfig, create_stub_app
+from load_runner import percentile, summarize
+
+class TestLoadStub(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(create_stub_app(StubConfig(latency_ms=0, jitter_ms=0, dimensions=8)))
+
+    def test_embeddings_are_deterministic_and_normalized(self):
+        body = {"input": ["apa itu ai", "what is ai"], "model": "text-embedding-3-large"}
+        first = self.client.post("/v1/embeddings", json=body).json()
+        second = self.client.post("/v1/embeddings", json=body).json()
+        self.assertEqual(first["data"], second["data"])
+        vector = np.array(first["data"][0]["embedding"])
+        self.assertEqual(vector.shape, (8,))
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        self.assertNotEqual(first["data"][0]["embedding"], first["data"][1]["embedding"])
+
+    def test_injected_errors(self):
+        client = TestClient(create_stub_app(StubConfig(latency_ms=0, jitter_ms=0, error_rate=1.0)))
+        response = client.post("/v1/chat/completions", json={"model": "gpt-4.1-nano", "messages": []})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+    def test_report_percentiles(self):
+        samples = {"chat": [(float(ms), ms != 100, 200 if ms != 100 else 500) for ms in range(1, 101)]}
+        report = summarize(samples, wall_seconds=10)["chat"]
+        self.assertEqual(report["latency_ms"]["p50"], 50.0)
+        self.assertEqual(report["latency_ms"]["p99"], 99.0)
+        self.assertEqual(report["errors_by_status"], {"500": 1})
+        self.assertAlmostEqual(report["throughput_rps"], 10.0)
+        self.assertIsNone(percentile([], 50))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import unittest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.metrics import MetricsRegistry, STAGE_SECONDS, STAGE_ERRORS, span
+
+class TestMetrics(unittest.TestCase):
+    def test_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        hits = registry.counter("test_hits_total", "Hits.", ("cache",))
+        latency = registry.histogram("test_latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        registry.gauge("test_depth", "Depth.", callback=lambda: 7)
+        hits.inc(cache="summary")
+        hits.inc(2, cache="summary")
+        latency.observe(0.05, stage="embed_query")
+        latency.observe(0.5, stage="embed_query")
+        latency.observe(5, stage="embed_query")
+
+        text = registry.render()
+        self.assertIn('# TYPE test_hits_total counter', text)
+        self.assertIn('test_hits_total{cache="summary"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{stage="embed_query",le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{stage="embed_query",le="1.0"} 2', text)
+        self.assertIn('test_latency_seconds_bucket{stage="embed_query",le="+Inf"} 3', text)
+        self.assertIn('test_latency_seconds_count{stage="embed_query"} 3', text)
+        self.assertIn('test_depth 7', text)
+
+    def test_registering_twice_returns_same_metric(self):
+        registry = MetricsRegistry()
+        self.assertIs(registry.counter("x_total", "X."), registry.counter("x_total", "X."))
+
+    def test_span_records_duration_and_errors(self):
+        before = STAGE_SECONDS.count(stage="unit_test_stage")
+        with span("unit_test_stage"):
+            pass
+        with self.assertRaises(RuntimeError):
+            with span("unit_test_stage"):
+                raise RuntimeError("boom")
+        self.assertEqual(STAGE_SECONDS.count(stage="unit_test_stage"), before + 2)
+        self.assertEqual(STAGE_ERRORS.value(stage="unit_test_stage"), 1)
+
+if __name__ == "__main__":
+    unittest.main()
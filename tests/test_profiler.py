@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.profiler import RequestProfiler, should_profile
+
+def _busy_work(seconds):
+    blocks = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        blocks.append(bytearray(1024))
+    return len(blocks)
+
+class TestRequestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profiler = RequestProfiler(profiles_dir=self.tmp.name, interval=0.001)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_profile_call_stores_speedscope_and_memory(self):
+        result, profile_id = self.profiler.profile_call("chat", _busy_work, 0.1)
+        self.assertGreater(result, 0)
+        self.assertIsNotNone(profile_id)
+
+        with open(self.profiler.profile_path(profile_id), encoding="utf-8") as f:
+            speedscope = json.load(f)
+        profile = speedscope["profiles"][0]
+        self.assertEqual(profile["type"], "sampled")
+        self.assertGreater(len(profile["samples"]), 0)
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        frame_names = {frame["name"] for frame in speedscope["shared"]["frames"]}
+        self.assertIn("_busy_work", frame_names)
+
+        with open(self.profiler.profile_path(profile_id, "memory"), encoding="utf-8") as f:
+            memory = json.load(f)
+        self.assertTrue(any("test_profiler.py" in a["location"] for a in memory["top_allocations"]))
+        self.assertEqual(self.profiler.list_profiles()[0]["id"], profile_id)
+
+    def test_rejects_unknown_paths(self):
+        self.assertIsNone(self.profiler.profile_path("../etc/passwd"))
+        self.assertIsNone(self.profiler.profile_path("missing"))
+
+    def test_trigger(self):
+        self.assertTrue(should_profile("1"))
+        self.assertFalse(should_profile(None))
+
+class TestAdminAccess(unittest.TestCase):
+    def setUp(self):
+        from backend import app as app_module
+        flow = SimpleNamespace(run_assistant=lambda query, history, collection: {"content": "ok", "sources": []})
+        self.profile_call = mock.Mock(side_effect=lambda label, fn, *args: (fn(*args), "p1"))
+        self.patches = [mock.patch.object(app_module, "_assistant", return_value=flow),
+                        mock.patch.object(app_module.request_profiler, "profile_call", self.profile_call),
+                        mock.patch.dict(os.environ, {"PROFILE_SAMPLE_RATE": "0"})]
+        for patch in self.patches:
+            patch.start()
+        self.client = TestClient(app_module.app)
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_admin_features_are_closed_without_admin_token(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("ADMIN_TOKEN", None)
+            for path in ("/api/admin/profiles", "/api/admin/profiles/p1", "/api/admin/snapshots"):
+                self.assertEqual(self.client.get(path, headers={"X-Admin-Token": ""}).status_code, 403)
+            self.assertEqual(self.client.post("/api/admin/snapshots/rollback").status_code, 403)
+            response = self.client.post("/api/chat?profile=1", json={"content": "hi"}, headers={"X-Profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.profile_call.assert_not_called()
+
+    def test_matching_admin_token_enables_profiling(self):
+        with mock.patch.dict(os.environ, {"ADMIN_TOKEN": "s3cret"}):
+            self.assertEqual(self.client.get("/api/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code, 403)
+            response = self.client.post("/api/chat", json={"content": "hi"},
+                                        headers={"X-Profile": "1", "X-Admin-Token": "s3cret"})
+        self.assertEqual(response.headers["X-Profile-Id"], "p1")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import unittest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.readiness import Readiness
+from backend.qa.retriever import load_metadata
+
+class TestReadiness(unittest.TestCase):
+    def test_ready_only_when_required_components_are(self):
+        readiness = Readiness(required=("index", "metadata"))
+        self.assertFalse(readiness.ready)
+        self.assertFalse(readiness.run_parallel({"index": lambda: None, "tokenizer": lambda: 1 / 0}))
+        self.assertFalse(readiness.ready)
+        self.assertTrue(readiness.run_task("metadata", lambda: None))
+        status = readiness.snapshot()
+        self.assertTrue(status["ready"])
+        self.assertEqual(status["components"]["tokenizer"]["state"], "failed")
+        self.assertIn("ZeroDivisionError", status["components"]["tokenizer"]["error"])
+
+    def test_run_parallel_overlaps_tasks(self):
+        readiness = Readiness()
+        start = time.perf_counter()
+        readiness.run_parallel({name: (lambda: time.sleep(0.2)) for name in ("a", "b", "c")})
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+class TestRetrieverStoreCache(unittest.TestCase):
+    def test_metadata_loaded_once_per_file_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metadata.json")
+            with open(path, "w") as f:
+                json.dump({"0": {"text": "a"}}, f)
+            first = load_metadata(path)
+            self.assertIs(load_metadata(path), first)
+            with open(path, "w") as f:
+                json.dump({"0": {"text": "b"}, "1": {"text": "c"}}, f)
+            os.utime(path, ns=(time.time_ns() + 10**9,) * 2)
+            self.assertEqual(len(load_metadata(path)), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.assistant.request_coalescer import SingleFlight, coalesce_key
+
+class TestRequestCoalescer(unittest.TestCase):
+    def test_key_normalizes_query_and_fingerprints_history(self):
+        self.assertEqual(coalesce_key("Apa itu  AI?", "qa"), coalesce_key(" apa itu ai? ", "qa"))
+        self.assertNotEqual(coalesce_key("apa itu ai?", "qa"), coalesce_key("apa itu ai?", "summarize"))
+        self.assertNotEqual(coalesce_key("apa itu ai?", "qa"), coalesce_key("apa itu ai?", "qa", [("hi", "hello")]))
+
+    def test_concurrent_identical_calls_run_once(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(2)
+            return {"content": "answer"}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("k", compute))) for _ in range(5)]
+        for t in threads:
+            t.start()
+        while flight.coalesced < 4:
+            time.sleep(0.01)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"content": "answer"}] * 5)
+
+    def test_errors_propagate_to_followers(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fail():
+            calls.append(1)
+            release.wait(2)
+            raise ValueError("boom")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("k", fail)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        while not calls:
+            time.sleep(0.01)
+        follower = threading.Thread(target=call)
+        follower.start()
+        while flight.coalesced < 1:
+            time.sleep(0.01)
+        release.set()
+        leader.join()
+        follower.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+        # The failed call is not remembered
+        self.assertEqual(flight.do("k", lambda: 1), 1)
+
+    def test_streams_are_shared_and_replayed(self):
+        flight = SingleFlight()
+        calls = []
+        gate = threading.Event()
+
+        def produce():
+            calls.append(1)
+            yield "a"
+            gate.wait(2)
+            yield "b"
+
+        first = flight.do_stream("k", produce)
+        self.assertEqual(next(first), "a")
+        late = flight.do_stream("k", produce)
+        gate.set()
+        self.assertEqual(list(first), ["b"])
+        self.assertEqual(list(late), ["a", "b"])
+        self.assertEqual(len(calls), 1)
+
+if __name__ == "__main__":
+    unittest.main()
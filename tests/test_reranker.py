@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import faiss
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.qa.reranker import CrossEncoderReranker
+from backend.embeddings.snapshots import write_snapshot
+
+class WordOverlapModel:
+    """Stands in for a CrossEncoder: scores a pair by the question words found in the text."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(len(pairs))
+        return np.array([sum(word in text.split() for word in question.split()) for question, text in pairs],
+                        dtype=np.float32)
+
+def chunk(i, text):
+    return {"text": text, "metadata": {"file_name": "pojk.pdf", "page_number": i, "chunk_id": f"c{i}"}}
+
+class TestCrossEncoderReranker(unittest.TestCase):
+    def setUp(self):
+        self.model = WordOverlapModel()
+        self.reranker = CrossEncoderReranker(enabled=True, loader=lambda name: self.model)
+        self.reranker.warm()
+        self.chunks = [chunk(i, f"pasal {i} ketentuan umum") for i in range(50)]
+        self.chunks[37] = chunk(37, "bank wajib melaporkan insiden siber")
+
+    def test_best_chunks_are_kept_in_one_batch_and_scores_are_cached(self):
+        top = self.reranker.rerank("bank melaporkan insiden", self.chunks, 3)
+        self.assertEqual([c["metadata"]["page_number"] for c in top][0], 37)
+        self.assertEqual((len(top), top[0]["rerank_score"]), (3, 3.0))
+        self.assertEqual(self.model.calls, [50])
+        self.reranker.rerank("bank melaporkan insiden", self.chunks[30:], 3)
+        self.assertEqual(self.model.calls, [50])
+        self.reranker.rerank("ketentuan umum", self.chunks[:10], 3)
+        self.assertEqual(self.model.calls, [50, 10])
+
+    def test_disabled_or_unavailable_model_keeps_faiss_order(self):
+        disabled = CrossEncoderReranker(enabled=False, loader=lambda name: self.model)
+        self.assertEqual(disabled.rerank("bank", self.chunks, 2), self.chunks[:2])
+
+        def missing(name):
+            raise ImportError("No module named 'sentence_transformers'")
+        with mock.patch("builtins.print"):
+            unavailable = CrossEncoderReranker(enabled=True, loader=missing)
+            self.assertEqual(unavailable.rerank("bank", self.chunks, 2), self.chunks[:2])
+            with self.assertRaises(RuntimeError):
+                unavailable.warm()
+        self.assertEqual(self.model.calls, [])
+
+    def test_requests_keep_faiss_order_until_the_model_is_warm(self):
+        loading = threading.Event()
+
+        def slow(name):
+            loading.wait(5)
+            return self.model
+        cold = CrossEncoderReranker(enabled=True, loader=slow)
+        self.assertEqual(cold.rerank("bank melaporkan insiden", self.chunks, 2), self.chunks[:2])
+        loading.set()  # the first request started loading the model in the background
+        cold._background_load.join(5)
+        self.assertEqual(cold.rerank("bank melaporkan insiden", self.chunks, 1)[0]["metadata"]["page_number"], 37)
+
+class TestRetrieverReranks(unittest.TestCase):
+    def test_over_fetches_and_returns_the_reranked_top_k(self):
+        from backend.qa import retriever as retriever_module
+        chunks = [chunk(i, f"pasal {i} ketentuan umum") for i in range(60)]
+        chunks[40] = chunk(40, "bank wajib melaporkan insiden siber")
+        vectors = np.stack([np.full(4, i, dtype=np.float32) for i in range(60)])
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(4))
+        index.add_with_ids(vectors, np.arange(60))
+        model = WordOverlapModel()
+        reranker = CrossEncoderReranker(enabled=True, loader=lambda n: model)
+        reranker.warm()
+        with tempfile.TemporaryDirectory() as root, \
+                mock.patch.object(retriever_module, "SNAPSHOTS_DIR", root), \
+                mock.patch.object(retriever_module, "reranker", reranker), \
+                mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test"}), \
+                mock.patch("builtins.print"):
+            write_snapshot(index, chunks, root=root)
+            retriever = retriever_module.Retriever()
+            results = retriever.retrieve_chunks("history\nCurrent user question: bank melaporkan insiden", k=2,
+                                                query_embedding=np.zeros(4, dtype=np.float32),
+                                                rerank_query="bank melaporkan insiden")
+        # FAISS alone ranks page 40 41st of 60; it is within the 50 candidates and wins the re-rank
+        self.assertEqual(model.calls, [50])
+        self.assertEqual([c["metadata"]["page_number"] for c in results][0], 40)
+        self.assertEqual(len(results), 2)
+
+if __name__ == '__main__':
+    unittest.main()
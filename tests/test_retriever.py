@@ -6,7 +6,7 @@ from unittest.mock import patch, MagicMock
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from qa.retriever import Retriever
+from backend.qa.retriever import Retriever
 
 class TestRetriever(unittest.TestCase):
     @patch.object(Retriever, '__init__', lambda x: None)
@@ -0,0 +1,128 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import faiss
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.embeddings.snapshots import (ChunkStore, SnapshotError, current_generation, current_snapshot,
+                                          list_generations, rollback, verify_snapshot, write_snapshot)
+
+def vectors_for(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype('float32')
+
+def build(n, dim=8, seed=0):
+    vectors = vectors_for(n, dim, seed)
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(dim))
+    index.add_with_ids(vectors, np.arange(n))
+    chunks = [{"text": f"Pasal {i} — ketentuan", "metadata": {"file_name": "a.pdf", "page_number": i + 1}} for i in range(n)]
+    return index, chunks
+
+class TestSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_publish_writes_checksummed_generation_and_switches_pointer(self):
+        path = write_snapshot(*build(5), root=self.root, info={"embedding_model": "m"})
+        self.assertEqual(current_snapshot(self.root), path)
+        manifest = verify_snapshot(path)
+        self.assertEqual((manifest["generation"], manifest["vectors"], manifest["embedding_model"]), (1, 5, "m"))
+        store = ChunkStore(path)
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.get("3")["text"], "Pasal 3 — ketentuan")
+        self.assertIsNone(store.get("5"))
+        self.assertIsNone(store.get("x"))
+
+    def test_failed_build_leaves_published_generation_untouched(self):
+        write_snapshot(*build(3), root=self.root)
+        index, chunks = build(4)
+        with self.assertRaises(SnapshotError):
+            write_snapshot(index, chunks[:2], root=self.root)  # chunk/vector count mismatch
+        self.assertEqual(current_generation(self.root), 1)
+        self.assertEqual(sorted(os.listdir(self.root)), ["CURRENT", "gen-000001"])
+
+    def test_rollback_verifies_and_switches_back(self):
+        write_snapshot(*build(3), root=self.root)
+        write_snapshot(*build(4), root=self.root)
+        self.assertEqual(rollback(root=self.root), 1)
+        self.assertEqual(current_generation(self.root), 1)
+        self.assertEqual(rollback(2, root=self.root), 2)
+        with open(os.path.join(self.root, "gen-000001", "chunks.jsonl"), "r+b") as f:
+            f.write(b"X")
+        with self.assertRaises(SnapshotError):
+            rollback(1, root=self.root)
+        self.assertEqual(current_generation(self.root), 2)
+
+    def test_old_generations_are_pruned(self):
+        for n in range(1, 7):
+            write_snapshot(*build(n), root=self.root, keep=2)
+        self.assertEqual(list_generations(self.root), [4, 5, 6])
+
+class TestRetrieverUsesSnapshots(unittest.TestCase):
+    def test_retriever_follows_the_published_generation(self):
+        from backend.qa import retriever as retriever_module
+        with tempfile.TemporaryDirectory() as root, \
+                mock.patch.object(retriever_module, "SNAPSHOTS_DIR", root), \
+                mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test"}), \
+                mock.patch("builtins.print"):
+            write_snapshot(*build(3), root=root)
+            first = retriever_module.Retriever()
+            self.assertEqual(type(first.metadata).__name__, "ChunkStore")
+            self.assertEqual(first.index.ntotal, 3)
+            write_snapshot(*build(6, seed=1), root=root)
+            second = retriever_module.Retriever()
+            self.assertEqual((second.index.ntotal, len(second.metadata)), (6, 6))
+            with mock.patch.object(second, "embed_query", return_value=vectors_for(6, seed=1)[4:5]):
+                results = second.retrieve_chunks("q", k=1)
+            self.assertEqual(results[0]["metadata"]["page_number"], 5)
+            rollback(root=root)
+            self.assertEqual(retriever_module.Retriever().index.ntotal, 3)
+
+class TestEmptyStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "snapshots")
+        self.docs = os.path.join(self.tmp.name, "documents")
+        os.makedirs(self.docs)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _rebuild(self):
+        from backend.embeddings import vector_store
+        with mock.patch.object(vector_store, "DOCUMENTS_DIR", self.docs), \
+                mock.patch.object(vector_store, "SNAPSHOTS_DIR", self.root), \
+                mock.patch.object(vector_store, "embed_chunks") as embed, \
+                mock.patch("builtins.print"):
+            vector_store.create_and_save_vector_store(precompute_summaries=False)
+        return embed
+
+    def test_no_documents_publish_an_empty_store(self):
+        from backend.qa import retriever as retriever_module
+        self.assertFalse(self._rebuild().called)
+        with mock.patch.object(retriever_module, "SNAPSHOTS_DIR", self.root), \
+                mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test"}), \
+                mock.patch("builtins.print"):
+            retriever = retriever_module.Retriever()
+            self.assertEqual(retriever.index.ntotal, 0)
+            self.assertEqual(retriever.retrieve_chunks("q", query_embedding=np.zeros(3072)), [])
+
+    def test_documents_without_text_are_an_error(self):
+        from backend.embeddings.vector_store import IndexBuildError
+        with open(os.path.join(self.docs, "empty.txt"), "w") as f:
+            f.write("   ")
+        with self.assertRaises(IndexBuildError):
+            self._rebuild()
+        self.assertIsNone(current_snapshot(self.root))
+
+if __name__ == '__main__':
+    unittest.main()
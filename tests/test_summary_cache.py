@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.chains.summary_cache import SummaryCache
+
+def _chunk(page, content_hash="abc", file_name="doc.pdf"):
+    return {"text": f"page {page} text", "metadata": {"file_name": file_name, "page_number": page, "content_hash": content_hash}}
+
+class TestSummaryCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = SummaryCache(cache_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch('backend.chains.summary_cache.summarize_documents', side_effect=lambda llm, docs: f"summary of {len(docs)}")
+    def test_build_is_hierarchical_and_persisted(self, mock_summarize):
+        chunks = [_chunk(p) for p in (1, 2, 6, 11, 12)]
+        record = self.cache.build(None, "doc.pdf", "abc", chunks)
+        self.assertEqual([(s["start_page"], s["end_page"]) for s in record["sections"]], [(1, 5), (6, 10), (11, 15)])
+        self.assertEqual(record["document_summary"], "summary of 3")
+        # A fresh instance reads the record back from disk
+        self.assertEqual(SummaryCache(cache_dir=self.tmp.name).get("abc"), record)
+
+    def test_assemble_uses_sections_and_reports_misses(self):
+        self.cache.put("abc", {
+            "content_hash": "abc", "file_name": "doc.pdf", "pages_per_section": 5,
+            "sections": [
+                {"start_page": 1, "end_page": 5, "summary": "first"},
+                {"start_page": 6, "end_page": 10, "summary": "second"},
+                {"start_page": 11, "end_page": 15, "summary": "third"},
+            ],
+            "document_summary": "whole",
+        })
+        text, misses = self.cache.assemble([_chunk(7), _chunk(3, content_hash="other")])
+        self.assertIn("second", text)
+        self.assertNotIn("first", text)
+        self.assertEqual(len(misses), 1)
+
+        text, misses = self.cache.assemble([_chunk(1), _chunk(8)])
+        self.assertIn("whole", text)
+        self.assertEqual(misses, [])
+
+class TestSummarizeFlow(unittest.TestCase):
+    def test_cached_summaries_are_refined_with_the_request(self):
+        from types import SimpleNamespace
+        from backend.assistant import langgraph_flow
+        from backend.assistant.intent_router import SUMMARIZE
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = SummaryCache(cache_dir=tmp.name)
+        cache.put("abc", {"content_hash": "abc", "file_name": "doc.pdf", "pages_per_section": 5,
+                          "sections": [{"start_page": 1, "end_page": 5, "summary": "stored summary"}],
+                          "document_summary": "stored summary"})
+        plan = SimpleNamespace(intent=SUMMARIZE)
+        with patch.object(langgraph_flow, "summary_cache", cache), \
+                patch.object(langgraph_flow, "_retrieve", return_value=[_chunk(2), _chunk(3, content_hash="new")]), \
+                patch.object(langgraph_flow, "ChatOpenAI"), \
+                patch.object(langgraph_flow, "summarize_documents", return_value="refined") as summarize:
+            result = langgraph_flow._run_assistant("ringkas sanksinya saja", [], plan)
+        self.assertEqual(result["content"], "refined")
+        docs = summarize.call_args[0][1]
+        self.assertEqual(len(docs), 2)
+        self.assertIn("ringkas sanksinya saja", docs[0].page_content)
+        self.assertIn("stored summary", docs[0].page_content)
+        self.assertEqual(docs[1].page_content, "page 3 text")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.token_logger import TokenLogger
+from backend.utils.metrics import metrics
+
+class TestTokenLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.tmp.name, "token_usage.jsonl")
+        self.logger = TokenLogger(log_file=self.log_file)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _records(self):
+        self.logger.flush()
+        with open(self.log_file, encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_provider_usage_is_preferred(self):
+        usage = SimpleNamespace(prompt_tokens=1200, completion_tokens=300)
+        self.logger.log_answer_generation("prompt", "answer", "gpt-4.1-nano", "apa itu ai", usage=usage)
+        record = self._records()[0]
+        self.assertEqual((record["input_tokens"], record["output_tokens"], record["total_tokens"]), (1200, 300, 1500))
+        self.assertEqual(record["usage_source"], "provider")
+        self.assertEqual(record["query"], "apa itu ai")
+        self.assertAlmostEqual(record["cost"], 1.2 * 0.0001 + 0.3 * 0.0002)
+
+    def test_missing_usage_is_counted_in_background(self):
+        self.logger.count_tokens = lambda text, model: len(text.split())
+        self.logger.log_chat_summarization("hello world", "hi", "gpt-4.1-nano", usage={"prompt_tokens": None})
+        self.logger.log_embedding("hello world", file_name="doc.pdf")
+        chat, embedding = self._records()
+        self.assertEqual(chat["usage_source"], "estimated")
+        self.assertEqual(chat["input_tokens"], 2)
+        self.assertEqual(embedding["file"], "doc.pdf")
+        self.assertEqual(embedding["output_tokens"], 0)
+
+    def test_locally_counted_tokens_are_labeled_estimated(self):
+        self.logger.log_embedding(file_name="batch_1", input_tokens=42)
+        self.logger.log_embedding(file_name="batch_2", usage=SimpleNamespace(prompt_tokens=40), input_tokens=42)
+        local, reported = self._records()
+        self.assertEqual((local["input_tokens"], local["usage_source"]), (42, "estimated"))
+        self.assertEqual((reported["input_tokens"], reported["usage_source"]), (40, "provider"))
+
+    def test_bad_record_is_skipped_and_the_writer_keeps_going(self):
+        with mock.patch("builtins.print"):
+            self.logger.log_activity("embedding", "text-embedding-3-large", "not a number", 0)
+            self.logger.log_activity("embedding", "text-embedding-3-large", 5, 0)
+            records = self._records()
+        self.assertEqual([r["input_tokens"] for r in records], [5])
+        self.assertTrue(self.logger._writer.is_alive())
+
+    def test_rotation(self):
+        logger = TokenLogger(log_file=self.log_file, max_bytes=400, backup_count=2, batch_size=1)
+        for i in range(20):
+            logger.log_activity("embedding", "text-embedding-3-large", 10, 0)
+        logger.flush()
+        self.assertTrue(os.path.exists(self.log_file + ".1"))
+        self.assertTrue(os.path.exists(self.log_file + ".2"))
+        self.assertFalse(os.path.exists(self.log_file + ".3"))
+        self.assertLessEqual(os.path.getsize(self.log_file), 400)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        logger = TokenLogger(log_file=self.log_file, max_queue=1)
+        logger._ensure_writer = lambda: None  # no writer draining the queue
+        logger.log_activity("embedding", "text-embedding-3-large", 1, 0)
+        logger.log_activity("embedding", "text-embedding-3-large", 1, 0)
+        self.assertEqual(logger.dropped, 1)
+        self.assertIn("# TYPE kms_token_log_dropped_total counter", metrics.render())
+
+if __name__ == "__main__":
+    unittest.main()
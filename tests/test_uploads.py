@@ -0,0 +1,180 @@
+import io
+import asyncio
+import os
+import sys
+import tempfile
+import functools
+import unittest
+from unittest import mock
+
+import numpy as np
+import faiss
+from fastapi.testclient import TestClient
+from fastapi.responses import PlainTextResponse
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.uploads import UploadTooLarge, safe_filename, stage_upload, commit_upload
+from backend.ingest.pdf_loader import file_content_hash
+from backend.embeddings.catalog import DocumentCatalog, catalog_entries
+from backend.embeddings.snapshots import write_snapshot
+from backend.utils.coordination import CommittedPaths
+
+class TestStageUpload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hash_matches_the_loader_and_commit_is_a_rename(self):
+        data = os.urandom(300_000)
+        staged = stage_upload(io.BytesIO(data), "a.pdf", self.dir, block_size=4096)
+        self.assertEqual(os.listdir(self.dir), [os.path.basename(staged.path)])
+        path = commit_upload(staged, self.dir)
+        self.assertEqual(os.listdir(self.dir), ["a.pdf"])
+        self.assertEqual((staged.size, staged.content_hash), (len(data), file_content_hash(path)))
+
+    def test_oversized_upload_leaves_nothing_behind(self):
+        with self.assertRaises(UploadTooLarge):
+            stage_upload(io.BytesIO(b"x" * 10_000), "big.pdf", self.dir, max_bytes=4096, block_size=1024)
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_file_names_are_reduced_to_their_base_name(self):
+        self.assertEqual(safe_filename("../../etc/report.pdf"), "report.pdf")
+        self.assertEqual(safe_filename("C:\\docs\\report.pdf"), "report.pdf")
+        for name in ("", "../", ".hidden.pdf"):
+            with self.assertRaises(ValueError):
+                safe_filename(name)
+
+class TestUploadEndpoints(unittest.TestCase):
+    def setUp(self):
+        from backend import app as app_module
+        self.app_module = app_module
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "documents")
+        root = os.path.join(self.tmp.name, "snapshots")
+        os.makedirs(self.docs)
+        self.indexed = b"%PDF indexed regulation"
+        with open(os.path.join(self.docs, "pojk.pdf"), "wb") as f:
+            f.write(self.indexed)
+        file_stats = {"pojk.pdf": {"size": len(self.indexed), "mtime": 1.0, "pages": 1, "error": None,
+                                   "content_hash": file_content_hash(os.path.join(self.docs, "pojk.pdf"))}}
+        chunk = {"text": "t", "metadata": {"file_name": "pojk.pdf", "token_count": 1}}
+        index = faiss.IndexIDMap(faiss.IndexFlatL2(4))
+        index.add_with_ids(np.zeros((1, 4), dtype='float32'), np.arange(1))
+        write_snapshot(index, [chunk], root=root, catalog=catalog_entries(file_stats, [chunk], [chunk], lambda t: 0.0))
+        self.reindex = mock.Mock()
+        self.committed = CommittedPaths(os.path.join(self.tmp.name, "run"))
+        self.patches = [mock.patch.object(app_module, "DOCUMENTS_DIR", self.docs),
+                        mock.patch.object(app_module, "committed", self.committed),
+                        mock.patch.object(app_module, "_document_catalog", DocumentCatalog(root, self.docs)),
+                        mock.patch.object(app_module, "_reindex", self.reindex)]
+        for patch in self.patches:
+            patch.start()
+        self.client = TestClient(app_module.app)
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def test_already_indexed_content_skips_reindexing(self):
+        response = self.client.post("/api/upload", files={"file": ("copy of pojk.pdf", self.indexed)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["duplicate_of"], response.json()["indexed"]), ("pojk.pdf", False))
+        self.reindex.assert_not_called()
+        self.assertEqual(os.listdir(self.docs), ["pojk.pdf"])
+
+    def test_deleted_document_is_not_a_duplicate_of_its_stale_catalog_entry(self):
+        os.remove(os.path.join(self.docs, "pojk.pdf"))  # the catalog still lists it
+        response = self.client.post("/api/upload", files={"file": ("pojk.pdf", self.indexed)})
+        self.assertEqual((response.json()["duplicate_of"], response.json()["indexed"]), (None, True))
+        self.reindex.assert_called_once()
+        self.assertEqual(os.listdir(self.docs), ["pojk.pdf"])
+
+    def test_new_content_is_renamed_into_place_and_indexed(self):
+        response = self.client.post("/api/upload", files={"file": ("new.pdf", b"%PDF new")})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["indexed"])
+        self.reindex.assert_called_once()
+        self.assertEqual(sorted(os.listdir(self.docs)), ["new.pdf", "pojk.pdf"])
+
+    def test_monitor_does_not_reindex_api_writes_again(self):
+        self.client.post("/api/upload", files={"file": ("new.pdf", b"%PDF new")})
+        self.client.delete("/api/documents/pojk.pdf")
+        self.assertEqual(self.reindex.call_count, 2)
+        with open(os.path.join(self.docs, "copied.pdf"), "wb") as f:
+            f.write(b"%PDF copied")
+        changes = {os.path.join(self.docs, "new.pdf"): "created", os.path.join(self.docs, "pojk.pdf"): "deleted"}
+        with mock.patch.object(self.app_module.reindexer, "request") as request:
+            self.app_module._on_documents_changed(changes)
+            request.assert_not_called()
+            with mock.patch("builtins.print"):
+                self.app_module._on_documents_changed({os.path.join(self.docs, "copied.pdf"): "created"})
+            request.assert_called_once_with(wait=False)
+
+    def test_upload_is_listed_as_pending_while_reindexing(self):
+        listed = {}
+        self.reindex.side_effect = lambda collection: listed.update(
+            (d["name"], d["status"]) for d in self.client.get("/api/documents").json())
+        self.client.post("/api/upload", files={"file": ("new.pdf", b"%PDF new")})
+        self.assertEqual(listed, {"new.pdf": "pending", "pojk.pdf": "indexed"})
+
+    def test_failed_rebuild_is_reported_as_not_indexed(self):
+        from backend.embeddings.vector_store import IndexBuildError
+        self.reindex.side_effect = IndexBuildError("No chunks were loaded")
+        response = self.client.post("/api/upload", files={"file": ("scan.pdf", b"%PDF image only")})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["indexed"], response.json()["error"]), (False, "No chunks were loaded"))
+        self.assertIn("scan.pdf", os.listdir(self.docs))
+
+    def test_batch_reindexes_once_and_reports_duplicates(self):
+        files = [("files", ("a.txt", b"alpha")), ("files", ("b.txt", b"beta")),
+                 ("files", ("a copy.txt", b"alpha")), ("files", ("again.pdf", self.indexed))]
+        response = self.client.post("/api/upload/batch", files=files)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(f["filename"], f["duplicate_of"]) for f in response.json()["files"]],
+                         [("a.txt", None), ("b.txt", None), ("a copy.txt", "a.txt"), ("again.pdf", "pojk.pdf")])
+        self.reindex.assert_called_once()
+        self.assertEqual(sorted(os.listdir(self.docs)), ["a.txt", "b.txt", "pojk.pdf"])
+
+    def test_oversized_upload_is_rejected_with_413(self):
+        limited = functools.partial(stage_upload, max_bytes=16)
+        with mock.patch.object(self.app_module, "stage_upload", limited):
+            response = self.client.post("/api/upload/batch", files=[("files", ("a.txt", b"small")),
+                                                                    ("files", ("b.txt", b"x" * 100))])
+        self.assertEqual(response.status_code, 413)
+        self.reindex.assert_not_called()
+        self.assertEqual(os.listdir(self.docs), ["pojk.pdf"])
+        with mock.patch.object(self.app_module, "MAX_UPLOAD_BYTES", 16):
+            response = self.client.post("/api/upload", files={"file": ("c.txt", b"x" * 200_000)})
+        self.assertEqual(response.status_code, 413)
+
+    def test_chunked_upload_is_cut_off_at_the_limit(self):
+        chunks = [{"type": "http.request", "body": b"x" * 1024, "more_body": True} for _ in range(100)]
+        received, sent = [], []
+
+        async def receive():
+            received.append(1)
+            return chunks[len(received) - 1]
+
+        async def send(message):
+            sent.append(message)
+
+        async def read_whole_body(scope, receive, send):
+            while (await receive())["more_body"]:
+                pass
+            await PlainTextResponse("parsed")(scope, receive, send)
+
+        scope = {"type": "http", "method": "POST", "path": "/api/upload", "headers": [(b"transfer-encoding", b"chunked")]}
+        with mock.patch.object(self.app_module, "MAX_UPLOAD_BYTES", 16 * 1024):
+            asyncio.run(self.app_module.UploadBodyLimit(read_whole_body)(scope, receive, send))
+        self.assertEqual(sent[0]["status"], 413)
+        self.assertEqual(len(received), (16 + 64) + 1)
+        self.assertNotIn(b"parsed", b"".join(m.get("body", b"") for m in sent))
+
+if __name__ == '__main__':
+    unittest.main()
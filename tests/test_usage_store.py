@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# Add project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.usage_store import UsageStore
+from backend.utils.token_logger import TokenLogger
+
+def _record(timestamp, activity="answer_generation", model="gpt-4.1-nano", document=None, tokens=(100, 10), cost=0.001):
+    record = {"timestamp": timestamp, "activity": activity, "model": model,
+              "input_tokens": tokens[0], "output_tokens": tokens[1], "cost": cost}
+    if document:
+        record["document"] = document
+    return record
+
+class TestUsageStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = UsageStore(db_path=os.path.join(self.tmp.name, "usage.db"))
+        self.store.add([
+            _record("2025-07-19T12:57:24"),
+            _record("2025-07-19T18:09:25"),
+            _record("2025-07-20T09:00:00", activity="embedding", model="text-embedding-3-large",
+                    document="POJK 11 - 03 - 2022.pdf", tokens=(5000, 0), cost=0.00065),
+        ])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_daily_range_by_activity(self):
+        rows = {r["group"]: r for r in self.store.query("2025-07-19", "2025-07-20", group_by="activity")}
+        self.assertEqual(rows["answer_generation"]["calls"], 2)
+        self.assertEqual(rows["answer_generation"]["total_tokens"], 220)
+        self.assertEqual(rows["embedding"]["input_tokens"], 5000)
+
+        rows = self.store.query("2025-07-20", "2025-07-20")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["calls"], 1)
+
+    def test_hour_resolution_and_grouping(self):
+        rows = self.store.query("2025-07-19T18:00", "2025-07-20T08:00")
+        self.assertEqual(rows[0]["calls"], 1)
+        rows = self.store.query(group_by="document")
+        self.assertEqual([r["group"] for r in rows], ["", "POJK 11 - 03 - 2022.pdf"])
+        rows = self.store.query(group_by="day")
+        self.assertEqual([(r["group"], r["calls"]) for r in rows], [("2025-07-19", 2), ("2025-07-20", 1)])
+        with self.assertRaises(ValueError):
+            self.store.query(group_by="user")
+
+    def test_token_logger_feeds_rollups(self):
+        logger = TokenLogger(log_file=os.path.join(self.tmp.name, "token_usage.jsonl"), usage_store=self.store)
+        logger.log_activity("summarization", "gpt-4.1-nano", 1000, 200)
+        logger.flush()
+        usage = logger.get_total_usage()
+        self.assertEqual(usage["activities"]["summarization"]["total_tokens"], 1200)
+        self.assertEqual(usage["total_tokens"], 220 + 5000 + 1200)
+
+        rebuilt = UsageStore(db_path=os.path.join(self.tmp.name, "rebuilt.db"))
+        self.assertEqual(rebuilt.rebuild_from_jsonl(logger.log_file), 1)
+
+    def test_logged_calls_roll_up_per_document(self):
+        from types import SimpleNamespace
+        from unittest import mock
+        from backend.embeddings import vector_store
+
+        store = UsageStore(db_path=os.path.join(self.tmp.name, "per_document.db"))
+        logger = TokenLogger(log_file=os.path.join(self.tmp.name, "token_usage.jsonl"), usage_store=store)
+        client = SimpleNamespace(embeddings=SimpleNamespace(create=lambda input, model: SimpleNamespace(
+            data=[SimpleNamespace(embedding=[0.0]) for _ in input], usage=SimpleNamespace(prompt_tokens=90))))
+        chunks = [{"text": "a", "metadata": {"file_name": "pojk.pdf", "token_count": 20}},
+                  {"text": "b", "metadata": {"file_name": "uu.pdf", "token_count": 10}}]
+        with mock.patch.object(vector_store, "get_openai_client", return_value=client), \
+                mock.patch.object(vector_store, "token_logger", logger), mock.patch("builtins.print"):
+            vector_store.embed_chunks(chunks)
+        logger.log_answer_generation("prompt", "answer", usage={"prompt_tokens": 7, "completion_tokens": 3},
+                                     document="uu.pdf")
+        logger.flush()
+        rows = {r["group"]: r for r in store.query(group_by="document")}
+        self.assertEqual(sorted(rows), ["pojk.pdf", "uu.pdf"])
+        self.assertEqual((rows["pojk.pdf"]["input_tokens"], rows["uu.pdf"]["input_tokens"]), (60, 30 + 7))
+        self.assertEqual(rows["uu.pdf"]["calls"], 2)
+
+if __name__ == "__main__":
+    unittest.main()